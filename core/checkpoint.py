@@ -0,0 +1,229 @@
+"""
+Diário de Checkpoint
+Registro append-only (JSONL) do resultado de cada linha, para retomar execuções interrompidas
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+PASTA_CHECKPOINTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "checkpoints")
+
+VERSAO_DIARIO = 1
+
+# Linhas gravadas entre dois fsync do diário (app.backup_interval)
+INTERVALO_SYNC_PADRAO = 10
+
+
+def impressao_digital(caminho: str) -> str:
+    """SHA-1 do conteúdo do arquivo: o mesmo arquivo de entrada retoma o mesmo diário"""
+    sha = hashlib.sha1()
+    with open(caminho, "rb") as arquivo:
+        for bloco in iter(lambda: arquivo.read(1024 * 1024), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+class CustoGravacao:
+    """Tempo gasto salvando: diário (gravação + fsync) e o XLSX final, para a área de progresso"""
+
+    def __init__(self):
+        self.gravacoes = 0
+        self.sincronizacoes = 0
+        self.tempo_diario = 0.0
+        self.tempo_xlsx = 0.0
+
+    @contextmanager
+    def salvando_xlsx(self):
+        """Cronometra a gravação do XLSX (with diario.salvando_xlsx(): gravar_dataframe(...))"""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.tempo_xlsx += time.perf_counter() - inicio
+
+    def resumo_custo(self) -> str:
+        partes = []
+        if self.gravacoes:
+            partes.append(f"💾 diário: {self.gravacoes} linhas em {self.tempo_diario * 1000:.0f} ms "
+                          f"({self.sincronizacoes} fsync)")
+        if self.tempo_xlsx:
+            partes.append(f"XLSX: {self.tempo_xlsx:.1f}s")
+        return " | ".join(partes)
+
+
+class DiarioCheckpoint(CustoGravacao):
+    """
+    Diário JSONL: uma linha de cabeçalho e uma linha por resultado, gravada assim que a
+    linha da planilha termina.
+
+    - Append-only: nada é reescrito; uma queda no meio de uma gravação deixa no máximo
+      a última linha incompleta, que é ignorada na leitura
+    - Cada linha custa um write pequeno; o fsync acontece a cada `intervalo_sync` linhas,
+      em vez de regravar a planilha inteira
+    - Retomada: reabrir o diário da mesma entrada (mesma impressão digital) devolve os
+      resultados já gravados em `concluidos`, e só as linhas `pendentes` são consultadas
+    - Ao final, `aplicar(df)` escreve os resultados no DataFrame para gerar o XLSX uma vez
+    """
+
+    def __init__(self, caminho: str, identidade: Dict[str, Any], intervalo_sync: int = INTERVALO_SYNC_PADRAO):
+        super().__init__()
+        self.caminho = caminho
+        self.identidade = identidade
+        self.intervalo_sync = max(int(intervalo_sync), 1)
+        self._desde_sync = 0
+        self.concluidos: Dict[int, Dict[str, Any]] = {}
+        self.retomado = False
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        if os.path.exists(caminho) and self._carregar():
+            self.retomado = True
+            self._arquivo = open(caminho, "a", encoding="utf-8")
+        else:
+            # Diário de outra entrada (ou ilegível): recomeça do zero
+            self._arquivo = open(caminho, "w", encoding="utf-8")
+            cabecalho = dict(identidade, diario=VERSAO_DIARIO, criado=datetime.now().isoformat(timespec="seconds"))
+            self._escrever(cabecalho)
+
+    @classmethod
+    def para_entrada(cls, funcionalidade: str, caminho_entrada: str, pasta: Optional[str] = None,
+                     intervalo_sync: int = INTERVALO_SYNC_PADRAO) -> "DiarioCheckpoint":
+        """Diário da funcionalidade para este arquivo de entrada (checkpoints/<funcionalidade>_<sha>.jsonl)"""
+        digital = impressao_digital(caminho_entrada)
+        caminho = os.path.join(pasta or PASTA_CHECKPOINTS, f"{funcionalidade}_{digital[:16]}.jsonl")
+        return cls(caminho, {
+            'funcionalidade': funcionalidade,
+            'entrada': os.path.abspath(caminho_entrada),
+            'digital': digital
+        }, intervalo_sync)
+
+    def _carregar(self) -> bool:
+        """Lê o diário existente; False se ele pertence a outra entrada"""
+        with open(self.caminho, "r", encoding="utf-8") as arquivo:
+            linhas = arquivo.read().split("\n")
+        try:
+            cabecalho = json.loads(linhas[0])
+        except (ValueError, IndexError):
+            return False
+        if cabecalho.get('digital') != self.identidade.get('digital') or \
+                cabecalho.get('funcionalidade') != self.identidade.get('funcionalidade'):
+            return False
+
+        for linha in linhas[1:]:
+            if not linha:
+                continue
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                continue  # Última linha cortada por uma queda
+            indice = registro.pop('i', None)
+            if indice is not None:
+                self.concluidos[int(indice)] = registro
+
+        # Linha final incompleta: começa a próxima gravação em uma linha nova
+        if linhas[-1]:
+            with open(self.caminho, "a", encoding="utf-8") as arquivo:
+                arquivo.write("\n")
+        return True
+
+    def _escrever(self, registro: Dict[str, Any]):
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False, default=str) + "\n")
+        self._arquivo.flush()
+
+    def registrar(self, indice: int, **campos):
+        """Grava o resultado de uma linha (coluna → valor)"""
+        with self._lock:
+            inicio = time.perf_counter()
+            self.concluidos[int(indice)] = campos
+            self._escrever(dict(campos, i=int(indice)))
+            self.gravacoes += 1
+            self._desde_sync += 1
+            if self._desde_sync >= self.intervalo_sync:
+                os.fsync(self._arquivo.fileno())
+                self.sincronizacoes += 1
+                self._desde_sync = 0
+            self.tempo_diario += time.perf_counter() - inicio
+
+    def pendentes(self, total: int, repetir: Iterable[Any] = (), campo_status: Optional[str] = None) -> List[int]:
+        """
+        Índices de 0 a total-1 que ainda precisam ser processados.
+
+        Linhas já registradas cujo `campo_status` está em `repetir` (ex.: erros transitórios)
+        voltam a ser consultadas.
+        """
+        repetir = set(repetir)
+        resultado = []
+        for indice in range(total):
+            registro = self.concluidos.get(indice)
+            if registro is None or (campo_status and registro.get(campo_status) in repetir):
+                resultado.append(indice)
+        return resultado
+
+    def aplicar(self, df) -> int:
+        """Escreve os resultados registrados no DataFrame; retorna quantas linhas foram aplicadas"""
+        aplicados = 0
+        for indice, campos in self.concluidos.items():
+            if indice >= len(df):
+                continue
+            rotulo = df.index[indice]
+            for coluna, valor in campos.items():
+                df.at[rotulo, coluna] = valor
+            aplicados += 1
+        return aplicados
+
+    def fechar(self):
+        with self._lock:
+            if not self._arquivo.closed:
+                self._arquivo.flush()
+                os.fsync(self._arquivo.fileno())
+                self._arquivo.close()
+
+    def descartar(self):
+        """Fecha e remove o diário (execução concluída e XLSX final gravado)"""
+        self.fechar()
+        try:
+            os.remove(self.caminho)
+        except OSError:
+            pass
+
+
+class DiarioDesativado(CustoGravacao):
+    """Substituto sem efeito quando app.auto_backup está desligado: tudo é processado de novo"""
+
+    caminho = None
+    retomado = False
+
+    def __init__(self):
+        super().__init__()
+        self.concluidos: Dict[int, Dict[str, Any]] = {}
+
+    def registrar(self, indice: int, **campos):
+        pass
+
+    def pendentes(self, total: int, repetir: Iterable[Any] = (), campo_status: Optional[str] = None) -> List[int]:
+        return list(range(total))
+
+    def aplicar(self, df) -> int:
+        return 0
+
+    def fechar(self):
+        pass
+
+    def descartar(self):
+        pass
+
+
+def abrir_diario(funcionalidade: str, caminho_entrada: str, config=None):
+    """Diário da entrada conforme app.auto_backup (DiarioDesativado se desligado) e app.backup_interval"""
+    if config is None:
+        return DiarioCheckpoint.para_entrada(funcionalidade, caminho_entrada)
+    if not config.get('app.auto_backup', True):
+        return DiarioDesativado()
+    intervalo = config.get('app.backup_interval', INTERVALO_SYNC_PADRAO) or INTERVALO_SYNC_PADRAO
+    return DiarioCheckpoint.para_entrada(funcionalidade, caminho_entrada, intervalo_sync=intervalo)
@@ -0,0 +1,129 @@
+"""
+Controle Adaptativo de Concorrência (AIMD)
+Ajusta o número de requisições em voo pela latência p95 e pelos erros do servidor
+"""
+
+import threading
+import time
+from typing import List, Optional, Tuple
+
+import requests
+
+from core.http_session import adicionar_observador, remover_observador
+
+
+class ControladorAIMD:
+    """
+    Additive Increase / Multiplicative Decrease sobre as requisições observadas.
+
+    A cada janela de amostras (no mínimo `janela_minima`, ou o limite atual se for maior):
+    - houve timeout, erro de conexão, 429 ou 5xx: limite *= fator_reducao
+    - p95 estável (até `tolerancia` acima da referência): limite += incremento
+    - p95 subindo: mantém o limite
+
+    A referência de p95 é o menor p95 visto desde a última redução, e é reaprendida após
+    cada corte. Use como contexto (`with controlador:`) para receber as amostras de
+    core.http_session; o EscalonadorJanela faz isso automaticamente.
+    """
+
+    def __init__(self, inicial: int = 10, minimo: int = 1, maximo: int = 50,
+                 incremento: int = 1, fator_reducao: float = 0.5, tolerancia: float = 0.25,
+                 janela_minima: int = 20, endpoints: Optional[List[str]] = None):
+        self.minimo = max(int(minimo), 1)
+        self.maximo = max(int(maximo), self.minimo)
+        self.limite = min(max(int(inicial), self.minimo), self.maximo)
+        self.incremento = incremento
+        self.fator_reducao = fator_reducao
+        self.tolerancia = tolerancia
+        self.janela_minima = janela_minima
+        # Só considera URLs que começam com um destes prefixos (None = todas)
+        self.endpoints = endpoints
+
+        self.p95_referencia = None
+        self.ultimo_p95 = None
+        self.historico: List[Tuple[float, int]] = []
+        self._latencias = []
+        self._amostras = 0
+        self._erros = 0
+        self._inicio = time.time()
+        self._lock = threading.Lock()
+        self._registrar_historico()
+
+    @classmethod
+    def de_config(cls, config, inicial: int, endpoints: Optional[List[str]] = None) -> "ControladorAIMD":
+        """Cria o controlador a partir da seção performance do ConfigManager.
+
+        Com performance.adaptive_concurrency desligado o limite fica fixo em `inicial`.
+        """
+        if not config.get('performance.adaptive_concurrency', True):
+            return cls(inicial=inicial, minimo=inicial, maximo=inicial, endpoints=endpoints)
+        return cls(
+            inicial=inicial,
+            minimo=config.get('performance.concurrency_min', 2),
+            maximo=config.get('performance.concurrency_max', 50),
+            endpoints=endpoints
+        )
+
+    def __enter__(self):
+        adicionar_observador(self.registrar)
+        return self
+
+    def __exit__(self, *exc):
+        remover_observador(self.registrar)
+        return False
+
+    def registrar(self, url, status, latencia, erro=None):
+        """Recebe uma amostra (assinatura de observador de core.http_session)"""
+        if self.endpoints and not any(str(url).startswith(e) for e in self.endpoints):
+            return
+
+        sobrecarga = (
+            isinstance(erro, (requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+            or status == 429
+            or (status is not None and status >= 500)
+        )
+
+        with self._lock:
+            self._amostras += 1
+            if latencia is not None:
+                self._latencias.append(latencia)
+            if sobrecarga:
+                self._erros += 1
+            if self._amostras >= max(self.janela_minima, self.limite):
+                self._ajustar()
+
+    def _ajustar(self):
+        latencias = sorted(self._latencias)
+        p95 = latencias[int(0.95 * (len(latencias) - 1))] if latencias else self.ultimo_p95
+        self.ultimo_p95 = p95
+
+        if self._erros:
+            novo = max(int(self.limite * self.fator_reducao), self.minimo)
+            self.p95_referencia = None
+        elif p95 is None:
+            novo = self.limite
+        else:
+            if self.p95_referencia is None or p95 < self.p95_referencia:
+                self.p95_referencia = p95
+            if p95 <= self.p95_referencia * (1 + self.tolerancia):
+                novo = min(self.limite + self.incremento, self.maximo)
+            else:
+                novo = self.limite
+
+        self._latencias = []
+        self._amostras = 0
+        self._erros = 0
+        if novo != self.limite:
+            self.limite = novo
+            self._registrar_historico()
+
+    def _registrar_historico(self):
+        self.historico.append((time.time() - self._inicio, self.limite))
+
+    def resumo(self, ultimos: int = 8) -> str:
+        """Linha para a área de progresso: limite atual, p95 e a evolução recente do limite"""
+        valores = [str(limite) for _, limite in self.historico[-ultimos:]]
+        texto = f"🎚️ Concorrência: {self.limite}"
+        if self.ultimo_p95 is not None:
+            texto += f" | p95: {self.ultimo_p95 * 1000:.0f}ms"
+        return texto + f" | histórico: {'→'.join(valores)}"
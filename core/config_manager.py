@@ -18,7 +18,7 @@ class ConfigManager:
                 "theme": "modern",
                 "language": "pt_BR",
                 "auto_backup": True,
-                "backup_interval": 10,  # linhas
+                "backup_interval": 10,  # linhas entre fsync do diário de checkpoint
                 "max_retries": 3,
                 "timeout_seconds": 30
             },
@@ -36,7 +36,10 @@ class ConfigManager:
                 "backup_count": 5,
                 "log_to_console": True,
                 "log_to_file": True,
-                "detailed_errors": True
+                "detailed_errors": True,
+                "trace_sample_rows": 5,  # Linhas/CPFs com rastro detalhado quando level = DEBUG
+                "queue_size": 10000,  # Registros aguardando gravação (0 = sem limite)
+                "queue_policy": "drop"  # Fila cheia: "drop" descarta abaixo de ERROR, "block" espera vaga
             },
             "security": {
                 "mask_credentials": True,
@@ -47,8 +50,23 @@ class ConfigManager:
             "performance": {
                 "batch_size": 100,
                 "thread_pool_size": 4,
-                "memory_limit_mb": 512,
-                "enable_caching": True
+                "cpu_workers": 0,  # Processos do estágio de CPU (parse, JSON, duplicatas): 0 = um por núcleo, 1 = sem processos
+                "cpu_batch_size": 32,  # Itens por lote enviado aos processos
+                "memory_limit_mb": 512,  # Acima disso Resolver Duplicatas trabalha em partições no disco
+                "enable_caching": True,  # Cache em disco (cache/*.sqlite) das respostas por CPF
+                "cache_mode": "normal",  # normal | refresh (ignora o salvo e regrava) | bypass
+                "cache_ttl_minutes": 240,
+                "cache_max_entries": 50000,
+                "async_engine": False,  # Consultar Acordo via asyncio/aiohttp (pipeline único)
+                "adaptive_concurrency": True,  # AIMD: ajusta requisições em voo por p95/erros
+                "concurrency_min": 2,
+                "concurrency_max": 50,
+                # Token bucket por endpoint (nome da variável de ambiente); 0 = sem limite
+                "rate_limit_enabled": True,
+                "rate_limits": {
+                    "URL": {"requests_per_second": 40, "burst": 40},
+                    "URL_DIVIDA": {"requests_per_second": 20, "burst": 20}
+                }
             }
         }
         self.config = self.load_config()
@@ -134,3 +152,15 @@ class ConfigManager:
                 return self.save_config()
         except Exception:
             return False
+
+
+_config_projeto = None
+
+
+def carregar_config_projeto() -> ConfigManager:
+    """ConfigManager do config.json da raiz do projeto, compartilhado pelos módulos sem interface"""
+    global _config_projeto
+    if _config_projeto is None:
+        raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        _config_projeto = ConfigManager(os.path.join(raiz, "config.json"))
+    return _config_projeto
@@ -0,0 +1,253 @@
+"""
+Estágio de CPU em Processos
+Trabalho limitado pelo GIL (parse de XML, achatamento de JSON, regras de duplicatas) em um ProcessPoolExecutor, em lotes, com os bytes das respostas entregues por memória compartilhada
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+
+from core.config_manager import carregar_config_projeto
+
+# Itens por tarefa enviada aos processos: amortiza o custo de IPC de cada envio
+TAMANHO_LOTE_PADRAO = 32
+
+# Quanto um lote incompleto espera por mais respostas antes de seguir (segundos)
+ESPERA_LOTE_PADRAO = 0.005
+
+
+def _executar_lote(funcao: Callable, itens: List[Any]) -> List[Any]:
+    """Executado nos processos: funcao em cada item do lote"""
+    return [funcao(item) for item in itens]
+
+
+def _executar_compartilhado(funcao: Callable, nome: str, limites: List[Tuple[int, int]]) -> List[Tuple[bool, Any]]:
+    """
+    Executado nos processos: funcao(memoryview) em cada fatia do segmento compartilhado.
+    Cada item volta como (ok, resultado ou exceção), para um erro não derrubar o lote inteiro.
+    """
+    memoria = shared_memory.SharedMemory(name=nome)
+    try:
+        resultados = []
+        for inicio, fim in limites:
+            fatia = memoria.buf[inicio:fim]
+            try:
+                resultados.append((True, funcao(fatia)))
+            except Exception as e:
+                resultados.append((False, e))
+            finally:
+                fatia.release()
+        return resultados
+    finally:
+        memoria.close()
+
+
+class EstagioEmLinha:
+    """Mesma interface do EstagioCPU, executando na própria thread (performance.cpu_workers = 1)"""
+
+    processos = 1
+
+    def analisar(self, funcao: Callable, conteudo: bytes) -> Future:
+        futuro = Future()
+        try:
+            futuro.set_result(funcao(memoryview(conteudo)))
+        except Exception as e:
+            futuro.set_exception(e)
+        return futuro
+
+    def mapear(self, funcao: Callable, itens: Iterable, tamanho_lote: Optional[int] = None) -> Iterator:
+        for item in itens:
+            yield funcao(item)
+
+    def fechar(self):
+        pass
+
+
+class EstagioCPU:
+    """
+    Processos para as etapas de CPU, compartilhados por todas as funcionalidades.
+
+    - analisar(funcao, bytes) → Future: para threads de rede. As respostas entram em lotes de
+      até `tamanho_lote` (ou o que chegar em `espera_lote` segundos); os bytes de um lote vão
+      para um único segmento de memória compartilhada e o processo recebe só nome e limites.
+      funcao recebe um memoryview e deve ser uma função de módulo (pickle por nome).
+    - mapear(funcao, itens) → resultados na ordem: itens picklable em lotes, com no máximo
+      2 lotes por processo em voo (a memória não cresce com o tamanho da entrada).
+
+    O pool só é criado no primeiro uso.
+    """
+
+    def __init__(self, processos: int, tamanho_lote: int = TAMANHO_LOTE_PADRAO,
+                 espera_lote: float = ESPERA_LOTE_PADRAO):
+        self.processos = max(int(processos), 1)
+        self.tamanho_lote = max(int(tamanho_lote), 1)
+        self.espera_lote = espera_lote
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._condicao = threading.Condition()
+        self._pendentes: List[Tuple[Callable, bytes, Future]] = []
+        self._despachante: Optional[threading.Thread] = None
+        self._fechado = False
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._condicao:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.processos)
+            return self._executor
+
+    # --- Respostas de rede: lotes automáticos + memória compartilhada ---
+
+    def analisar(self, funcao: Callable, conteudo: bytes) -> Future:
+        futuro = Future()
+        with self._condicao:
+            if self._fechado:
+                raise RuntimeError("Estágio de CPU já encerrado")
+            self._pendentes.append((funcao, conteudo, futuro))
+            if self._despachante is None:
+                self._despachante = threading.Thread(target=self._despachar_continuamente,
+                                                     name="EstagioCPU", daemon=True)
+                self._despachante.start()
+            self._condicao.notify()
+        return futuro
+
+    def _despachar_continuamente(self):
+        while True:
+            with self._condicao:
+                while not self._pendentes and not self._fechado:
+                    self._condicao.wait()
+                if not self._pendentes:
+                    return
+                # Lote incompleto: espera um pouco por mais respostas
+                limite = time.monotonic() + self.espera_lote
+                while len(self._pendentes) < self.tamanho_lote and not self._fechado:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        break
+                    self._condicao.wait(restante)
+                lote = self._pendentes[:self.tamanho_lote]
+                del self._pendentes[:self.tamanho_lote]
+
+            por_funcao = {}
+            for funcao, conteudo, futuro in lote:
+                por_funcao.setdefault(funcao, []).append((conteudo, futuro))
+            for funcao, itens in por_funcao.items():
+                self._enviar_compartilhado(funcao, itens)
+
+    def _enviar_compartilhado(self, funcao: Callable, itens: List[Tuple[bytes, Future]]):
+        futuros = [futuro for _, futuro in itens]
+        try:
+            limites, posicao = [], 0
+            for conteudo, _ in itens:
+                limites.append((posicao, posicao + len(conteudo)))
+                posicao += len(conteudo)
+            memoria = shared_memory.SharedMemory(create=True, size=max(posicao, 1))
+        except Exception as e:
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return
+
+        try:
+            for (conteudo, _), (inicio, fim) in zip(itens, limites):
+                memoria.buf[inicio:fim] = conteudo
+            tarefa = self._pool().submit(_executar_compartilhado, funcao, memoria.name, limites)
+        except Exception as e:
+            self._liberar(memoria)
+            for futuro in futuros:
+                futuro.set_exception(e)
+            return
+
+        def concluir(tarefa):
+            # O segmento só é liberado depois que o processo terminou de ler
+            self._liberar(memoria)
+            try:
+                resultados = tarefa.result()
+            except Exception as e:
+                for futuro in futuros:
+                    futuro.set_exception(e)
+                return
+            for futuro, (ok, valor) in zip(futuros, resultados):
+                if ok:
+                    futuro.set_result(valor)
+                else:
+                    futuro.set_exception(valor)
+
+        tarefa.add_done_callback(concluir)
+
+    @staticmethod
+    def _liberar(memoria: shared_memory.SharedMemory):
+        memoria.close()
+        try:
+            memoria.unlink()
+        except FileNotFoundError:
+            pass
+
+    # --- Itens já em memória: lotes na ordem de entrada ---
+
+    def mapear(self, funcao: Callable, itens: Iterable, tamanho_lote: Optional[int] = None) -> Iterator:
+        tamanho_lote = tamanho_lote or self.tamanho_lote
+        pool = self._pool()
+        em_voo = []
+        lote = []
+
+        def enviar():
+            em_voo.append(pool.submit(_executar_lote, funcao, lote))
+
+        for item in itens:
+            lote.append(item)
+            if len(lote) >= tamanho_lote:
+                enviar()
+                lote = []
+                while len(em_voo) >= 2 * self.processos:
+                    yield from em_voo.pop(0).result()
+        if lote:
+            enviar()
+        for tarefa in em_voo:
+            yield from tarefa.result()
+
+    def fechar(self):
+        with self._condicao:
+            self._fechado = True
+            self._condicao.notify_all()
+            despachante = self._despachante
+        if despachante is not None:
+            despachante.join()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+_estagio = None
+_lock_estagio = threading.Lock()
+
+
+def processos_configurados(config=None) -> int:
+    """performance.cpu_workers: 0 = um processo por núcleo, 1 = sem processos (na própria thread)"""
+    config = config or carregar_config_projeto()
+    processos = int(config.get('performance.cpu_workers', 0) or 0)
+    return processos if processos > 0 else (os.cpu_count() or 1)
+
+
+def obter_estagio_cpu(config=None):
+    """Estágio compartilhado pelo processo (criado na primeira chamada, conforme o config.json)"""
+    global _estagio
+    with _lock_estagio:
+        if _estagio is None:
+            config = config or carregar_config_projeto()
+            processos = processos_configurados(config)
+            if processos <= 1:
+                _estagio = EstagioEmLinha()
+            else:
+                _estagio = EstagioCPU(processos, config.get('performance.cpu_batch_size', TAMANHO_LOTE_PADRAO)
+                                      or TAMANHO_LOTE_PADRAO)
+        return _estagio
+
+
+def encerrar_estagio_cpu():
+    """Encerra os processos do estágio compartilhado (o próximo obter_estagio_cpu cria outro)"""
+    global _estagio
+    with _lock_estagio:
+        estagio, _estagio = _estagio, None
+    if estagio is not None:
+        estagio.fechar()
@@ -4,11 +4,119 @@ Valida entrada de dados com regras customizáveis
 """
 
 import re
+import numpy as np
 import pandas as pd
 from typing import List, Dict, Any, Tuple, Optional
 from datetime import datetime
 import json
 
+# Pesos do cálculo dos dígitos verificadores do CPF (módulo 11)
+PESOS_PRIMEIRO_DV = np.arange(10, 1, -1)
+PESOS_SEGUNDO_DV = np.arange(11, 1, -1)
+
+ZERO_ASCII = ord('0')
+
+# Valores maiores que isso são limpos um a um, para não alargar a matriz de caracteres da coluna toda
+LARGURA_MAXIMA_CPF = 32
+
+_NAO_DIGITO_ASCII = re.compile(r'[^0-9]')
+
+
+def _digitos_cpf(serie: pd.Series) -> Tuple[np.ndarray, np.ndarray, Dict[int, str]]:
+    """
+    Dígitos 0-9 de todos os valores da coluna de uma vez (sem re.sub por valor).
+    Retorna (matriz, qtd, excedentes):
+    - matriz: (valores × 11) códigos ASCII dos dígitos alinhados à direita, completada com '0'
+      (só preenchida onde 1 <= qtd <= 11)
+    - qtd: quantos dígitos cada valor tem
+    - excedentes: {posição: dígitos} dos valores com mais de 11 dígitos
+    Valores ausentes contam como texto vazio.
+    """
+    textos = serie.astype(str).fillna('').to_numpy(dtype=object)
+    n = len(textos)
+    tamanhos = np.fromiter(map(len, textos), dtype=np.int64, count=n)
+
+    # Cada valor vira uma linha de caracteres (UTF-32); valores muito longos ficam fora da matriz
+    longos = np.flatnonzero(tamanhos > LARGURA_MAXIMA_CPF)
+    if len(longos):
+        textos = textos.copy()
+        textos[longos] = ''
+    largura = max(int(np.where(tamanhos > LARGURA_MAXIMA_CPF, 0, tamanhos).max(initial=0)), 1)
+    caracteres = textos.astype(f'U{largura}').view(np.uint32).reshape(n, largura)
+
+    # Percorre as posições da direita para a esquerda (uma operação por posição, não por valor):
+    # cada dígito vai para a próxima coluna livre da matriz; um não dígito escreve '0' nela,
+    # que um dígito mais à esquerda sobrescreve depois. A coluna 0 é descarte: recebe o que
+    # passa de 11 dígitos
+    matriz = np.full(n * 12, ZERO_ASCII, dtype=np.uint8)
+    inicio_linha = np.arange(1, n * 12, 12)
+    livre = np.full(n, 10, dtype=np.int64)
+    for coluna in np.ascontiguousarray(caracteres.T)[::-1]:
+        eh_digito = (coluna >= ZERO_ASCII) & (coluna <= ZERO_ASCII + 9)
+        matriz[inicio_linha + np.maximum(livre, -1)] = np.where(eh_digito, coluna, ZERO_ASCII)
+        livre -= eh_digito
+    matriz = np.ascontiguousarray(matriz.reshape(n, 12)[:, 1:])
+    qtd = 10 - livre
+
+    excedentes = {}
+    for i in np.flatnonzero(qtd > 11):
+        linha = caracteres[i]
+        excedentes[int(i)] = linha[(linha >= ZERO_ASCII) & (linha <= ZERO_ASCII + 9)].astype(np.uint8).tobytes().decode('ascii')
+    for i in longos:
+        digitos = _NAO_DIGITO_ASCII.sub('', str(serie.iloc[i]))
+        qtd[i] = len(digitos)
+        if len(digitos) > 11:
+            excedentes[int(i)] = digitos
+        elif digitos:
+            matriz[i, 11 - len(digitos):] = np.frombuffer(digitos.encode('ascii'), dtype=np.uint8)
+    return matriz, qtd, excedentes
+
+
+def _digitos_verificadores_ok(matriz: np.ndarray) -> np.ndarray:
+    """Máscara dos CPFs (linhas da matriz ASCII) com os dois dígitos verificadores corretos"""
+    numeros = matriz.astype(np.int32) - ZERO_ASCII
+    resto = numeros[:, :9] @ PESOS_PRIMEIRO_DV % 11
+    primeiro = np.where(resto < 2, 0, 11 - resto)
+    resto = (numeros[:, :9] @ PESOS_SEGUNDO_DV[:9] + primeiro * PESOS_SEGUNDO_DV[9]) % 11
+    segundo = np.where(resto < 2, 0, 11 - resto)
+    return (numeros[:, 9] == primeiro) & (numeros[:, 10] == segundo)
+
+
+def analisar_cpf_series(serie: pd.Series) -> pd.DataFrame:
+    """
+    Limpa e valida uma coluna inteira de CPFs com operações vetorizadas (NumPy).
+
+    Colunas do resultado, no mesmo índice da entrada:
+    - cpf: só os dígitos, com zeros à esquerda até 11 ('' sem dígitos), como limpar_cpf
+    - qtd_digitos: quantos dígitos o valor tinha antes de completar com zeros
+    - formato_ok: 11 dígitos depois de completar com zeros
+    - repetido: sequência de um único dígito (00000000000, 11111111111, ...)
+    - digitos_ok: dígitos verificadores corretos (só faz sentido com formato_ok)
+
+    Apenas dígitos ASCII contam como dígitos.
+    """
+    matriz, qtd, excedentes = _digitos_cpf(serie)
+    formato_ok = (qtd > 0) & (qtd <= 11)
+
+    cpfs = matriz.view('S11').ravel().astype('U11').astype(object)
+    cpfs[qtd == 0] = ''
+    for i, digitos in excedentes.items():
+        cpfs[i] = digitos
+
+    return pd.DataFrame({
+        'cpf': pd.Series(cpfs, index=serie.index, dtype=object),
+        'qtd_digitos': qtd,
+        'formato_ok': formato_ok,
+        'repetido': formato_ok & (matriz == matriz[:, :1]).all(axis=1),
+        'digitos_ok': formato_ok & _digitos_verificadores_ok(matriz),
+    }, index=serie.index)
+
+
+def limpar_cpf_series(serie: pd.Series) -> pd.Series:
+    """Versão em coluna de limpar_cpf: só os dígitos, zeros à esquerda até 11, '' quando não há dígitos"""
+    return analisar_cpf_series(serie)['cpf']
+
+
 class ValidadorDados:
     def __init__(self, logger=None):
         self.logger = logger
@@ -82,10 +190,13 @@ class ValidadorDados:
             
             return False, errors
         
-        # Validar dados linha por linha
-        for idx, row in df.iterrows():
-            row_errors = self.validate_row(row, required_columns, idx)
-            errors.extend(row_errors)
+        # Validar dados coluna por coluna; os erros saem na mesma ordem da validação linha a linha
+        erros_colunas = []
+        for ordem, column in enumerate(required_columns):
+            for posicao, erro in self._validate_column(column, df[column]):
+                erros_colunas.append((posicao, ordem, erro))
+        erros_colunas.sort(key=lambda item: item[:2])
+        errors.extend(erro for _, _, erro in erros_colunas)
         
         # Verificar duplicatas
         duplicate_errors = self._check_duplicates(df, required_columns)
@@ -122,6 +233,31 @@ class ValidadorDados:
         
         return errors
     
+    def _validate_column(self, column: str, serie: pd.Series) -> List[Tuple[int, Dict]]:
+        """
+        Valida uma coluna inteira: (posição da linha, erro) para cada valor que validate_field recusaria.
+        CPFs são triados de uma vez (analisar_cpf_series); validate_field só monta o erro das linhas recusadas.
+        """
+        if self._normalize_field_name(column) not in self.validation_rules:
+            return []
+        
+        if column.lower() == 'cpf':
+            analise = analisar_cpf_series(serie)
+            textos = serie.astype(str).fillna('')
+            suspeitos = (serie.isna() | textos.str.strip().eq('') | ~textos.map(str.isascii)
+                         | analise['qtd_digitos'].ne(11) | analise['repetido'] | ~analise['digitos_ok'])
+            posicoes = np.flatnonzero(suspeitos.to_numpy())
+        else:
+            posicoes = range(len(serie))
+        
+        valores = serie.to_numpy(dtype=object)
+        erros = []
+        for posicao in posicoes:
+            erro = self.validate_field(column, valores[posicao], serie.index[posicao])
+            if erro:
+                erros.append((int(posicao), erro))
+        return erros
+    
     def validate_field(self, field_name: str, value: Any, row_index: int = None) -> Optional[Dict]:
         """Valida um campo específico"""
         # Normalizar nome do campo
@@ -329,6 +465,38 @@ class ValidadorDados:
             
         return clean_cpf
     
+    def normalize_cpf_series(self, serie: pd.Series) -> pd.Series:
+        """
+        normalize_cpf para uma coluna inteira, sem laço por valor
+        Args:
+            serie (pd.Series): CPFs (com ou sem pontos e traços)
+        Returns:
+            pd.Series: CPFs com 11 dígitos, ou string vazia onde inválido
+        """
+        analise = analisar_cpf_series(serie)
+        return analise['cpf'].where(analise['formato_ok'] & ~analise['repetido'], '')
+    
+    def validate_cpf_series(self, serie: pd.Series, strict: bool = False) -> pd.Series:
+        """
+        validate_cpf para uma coluna inteira, sem laço por valor
+        Args:
+            serie (pd.Series): CPFs (com ou sem pontos e traços)
+            strict (bool): Se True, exige também dígitos verificadores válidos
+        Returns:
+            pd.Series: máscara booleana (True = CPF válido), no índice da entrada
+        """
+        analise = analisar_cpf_series(serie)
+        validos = analise['formato_ok'] & ~analise['repetido']
+        if strict:
+            validos &= analise['digitos_ok']
+        
+        if self.logger:
+            ajustados = int((analise['formato_ok'] & (analise['qtd_digitos'] < 11)).sum())
+            if ajustados:
+                self.logger.info(f"{ajustados} CPF(s) ajustado(s) com zeros à esquerda")
+        
+        return validos
+    
     def _validate_cpf(self, cpf: str) -> bool:
         """Valida dígitos verificadores do CPF"""
         if len(cpf) != 11 or cpf == cpf[0] * 11:
@@ -0,0 +1,196 @@
+"""
+Parser das Respostas do EasyCollector
+Extrai em uma única passada (lxml) apenas os campos usados pelos módulos de consulta
+"""
+
+from typing import Dict, List, Optional
+
+from lxml import etree
+
+# Campos de identificação com busca global de fallback em obter_divida_cpf
+CAMPOS_ID = ("IdCliente", "IdAcordo", "Identificador")
+
+
+def _nome_local(tag) -> str:
+    """Nome da tag sem namespace (como o BeautifulSoup compara)"""
+    if not isinstance(tag, str):
+        return ""  # Comentários e instruções de processamento
+    return tag.rsplit("}", 1)[-1]
+
+
+def _texto(elem) -> str:
+    if len(elem) == 0:
+        return elem.text or ""
+    return "".join(elem.itertext())
+
+
+def _inteiro(texto: str) -> Optional[int]:
+    """Valor de um campo numérico, ou None se o texto não for só dígitos"""
+    texto = (texto or "").strip()
+    return int(texto) if texto.isdigit() else None
+
+
+def _xml(texto):
+    """Árvore de um texto XML (aceita a declaração <?xml ... encoding=...?> em str)"""
+    parser = etree.XMLParser(recover=True, huge_tree=True)
+    try:
+        parser.feed(texto)
+        return parser.close()
+    except etree.XMLSyntaxError:
+        return None
+
+
+def _envelope(resposta):
+    """Árvore do envelope SOAP (bytes ou str), ou None se não houver XML legível"""
+    if isinstance(resposta, (bytes, bytearray, memoryview)):
+        try:
+            return etree.fromstring(bytes(resposta), etree.XMLParser(recover=True, huge_tree=True))
+        except etree.XMLSyntaxError:
+            return None
+    return _xml(resposta)
+
+
+def _elemento_string(raiz):
+    """O elemento <string> que carrega o XML interno (a própria raiz, normalmente)"""
+    if raiz is None:
+        return None
+    if _nome_local(raiz.tag) == "string":
+        return raiz
+    return next(raiz.iter("{*}string", "string"), None)
+
+
+def _eventos(response_text):
+    """
+    Eventos start/end do XML interno da resposta.
+
+    O envelope é lido uma vez e o texto de <string> sai do parser já sem as entidades
+    (&lt; &gt; &amp; &quot;): é lido direto como XML, sem as cópias intermediárias do
+    replace. Se o conteúdo não estiver escapado (ou não houver <string>), os elementos
+    do próprio envelope são percorridos.
+    """
+    raiz = _envelope(response_text)
+    elemento = _elemento_string(raiz)
+    if elemento is not None and len(elemento) == 0:
+        raiz = _xml(elemento.text or "")
+    if raiz is None:
+        return iter(())
+    return etree.iterwalk(raiz, events=("start", "end"))
+
+
+def analisar_divida(response_text) -> Dict:
+    """
+    Resposta de ObterDividaAtivaPorCPF → estrutura usada na correspondência por data:
+
+    - id_cliente_raiz: IdCliente (primeiro) do primeiro ClienteDivida em que ele é numérico
+    - blocos: [(data_pagamento, id_acordo, identificador)] dos DividaAtiva com DataPagamento
+    - global_id_cliente / global_id_acordo / global_identificador: primeiros valores
+      não-zero no documento inteiro
+    - total_blocos: quantidade de DividaAtiva (com ou sem DataPagamento)
+    """
+    return _analisar_divida_eventos(_eventos(response_text))
+
+
+def analisar_divida_utf8(conteudo) -> Dict:
+    """analisar_divida de um texto em UTF-8 (bytes/memoryview entregues pelo core.cpu_executor)"""
+    return analisar_divida(str(conteudo, "utf-8"))
+
+
+def _analisar_divida_eventos(eventos) -> Dict:
+    id_cliente_raiz = None
+    globais = dict.fromkeys(CAMPOS_ID, 0)
+    blocos_abertos = []   # DividaAtiva em aberto: {campo: primeiro texto}
+    clientes_abertos = []  # ClienteDivida em aberto: primeiro IdCliente já visto?
+    blocos = []
+
+    for evento, elem in eventos:
+        nome = _nome_local(elem.tag)
+
+        if evento == "start":
+            if nome == "DividaAtiva":
+                bloco = {}
+                blocos_abertos.append(bloco)
+                blocos.append(bloco)
+            elif nome == "ClienteDivida":
+                clientes_abertos.append(False)
+            continue
+
+        if nome == "DividaAtiva":
+            blocos_abertos.pop()
+        elif nome == "ClienteDivida":
+            clientes_abertos.pop()
+        elif nome in CAMPOS_ID or nome == "DataPagamento":
+            texto = _texto(elem)
+            for bloco in blocos_abertos:
+                bloco.setdefault(nome, texto)
+
+            if nome in CAMPOS_ID:
+                valor = _inteiro(texto)
+                if valor and not globais[nome]:
+                    globais[nome] = valor
+                if nome == "IdCliente":
+                    # Só o primeiro IdCliente de cada ClienteDivida conta para a raiz
+                    for posicao, visto in enumerate(clientes_abertos):
+                        if not visto:
+                            clientes_abertos[posicao] = True
+                            if id_cliente_raiz is None and valor is not None:
+                                id_cliente_raiz = valor
+
+        # Libera a memória dos elementos já lidos
+        if not blocos_abertos and not clientes_abertos:
+            elem.clear(keep_tail=True)
+
+    return {
+        'id_cliente_raiz': id_cliente_raiz or 0,
+        'blocos': [
+            (bloco['DataPagamento'].strip(),
+             _inteiro(bloco.get('IdAcordo')) or 0,
+             _inteiro(bloco.get('Identificador')) or 0)
+            for bloco in blocos if bloco.get('DataPagamento')
+        ],
+        'global_id_cliente': globais['IdCliente'],
+        'global_id_acordo': globais['IdAcordo'],
+        'global_identificador': globais['Identificador'],
+        'total_blocos': len(blocos),
+    }
+
+
+def extrair_blocos_divida(response_text) -> List[Dict[str, str]]:
+    """Cada DividaAtiva como dicionário {campo filho: texto}, na ordem do documento"""
+    return _extrair_blocos_eventos(_eventos(response_text))
+
+
+def _extrair_blocos_eventos(eventos) -> List[Dict[str, str]]:
+    blocos = []
+    profundidade = 0  # Profundidade relativa ao DividaAtiva mais externo em aberto
+    atual = None
+
+    for evento, elem in eventos:
+        nome = _nome_local(elem.tag)
+        if evento == "start":
+            if atual is not None:
+                profundidade += 1
+            elif nome == "DividaAtiva":
+                atual = {}
+                profundidade = 0
+            continue
+
+        if atual is None:
+            continue
+        if profundidade == 0:
+            blocos.append(atual)
+            atual = None
+            elem.clear(keep_tail=True)
+        else:
+            if profundidade == 1 and nome:
+                atual[nome] = _texto(elem).strip()
+            profundidade -= 1
+
+    return blocos
+
+
+def extrair_texto_string(content) -> Optional[str]:
+    """Texto do primeiro elemento <string> do envelope (já sem as entidades XML)"""
+    elemento = _elemento_string(_envelope(content))
+    if elemento is None:
+        return None
+    return _texto(elemento)
@@ -0,0 +1,207 @@
+"""
+Pool de Sessões HTTP
+Mantém sessões requests vivas entre lotes para reaproveitar conexões keep-alive
+"""
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from core.rate_limiter import limitador
+
+
+# Observadores de requisições: callback(url, status_code, latencia_segundos, erro)
+# status_code é None quando a requisição falhou com exceção (timeout, conexão...);
+# latencia_segundos é None para tentativas intermediárias retentadas pelo urllib3
+_observadores = []
+_observadores_lock = threading.Lock()
+
+
+def adicionar_observador(callback: Callable):
+    """Registra um callback chamado ao fim de cada requisição feita por AdaptadorObservado"""
+    with _observadores_lock:
+        _observadores.append(callback)
+
+
+def remover_observador(callback: Callable):
+    with _observadores_lock:
+        if callback in _observadores:
+            _observadores.remove(callback)
+
+
+# URL do envio em andamento em cada thread: o urllib3 refaz as tentativas na mesma thread do send
+_envio = threading.local()
+
+
+class RetryLimitado(Retry):
+    """Retry do urllib3 em que cada nova tentativa também consome um token do limitador do endpoint"""
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        url = getattr(_envio, 'url', None)
+        if url:
+            limitador.adquirir(url)
+
+
+class AdaptadorObservado(HTTPAdapter):
+    """HTTPAdapter que respeita o limitador de taxa do endpoint, mede cada envio e notifica os observadores"""
+
+    def send(self, request, *args, **kwargs):
+        # A espera no token bucket fica fora da latência medida (a das novas tentativas, em RetryLimitado, não)
+        limitador.adquirir(request.url)
+        inicio = time.perf_counter()
+        _envio.url = request.url
+        try:
+            resposta = super().send(request, *args, **kwargs)
+        except Exception as e:
+            self._notificar(request.url, None, time.perf_counter() - inicio, e)
+            raise
+        finally:
+            _envio.url = None
+        # Status absorvidos pelo Retry do urllib3 (429/5xx retentados) também são sinais de sobrecarga
+        retries = getattr(resposta.raw, 'retries', None)
+        for tentativa in getattr(retries, 'history', ()) or ():
+            if tentativa.status is not None:
+                self._notificar(request.url, tentativa.status, None, None)
+        self._notificar(request.url, resposta.status_code, time.perf_counter() - inicio, None)
+        return resposta
+
+    @staticmethod
+    def _notificar(url, status, latencia, erro):
+        if not _observadores:
+            return
+        with _observadores_lock:
+            callbacks = list(_observadores)
+        for callback in callbacks:
+            try:
+                callback(url, status, latencia, erro)
+            except Exception:
+                pass  # Observador nunca deve derrubar a requisição
+
+
+def criar_sessao(user_agent: str = "Python4Work/2.0", pool_maxsize: int = 10,
+                 retries: int = 3) -> requests.Session:
+    """Cria uma sessão HTTP com retry automático (retries=0 desativa) e pool de conexões"""
+    session = requests.Session()
+
+    retry_strategy = RetryLimitado(
+        total=retries,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+    ) if retries else 0
+    adapter = AdaptadorObservado(
+        max_retries=retry_strategy,
+        pool_connections=pool_maxsize,
+        pool_maxsize=pool_maxsize,
+        pool_block=False
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    session.headers.update({
+        'Connection': 'keep-alive',
+        'User-Agent': user_agent,
+        'Accept-Encoding': 'gzip, deflate'
+    })
+    return session
+
+
+class PoolSessoesHTTP:
+    """
+    Pool de sessões compartilhado entre threads.
+
+    Cada worker pega uma sessão emprestada (`with pool.sessao() as s:`) e a devolve ao
+    terminar. As sessões sobrevivem entre lotes e executores, então a conexão TCP aberta
+    na primeira requisição é reutilizada nas seguintes. O pool cresce sob demanda até
+    `max_sessoes` (normalmente igual a max_workers).
+    """
+
+    def __init__(self, max_sessoes: int = 25, fabrica: Optional[Callable[[], requests.Session]] = None):
+        self.max_sessoes = max_sessoes
+        self.fabrica = fabrica or criar_sessao
+        # LIFO: a sessão devolvida por último é a que tem conexão mais "quente"
+        self._livres = queue.LifoQueue()
+        self._sessoes = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def sessao(self):
+        """Empresta uma sessão do pool pelo tempo do bloco with"""
+        sessao = self._obter()
+        try:
+            yield sessao
+        finally:
+            self._livres.put(sessao)
+
+    def _obter(self) -> requests.Session:
+        try:
+            return self._livres.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            if len(self._sessoes) < self.max_sessoes:
+                sessao = self.fabrica()
+                self._sessoes.append(sessao)
+                return sessao
+
+        # Pool cheio: aguarda uma sessão ser devolvida
+        return self._livres.get()
+
+    def redimensionar(self, max_sessoes: int):
+        """Ajusta o tamanho máximo (sessões já criadas são mantidas)"""
+        with self._lock:
+            self.max_sessoes = max(max_sessoes, 1)
+
+    def estatisticas(self) -> Dict[str, float]:
+        """
+        Estatísticas de reuso de conexão somadas de todas as sessões.
+
+        conexoes_novas conta handshakes TCP (urllib3 num_connections) e requisicoes conta
+        todas as requisições enviadas, incluindo retries; a diferença foi atendida por
+        conexões já abertas.
+        """
+        conexoes_novas = 0
+        requisicoes = 0
+        with self._lock:
+            sessoes = list(self._sessoes)
+
+        for sessao in sessoes:
+            for adapter in set(sessao.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for chave in list(pools.keys()):
+                    pool = pools.get(chave)
+                    if pool is None:
+                        continue
+                    conexoes_novas += getattr(pool, 'num_connections', 0)
+                    requisicoes += getattr(pool, 'num_requests', 0)
+
+        reutilizadas = max(requisicoes - conexoes_novas, 0)
+        return {
+            'sessoes': len(sessoes),
+            'requisicoes': requisicoes,
+            'conexoes_novas': conexoes_novas,
+            'conexoes_reutilizadas': reutilizadas,
+            'taxa_reuso': (reutilizadas / requisicoes * 100) if requisicoes else 0.0
+        }
+
+    def fechar(self):
+        """Fecha todas as sessões e esvazia o pool"""
+        with self._lock:
+            for sessao in self._sessoes:
+                sessao.close()
+            self._sessoes = []
+            self._livres = queue.LifoQueue()
+
+
+def formatar_estatisticas_conexoes(stats: Dict[str, float]) -> str:
+    """Resumo de uma linha para logs e barra de status"""
+    return (f"🔌 Conexões: {stats.get('conexoes_novas', 0)} novas, "
+            f"{stats.get('conexoes_reutilizadas', 0)} reutilizadas "
+            f"({stats.get('taxa_reuso', 0.0):.1f}% reuso)")
@@ -0,0 +1,102 @@
+"""
+Índice de Datas de Pagamento
+Resposta de ObterDividaAtivaPorCPF compilada em data → (IdCliente, IdAcordo), e datas da planilha normalizadas por coluna
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from core.easycollector_parser import analisar_divida_utf8
+
+# Número de série do Excel: dias desde 30/12/1899, até 31/12/9999
+EPOCA_EXCEL = pd.Timestamp("1899-12-30")
+SERIE_EXCEL_MAXIMA = 2958465
+
+
+class IndiceDatasDivida:
+    """
+    Correspondência por data de pagamento já resolvida para todas as datas da resposta:
+
+    - com data alvo: o primeiro bloco da data que resolva algum código (IdAcordo, senão
+      Identificador); com IdCliente na raiz, o primeiro bloco da data encerra a busca
+    - sem data alvo: todos os blocos (o último IdAcordo não-zero prevalece, senão o
+      primeiro Identificador)
+    - nada encontrado: busca global (IdCliente, IdAcordo e, por fim, Identificador)
+
+    corresponder(data) é um acesso a dicionário, qualquer que seja o número de blocos.
+    """
+
+    __slots__ = ("por_data", "sem_data", "data_ausente", "datas", "total_blocos", "id_cliente_raiz")
+
+    def __init__(self, dados: Dict):
+        raiz = dados['id_cliente_raiz']
+        busca_global = (dados['global_id_cliente'], dados['global_id_acordo'] or dados['global_identificador'])
+
+        def resolver(id_acordo):
+            return busca_global if raiz == 0 and id_acordo == 0 else (raiz, id_acordo)
+
+        # Por data: código do primeiro bloco decisivo (com raiz, o primeiro bloco da data já é)
+        codigos: Dict[str, int] = {}
+        ultimo_acordo = primeiro_identificador = 0
+        for data, id_acordo, identificador in dados['blocos']:
+            codigo = id_acordo or identificador
+            chave = data[:10]
+            if chave not in codigos or (raiz == 0 and codigos[chave] == 0):
+                codigos[chave] = codigo
+            ultimo_acordo = id_acordo or ultimo_acordo
+            primeiro_identificador = primeiro_identificador or identificador
+
+        self.por_data: Dict[str, Tuple[int, int]] = {chave: resolver(codigo) for chave, codigo in codigos.items()}
+        self.sem_data = resolver(ultimo_acordo or primeiro_identificador)
+        self.data_ausente = resolver(0)
+        self.datas: List[str] = [data for data, _, _ in dados['blocos']]
+        self.total_blocos = dados['total_blocos']
+        self.id_cliente_raiz = raiz
+
+    def corresponder(self, data_iso: Optional[str] = None) -> Tuple[int, int, List[str]]:
+        """(id_cliente, id_acordo, datas de todos os blocos) para a data alvo já normalizada (None = sem data)"""
+        if not data_iso:
+            id_cliente, id_acordo = self.sem_data
+        else:
+            id_cliente, id_acordo = self.por_data.get(data_iso[:10], self.data_ausente)
+        return id_cliente, id_acordo, self.datas
+
+
+def indexar_divida_utf8(conteudo) -> IndiceDatasDivida:
+    """Parse + índice de uma resposta em UTF-8: roda nos processos do core.cpu_executor e devolve só o índice"""
+    return IndiceDatasDivida(analisar_divida_utf8(conteudo))
+
+
+def normalizar_datas_series(serie: pd.Series) -> pd.Series:
+    """
+    Datas de pagamento da planilha em 'AAAA-MM-DD', uma vez para a coluna inteira:
+    'AAAA-MM-DD[ hh:mm:ss]', datetime, 'dd/mm/aaaa[ hh:mm]' e número de série do Excel.
+    Vazio → None; formato não reconhecido → os 10 primeiros caracteres (não casa com nenhuma data).
+    """
+    brutos = serie.astype(str)
+    textos = brutos.str.strip()
+    vazio = serie.isna() | textos.eq('')
+    resultado = brutos.str[:10].astype(object)
+
+    iso = textos.str.match(r'\d{4}-\d{2}-\d{2}').fillna(False)
+    resultado[iso] = textos[iso].str[:10]
+
+    partes = textos.str.extract(r'^(\d{1,2})/(\d{1,2})/(\d{4})')
+    brasileiro = partes[0].notna() & ~iso
+    resultado[brasileiro] = (partes.loc[brasileiro, 2] + '-' + partes.loc[brasileiro, 1].str.zfill(2)
+                             + '-' + partes.loc[brasileiro, 0].str.zfill(2))
+
+    numeros = pd.to_numeric(textos.where(~(iso | brasileiro | vazio)), errors='coerce')
+    serial = numeros.between(1, SERIE_EXCEL_MAXIMA)
+    if serial.any():
+        dias = pd.to_timedelta(numeros[serial].floordiv(1), unit='D')
+        resultado[serial] = (EPOCA_EXCEL + dias).dt.strftime('%Y-%m-%d')
+
+    resultado[vazio] = None
+    return resultado
+
+
+def normalizar_data(valor: Any) -> Optional[str]:
+    """normalizar_datas_series para um valor só"""
+    return normalizar_datas_series(pd.Series([valor], dtype=object)).iloc[0]
@@ -0,0 +1,264 @@
+"""
+Métricas das Chamadas ao EasyCollector
+Registro em memória por endpoint: status, bytes, retries e histogramas (estilo HDR) de latência de rede e de parse
+"""
+
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Histograma: valores em microssegundos, 2^BITS_SUBFAIXA baldes lineares por potência de 2
+# (erro relativo máximo de 1/2^(BITS_SUBFAIXA-1) ≈ 1,6%)
+BITS_SUBFAIXA = 7
+PERCENTIS = (50, 90, 95, 99)
+
+# Status de chamadas atendidas pelo cache de respostas (sem rede)
+STATUS_CACHE = "cache"
+
+# Intervalos sem chamadas maiores que isto (segundos) não contam na vazão: o usuário estava ocioso
+LACUNA_OCIOSA = 5.0
+
+
+def nome_endpoint(url: str) -> str:
+    """Último trecho do caminho da URL (ex.: 'ObterDividaAtivaPorCPF')"""
+    url = str(url or "").split("?", 1)[0].rstrip("/")
+    return url.rsplit("/", 1)[-1] or url
+
+
+def retries_urllib3(resposta) -> int:
+    """Tentativas refeitas pelo Retry do urllib3 dentro de uma resposta do requests"""
+    retries = getattr(getattr(resposta, 'raw', None), 'retries', None)
+    return len(getattr(retries, 'history', ()) or ())
+
+
+class HistogramaHDR:
+    """
+    Histograma log-linear de inteiros não negativos: até 2^BITS_SUBFAIXA o balde é o próprio
+    valor; acima, cada potência de 2 é dividida em 2^(BITS_SUBFAIXA-1) baldes iguais.
+    Memória e custo de registrar constantes; percentis com precisão relativa fixa.
+    """
+
+    __slots__ = ("baldes", "quantidade", "soma", "minimo", "maximo")
+
+    def __init__(self):
+        self.baldes: List[int] = []
+        self.quantidade = 0
+        self.soma = 0
+        self.minimo = 0
+        self.maximo = 0
+
+    @staticmethod
+    def _indice(valor: int) -> int:
+        expoente = valor.bit_length() - BITS_SUBFAIXA
+        if expoente <= 0:
+            return valor
+        metade = 1 << (BITS_SUBFAIXA - 1)
+        return (1 << BITS_SUBFAIXA) + (expoente - 1) * metade + (valor >> expoente) - metade
+
+    @staticmethod
+    def _valor(indice: int) -> int:
+        """Ponto médio do balde"""
+        if indice < (1 << BITS_SUBFAIXA):
+            return indice
+        metade = 1 << (BITS_SUBFAIXA - 1)
+        expoente, resto = divmod(indice - (1 << BITS_SUBFAIXA), metade)
+        expoente += 1
+        return ((metade + resto) << expoente) + (1 << (expoente - 1))
+
+    def registrar(self, valor: int):
+        valor = max(int(valor), 0)
+        indice = self._indice(valor)
+        if indice >= len(self.baldes):
+            self.baldes.extend([0] * (indice + 1 - len(self.baldes)))
+        self.baldes[indice] += 1
+        if not self.quantidade or valor < self.minimo:
+            self.minimo = valor
+        self.maximo = max(self.maximo, valor)
+        self.quantidade += 1
+        self.soma += valor
+
+    def percentil(self, p: float) -> int:
+        if not self.quantidade:
+            return 0
+        alvo = max(1, -(-self.quantidade * p // 100))
+        acumulado = 0
+        for indice, contagem in enumerate(self.baldes):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return min(max(self._valor(indice), self.minimo), self.maximo)
+        return self.maximo
+
+    def resumo(self, escala: float = 1.0) -> Dict[str, float]:
+        """quantidade, média, mínimo, máximo e PERCENTIS, com os valores divididos por `escala`"""
+        dados = {
+            'quantidade': self.quantidade,
+            'media': round(self.soma / self.quantidade / escala, 3) if self.quantidade else 0.0,
+            'minimo': round(self.minimo / escala, 3),
+            'maximo': round(self.maximo / escala, 3),
+        }
+        for p in PERCENTIS:
+            dados[f'p{p}'] = round(self.percentil(p) / escala, 3)
+        return dados
+
+
+class MetricasEndpoint:
+    """Agregados de um endpoint (acesso protegido pelo lock do RegistroMetricas)"""
+
+    def __init__(self):
+        self.chamadas = 0
+        self.erros = 0
+        self.cache = 0
+        self.retries = 0
+        self.bytes = 0
+        self.por_status: Counter = Counter()
+        self.rede = HistogramaHDR()
+        self.parse = HistogramaHDR()
+        self.primeira: Optional[float] = None
+        self.ultima: Optional[float] = None
+        self.ativo = 0.0
+
+    def resumo(self) -> Dict:
+        tempo_rede = self.rede.soma / 1e6
+        tempo_parse = self.parse.soma / 1e6
+        return {
+            'chamadas': self.chamadas,
+            'erros': self.erros,
+            'cache_hits': self.cache,
+            'taxa_cache': round(self.cache / self.chamadas * 100, 1) if self.chamadas else 0.0,
+            'retries': self.retries,
+            'bytes': self.bytes,
+            'por_status': dict(self.por_status),
+            'inicio': self.primeira,
+            'fim': self.ultima,
+            'tempo_ativo_s': round(self.ativo, 3),
+            'chamadas_por_seg': round(self.chamadas / self.ativo, 2) if self.ativo > 0 else 0.0,
+            'tempo_rede_s': round(tempo_rede, 3),
+            'tempo_parse_s': round(tempo_parse, 3),
+            'rede_ms': self.rede.resumo(1000.0),
+            'parse_ms': self.parse.resumo(1000.0),
+        }
+
+
+class Chamada:
+    """
+    Uma chamada lógica (com as suas tentativas), medida por quem a faz:
+
+        with metricas.chamada(URL) as chamada:
+            chamada.iniciar_rede()             # antes de cada tentativa
+            resposta = session.post(...)
+            chamada.fim_rede(resposta.status_code, len(resposta.content))
+            ... parse ...
+            chamada.fim_parse()
+
+    Na saída do with ela é registrada; uma exceção sem status definido vira o status.
+    """
+
+    __slots__ = ("registro", "endpoint", "status", "bytes", "retries", "rede", "parse", "_marca")
+
+    def __init__(self, registro: "RegistroMetricas", endpoint: str):
+        self.registro = registro
+        self.endpoint = endpoint
+        self.status = None
+        self.bytes = 0
+        self.retries = 0
+        self.rede = 0.0
+        self.parse = 0.0
+        self._marca = time.perf_counter()
+
+    def iniciar_rede(self):
+        self._marca = time.perf_counter()
+
+    def fim_rede(self, status, tamanho: int = 0, retries: int = 0):
+        agora = time.perf_counter()
+        self.rede += agora - self._marca
+        self._marca = agora
+        self.status = status
+        self.bytes += tamanho
+        self.retries += retries
+
+    def falha(self, erro: BaseException):
+        """Tentativa encerrada por exceção (timeout, conexão): o tempo conta como rede"""
+        self.fim_rede(type(erro).__name__)
+
+    def do_cache(self):
+        self.status = STATUS_CACHE
+        self._marca = time.perf_counter()
+
+    def fim_parse(self):
+        agora = time.perf_counter()
+        self.parse += agora - self._marca
+        self._marca = agora
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, erro, _tb):
+        if erro is not None and self.status is None:
+            self.falha(erro)
+        self.registro.registrar(self)
+        return False
+
+
+class RegistroMetricas:
+    """Métricas de todas as chamadas do processo, por endpoint; resumo() vai para logs/sessions"""
+
+    def __init__(self):
+        self._endpoints: Dict[str, MetricasEndpoint] = {}
+        self._lock = threading.Lock()
+
+    def chamada(self, url: str) -> Chamada:
+        return Chamada(self, nome_endpoint(url))
+
+    def registrar(self, chamada: Chamada):
+        status = chamada.status
+        agora = time.time()
+        with self._lock:
+            dados = self._endpoints.get(chamada.endpoint)
+            if dados is None:
+                dados = self._endpoints[chamada.endpoint] = MetricasEndpoint()
+            dados.chamadas += 1
+            if dados.ultima is not None and agora - dados.ultima < LACUNA_OCIOSA:
+                dados.ativo += agora - dados.ultima
+            dados.primeira = dados.primeira or agora
+            dados.ultima = agora
+            dados.por_status[str(status)] += 1
+            dados.retries += chamada.retries
+            dados.bytes += chamada.bytes
+            if status == STATUS_CACHE:
+                dados.cache += 1
+            else:
+                dados.rede.registrar(chamada.rede * 1e6)
+                if not isinstance(status, int) or status >= 400:
+                    dados.erros += 1
+            if chamada.parse:
+                dados.parse.registrar(chamada.parse * 1e6)
+
+    def resumo(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {endpoint: dados.resumo() for endpoint, dados in self._endpoints.items()}
+
+    def resumo_linha(self, url: Optional[str] = None) -> str:
+        """Uma linha para a área de progresso: percentis de rede/parse do endpoint (ou do mais usado)"""
+        with self._lock:
+            if url is not None:
+                endpoint = nome_endpoint(url)
+                dados = self._endpoints.get(endpoint)
+            else:
+                endpoint, dados = max(self._endpoints.items(), key=lambda item: item[1].chamadas,
+                                      default=(None, None))
+            if dados is None:
+                return ""
+            rede = {p: dados.rede.percentil(p) / 1000 for p in (50, 95, 99)}
+            parse = dados.parse.percentil(50) / 1000
+            chamadas, erros, cache, retries = dados.chamadas, dados.erros, dados.cache, dados.retries
+        return (f"📶 {endpoint}: rede p50 {rede[50]:.0f} ms | p95 {rede[95]:.0f} ms | p99 {rede[99]:.0f} ms | "
+                f"parse p50 {parse:.1f} ms | {chamadas} chamadas, {erros} erros, {cache} do cache, {retries} retries")
+
+    def reiniciar(self):
+        with self._lock:
+            self._endpoints.clear()
+
+
+# Instância única do processo, como o limitador de core.rate_limiter
+metricas = RegistroMetricas()
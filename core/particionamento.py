@@ -0,0 +1,166 @@
+"""
+Partições em Disco
+Linhas espalhadas por hash de uma coluna em arquivos temporários (Parquet com pyarrow, senão pickle), para processar planilhas maiores que a memória
+"""
+
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from core.config_manager import carregar_config_projeto
+
+try:
+    import pyarrow  # noqa: F401  Opcional: partições em Parquet, menores que o pickle
+except ImportError:
+    pyarrow = None
+
+MB = 1024 * 1024
+
+# Baldes de hash: as partições são montadas juntando baldes até o limite de memória
+BALDES_PADRAO = 128
+
+# Fração do limite de memória usada para acumular linhas antes de gravar os baldes
+FRACAO_BUFFER = 0.25
+
+
+def limite_memoria(config=None) -> int:
+    """performance.memory_limit_mb em bytes"""
+    config = config or carregar_config_projeto()
+    return int(config.get('performance.memory_limit_mb', 512) or 512) * MB
+
+
+def motor_particoes() -> str:
+    return "parquet" if pyarrow is not None else "pickle"
+
+
+def hash_chave(serie: pd.Series) -> np.ndarray:
+    """
+    Hash estável (igual em qualquer processo) dos valores da coluna.
+    Valores numéricos são comparados como float, para que 123, 123.0 e '123'
+    (tipos diferentes entre blocos lidos) caiam sempre no mesmo balde.
+    """
+    numeros = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float)
+    textos = serie.astype(object).where(serie.notna(), '').astype(str).to_numpy(dtype=object)
+    return np.where(np.isnan(numeros), pd.util.hash_array(textos), pd.util.hash_array(numeros))
+
+
+def gravar_parte(df: pd.DataFrame, caminho_base: str) -> str:
+    """Grava uma parte em Parquet (com pyarrow) ou pickle; colunas com tipos mistos caem no pickle"""
+    if pyarrow is not None:
+        caminho = caminho_base + '.parquet'
+        try:
+            df.to_parquet(caminho, index=False)
+            return caminho
+        except (pyarrow.ArrowException, TypeError, ValueError):
+            if os.path.exists(caminho):
+                os.remove(caminho)
+    caminho = caminho_base + '.pkl'
+    with open(caminho, 'wb') as arquivo:
+        pickle.dump(df, arquivo, protocol=pickle.HIGHEST_PROTOCOL)
+    return caminho
+
+
+def ler_parte(caminho: str) -> pd.DataFrame:
+    if caminho.endswith('.parquet'):
+        return pd.read_parquet(caminho)
+    with open(caminho, 'rb') as arquivo:
+        return pickle.load(arquivo)
+
+
+def ler_particao(arquivos: List[str], tipos: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """
+    Junta as partes de uma partição. `tipos` (DataFrame vazio) devolve às colunas os
+    tipos da planilha inteira, que uma partição sozinha pode não ter (ex.: int sem os vazios).
+    """
+    partes = [ler_parte(caminho) for caminho in arquivos]
+    df = pd.concat(partes, ignore_index=True) if len(partes) != 1 else partes[0]
+    if tipos is not None:
+        df = df.reindex(columns=tipos.columns)
+        diferentes = {c: t for c, t in tipos.dtypes.items() if df[c].dtype != t}
+        if diferentes:
+            df = df.astype(diferentes)
+    return df
+
+
+class ArmazemParticoes:
+    """
+    Baldes de linhas em disco, escolhidos pelo hash de uma coluna: linhas com a mesma
+    chave sempre acabam no mesmo balde.
+
+    - adicionar: recebe blocos (ex.: ler_blocos) e só grava quando o buffer passa de
+      `limite_buffer` bytes, gerando poucos arquivos por balde
+    - particoes: junta baldes vizinhos em partições de até `limite_particao` bytes em memória
+    - a pasta temporária é apagada ao sair do `with` (ou em fechar)
+    """
+
+    def __init__(self, coluna: str, limite_buffer: int, baldes: int = BALDES_PADRAO,
+                 pasta: Optional[str] = None):
+        self.coluna = coluna
+        self.limite_buffer = limite_buffer
+        self.baldes = baldes
+        self.pasta = tempfile.mkdtemp(prefix='particoes_', dir=pasta)
+        self.linhas = 0
+        self.tipos: Optional[pd.DataFrame] = None
+        self.bytes_balde = np.zeros(baldes, dtype=np.int64)
+        self.arquivos: Dict[int, List[str]] = {}
+        self._buffer: Dict[int, List[pd.DataFrame]] = {}
+        self._bytes_buffer = 0
+        self._gravacoes = 0
+
+    def adicionar(self, bloco: pd.DataFrame):
+        if bloco.empty:
+            return
+        # Tipos comuns a todos os blocos, como o pd.concat da leitura completa daria
+        vazio = bloco.head(0)
+        self.tipos = vazio if self.tipos is None else pd.concat([self.tipos, vazio])
+        self.linhas += len(bloco)
+
+        balde = (hash_chave(bloco[self.coluna]) % np.uint64(self.baldes)).astype(np.int64)
+        for numero, parte in bloco.groupby(balde, sort=False):
+            tamanho = int(parte.memory_usage(index=False, deep=True).sum())
+            self._buffer.setdefault(numero, []).append(parte)
+            self.bytes_balde[numero] += tamanho
+            self._bytes_buffer += tamanho
+        if self._bytes_buffer >= self.limite_buffer:
+            self.descarregar()
+
+    def descarregar(self):
+        """Grava o buffer: um arquivo por balde com linhas pendentes"""
+        for numero, partes in self._buffer.items():
+            df = pd.concat(partes, ignore_index=True) if len(partes) > 1 else partes[0]
+            base = os.path.join(self.pasta, f'balde_{numero:04d}_{self._gravacoes:05d}')
+            self.arquivos.setdefault(numero, []).append(gravar_parte(df, base))
+        self._buffer = {}
+        self._bytes_buffer = 0
+        self._gravacoes += 1
+
+    def particoes(self, limite_particao: int) -> List[List[str]]:
+        """Arquivos de cada partição: baldes somados até `limite_particao` (um balde maior fica sozinho)"""
+        self.descarregar()
+        particoes, atual, bytes_atual = [], [], 0
+        for numero in sorted(self.arquivos):
+            tamanho = int(self.bytes_balde[numero])
+            if atual and bytes_atual + tamanho > limite_particao:
+                particoes.append(atual)
+                atual, bytes_atual = [], 0
+            atual.extend(self.arquivos[numero])
+            bytes_atual += tamanho
+        if atual:
+            particoes.append(atual)
+        return particoes
+
+    def fechar(self):
+        self._buffer = {}
+        shutil.rmtree(self.pasta, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento):
+        self.fechar()
+        return False
@@ -1,23 +1,210 @@
 """
 Sistema de Logging Profissional
-Implementa logging estruturado com rotação e níveis configuráveis
+Implementa logging estruturado com rotação e níveis configuráveis, gravado por uma fila em segundo plano
 """
 
+import atexit
+import itertools
 import logging
 import logging.handlers
 import os
+import queue
 import sys
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import json
 from pathlib import Path
 
+from core.config_manager import carregar_config_projeto
+from core.metricas import metricas
+
+# Rastro por linha dos módulos de consulta (obter_rastreador): linhas com debug detalhado
+AMOSTRA_RASTRO_PADRAO = 5
+
+# Fila entre quem registra e o QueueListener que grava (logging.queue_size / logging.queue_policy)
+TAMANHO_FILA_PADRAO = 10000
+POLITICAS_FILA = ("drop", "block")
+
+
+class FilaSemFormatacao(logging.handlers.QueueHandler):
+    """
+    QueueHandler que só enfileira o registro: a mensagem ('%s' + args) é montada pelos
+    handlers na thread do QueueListener, nunca na thread de trabalho.
+
+    Fila cheia: com politica="drop" registros abaixo de ERROR são descartados (e contados);
+    ERROR/CRITICAL e politica="block" esperam vaga. Em nenhum caso a thread espera o disco.
+    """
+
+    def __init__(self, fila: queue.Queue, politica: str = "drop"):
+        super().__init__(fila)
+        self.politica = politica
+        self.descartados = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.politica == "block" or record.levelno >= logging.ERROR:
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+class OuvinteFila(logging.handlers.QueueListener):
+    """QueueListener cujo sentinela de parada espera vaga numa fila limitada cheia"""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class FilaLogging:
+    """
+    Fila limitada + uma thread (QueueListener) gravando nos handlers reais.
+
+    anexar(logger) troca os handlers do logger pelo handler da fila; encerrar() devolve os
+    handlers reais aos loggers anexados (quem registrar depois grava direto) e só então
+    para a thread, que grava o que ainda estava na fila.
+    """
+
+    def __init__(self, handlers: List[logging.Handler], tamanho: int = TAMANHO_FILA_PADRAO,
+                 politica: str = "drop"):
+        self.handlers = list(handlers)
+        self.handler = FilaSemFormatacao(queue.Queue(maxsize=max(int(tamanho), 0)),
+                                         politica if politica in POLITICAS_FILA else "drop")
+        self.nivel = min((h.level for h in self.handlers), default=logging.CRITICAL)
+        self._loggers: List[logging.Logger] = []
+        self._ouvinte = OuvinteFila(self.handler.queue, *self.handlers, respect_handler_level=True)
+        self._ouvinte.start()
+
+    def anexar(self, logger: logging.Logger):
+        for existente in list(logger.handlers):
+            logger.removeHandler(existente)
+        logger.addHandler(self.handler)
+        self._loggers.append(logger)
+
+    def encerrar(self):
+        for logger in self._loggers:
+            if self.handler in logger.handlers:
+                logger.removeHandler(self.handler)
+                for handler in self.handlers:
+                    logger.addHandler(handler)
+        self._loggers = []
+        self._ouvinte.stop()
+        if self.handler.descartados:
+            aviso = logging.LogRecord("python4work.fila", logging.WARNING, __file__, 0,
+                                      "⚠️ Fila de logging cheia: %s registros descartados",
+                                      (self.handler.descartados,), None, func="encerrar")
+            self._ouvinte.handle(aviso)
+        for handler in self.handlers:
+            handler.flush()
+
+
+class Rastreador:
+    """
+    Rastro das consultas linha a linha (substitui os print de depuração dos módulos de consulta).
+
+    - O nível é checado antes de qualquer formatação: as mensagens usam o estilo do logging
+      (rastro.debug("Linha %d: %s", i, valor)) e só viram texto se forem gravadas
+    - amostrado(linha) / amostrar(): o debug detalhado vale só para as primeiras `amostra`
+      linhas (ou chamadas); proteja com `if` o que for caro montar (ex.: trechos de XML)
+    - Os registros vão para uma fila: a thread de trabalho não escreve em disco nem no console
+    """
+
+    def __init__(self, nome: str):
+        self.logger = logging.getLogger(f"python4work.rastro.{nome}")
+        self.logger.propagate = False
+        self.amostra = AMOSTRA_RASTRO_PADRAO
+        self._chamadas = itertools.count()
+
+    def configurar(self, nivel: str, amostra: int):
+        self.logger.setLevel(getattr(logging, str(nivel).upper(), logging.INFO))
+        self.amostra = amostra
+        self._chamadas = itertools.count()
+
+    def depurando(self) -> bool:
+        return self.logger.isEnabledFor(logging.DEBUG)
+
+    def amostrado(self, linha: int) -> bool:
+        """Linha (índice a partir de 0) dentro da amostra de debug"""
+        return linha < self.amostra and self.logger.isEnabledFor(logging.DEBUG)
+
+    def amostrar(self) -> bool:
+        """True nas primeiras `amostra` chamadas com debug ligado (ex.: primeiros CPFs consultados)"""
+        return self.logger.isEnabledFor(logging.DEBUG) and next(self._chamadas) < self.amostra
+
+    def debug(self, mensagem: str, *args):
+        self.logger.debug(mensagem, *args)
+
+    def info(self, mensagem: str, *args):
+        self.logger.info(mensagem, *args)
+
+    def warning(self, mensagem: str, *args):
+        self.logger.warning(mensagem, *args)
+
+    def error(self, mensagem: str, *args):
+        self.logger.error(mensagem, *args)
+
+
+_rastreadores: Dict[str, Rastreador] = {}
+_filas: Dict[str, FilaLogging] = {}  # Uma por LoggerProfissional (pelo nome), ou a do console
+_FILA_CONSOLE = "python4work.rastro"
+_lock_rastro = threading.Lock()
+
+
+def _configuracao_fila(config) -> Tuple[int, str]:
+    if config is None:
+        return TAMANHO_FILA_PADRAO, "drop"
+    return (int(config.get("logging.queue_size", TAMANHO_FILA_PADRAO)),
+            str(config.get("logging.queue_policy", "drop")).lower())
+
+
+def _console_rastro() -> logging.Handler:
+    """Destino dos rastros quando nenhum LoggerProfissional foi criado (módulo executado sozinho)"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s | %(levelname)-8s | %(message)s', datefmt='%H:%M:%S'))
+    return handler
+
+
+def obter_rastreador(nome: str, config=None) -> Rastreador:
+    """
+    Rastreador do módulo (um por nome). Nível: logging.level; amostra de debug:
+    logging.trace_sample_rows. Grava pela fila do LoggerProfissional, se houver, senão no console.
+    """
+    with _lock_rastro:
+        rastreador = _rastreadores.get(nome)
+        if rastreador is None:
+            config = config or carregar_config_projeto()
+            rastreador = _rastreadores[nome] = Rastreador(nome)
+            rastreador.configurar(config.get("logging.level", "INFO"),
+                                  int(config.get("logging.trace_sample_rows", AMOSTRA_RASTRO_PADRAO)))
+            destino = next(reversed(_filas.values()), None)
+            if destino is None:
+                destino = _filas[_FILA_CONSOLE] = FilaLogging([_console_rastro()], *_configuracao_fila(config))
+            destino.anexar(rastreador.logger)
+        return rastreador
+
+
+def encerrar_logging():
+    """Grava o que está nas filas e para os QueueListener (também registrado no atexit)"""
+    with _lock_rastro:
+        filas = list(_filas.values())
+        _filas.clear()
+    for fila in filas:
+        fila.encerrar()
+
+
+atexit.register(encerrar_logging)
+
+
 class LoggerProfissional:
     def __init__(self, name: str = "Python4Work", config_manager=None):
         self.name = name
         self.config = config_manager
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(logging.DEBUG)
         
         # Evita duplicação de handlers
         if not self.logger.handlers:
@@ -36,12 +223,17 @@ class LoggerProfissional:
             backup_count = self.config.get("logging.backup_count", 5)
             log_to_console = self.config.get("logging.log_to_console", True)
             log_to_file = self.config.get("logging.log_to_file", True)
+            trace_sample_rows = self.config.get("logging.trace_sample_rows", AMOSTRA_RASTRO_PADRAO)
         else:
             log_level = "INFO"
             max_size_mb = 10
             backup_count = 5
             log_to_console = True
             log_to_file = True
+            trace_sample_rows = AMOSTRA_RASTRO_PADRAO
+        
+        # Handlers de destino: quem grava é o QueueListener, os loggers só recebem o handler da fila
+        handlers = []
         
         # Formato detalhado
         detailed_formatter = logging.Formatter(
@@ -65,14 +257,14 @@ class LoggerProfissional:
             )
             file_handler.setLevel(getattr(logging, log_level.upper()))
             file_handler.setFormatter(detailed_formatter)
-            self.logger.addHandler(file_handler)
+            handlers.append(file_handler)
         
         # Handler para console
         if log_to_console:
             console_handler = logging.StreamHandler(sys.stdout)
             console_handler.setLevel(logging.INFO)
             console_handler.setFormatter(simple_formatter)
-            self.logger.addHandler(console_handler)
+            handlers.append(console_handler)
         
         # Handler para erros críticos (sempre ativo)
         error_handler = logging.handlers.RotatingFileHandler(
@@ -83,7 +275,23 @@ class LoggerProfissional:
         )
         error_handler.setLevel(logging.ERROR)
         error_handler.setFormatter(detailed_formatter)
-        self.logger.addHandler(error_handler)
+        handlers.append(error_handler)
+        
+        # Fila limitada: info()/error() de qualquer thread só enfileiram
+        fila = FilaLogging(handlers, *_configuracao_fila(self.config))
+        # Abaixo do nível do handler mais permissivo nada é gravado: nem chega a virar registro
+        self.logger.setLevel(fila.nivel)
+        
+        # Rastros dos módulos de consulta (obter_rastreador) passam a gravar por esta mesma fila
+        with _lock_rastro:
+            console = _filas.pop(_FILA_CONSOLE, None)
+            _filas[self.name] = fila
+            fila.anexar(self.logger)
+            for rastreador in _rastreadores.values():
+                fila.anexar(rastreador.logger)
+                rastreador.configurar(log_level, trace_sample_rows)
+        if console is not None:
+            console.encerrar()
     
     def info(self, message: str, **kwargs):
         """Log informativo"""
@@ -157,6 +365,17 @@ class LoggerProfissional:
         
         return message
     
+    def rastreador(self, nome: str) -> Rastreador:
+        """Rastro por linha de um módulo, gravado por estes handlers através da fila"""
+        return obter_rastreador(nome, self.config)
+    
+    def encerrar(self):
+        """Grava o que ainda está na fila e para o QueueListener; registros posteriores gravam direto"""
+        with _lock_rastro:
+            fila = _filas.pop(self.name, None)
+        if fila is not None:
+            fila.encerrar()
+    
     def create_session_log(self, session_id: str):
         """Cria log específico para uma sessão"""
         return SessionLogger(self, session_id)
@@ -193,7 +412,9 @@ class SessionLogger:
             "duration_seconds": duration,
             "operations_count": len(self.operations),
             "operations": self.operations,
-            "custom_summary": summary or {}
+            "custom_summary": summary or {},
+            # Chamadas ao EasyCollector do processo, por endpoint (core.metricas)
+            "metrics": metricas.resumo()
         }
         
         # Salvar resumo da sessão
@@ -211,3 +432,46 @@ class SessionLogger:
         self.parent.info(f"🏁 SESSÃO FINALIZADA: {self.session_id} | Duração: {duration:.2f}s | Operações: {len(self.operations)}")
         
         return summary_data
+
+
+def ultimas_linhas(caminho, quantidade: int = 50, bloco: int = 8192) -> List[str]:
+    """Últimas `quantidade` linhas do arquivo, lendo blocos do fim para o começo (nunca o arquivo inteiro)"""
+    with open(caminho, "rb") as arquivo:
+        posicao = arquivo.seek(0, os.SEEK_END)
+        dados = b""
+        # Uma quebra a mais que o pedido: a primeira linha do trecho lido pode estar cortada
+        while posicao > 0 and dados.count(b"\n") <= quantidade:
+            passo = min(bloco, posicao)
+            posicao -= passo
+            arquivo.seek(posicao)
+            dados = arquivo.read(passo) + dados
+    if quantidade <= 0:
+        return []
+    *completas, resto = dados.split(b"\n")
+    linhas = [linha + b"\n" for linha in completas] + ([resto] if resto else [])
+    return [linha.decode("utf-8", errors="replace") for linha in linhas[-quantidade:]]
+
+
+def carregar_sessoes(pasta="logs/sessions", limite: int = 30) -> List[Dict]:
+    """
+    Resumos das últimas `limite` sessões (mais antigas primeiro) que registraram chamadas:
+    {'arquivo', 'session_id', 'data' (datetime da gravação), 'duracao_s', 'metrics'}
+    """
+    arquivos = sorted(Path(pasta).glob("*.json"), key=lambda caminho: caminho.stat().st_mtime)[-limite:]
+    sessoes = []
+    for caminho in arquivos:
+        try:
+            with open(caminho, "r", encoding="utf-8") as f:
+                dados = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if not dados.get("metrics"):
+            continue
+        sessoes.append({
+            "arquivo": caminho.name,
+            "session_id": dados.get("session_id", caminho.stem),
+            "data": datetime.fromtimestamp(caminho.stat().st_mtime),
+            "duracao_s": dados.get("duration_seconds", 0),
+            "metrics": dados["metrics"],
+        })
+    return sessoes
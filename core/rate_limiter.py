@@ -0,0 +1,127 @@
+"""
+Limitador de Taxa por Endpoint
+Token bucket compartilhado pelo processo inteiro, com orçamento separado por endpoint
+"""
+
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from core.config_manager import carregar_config_projeto
+
+
+class BaldeTokens:
+    """
+    Token bucket: `taxa` tokens por segundo, acumulando até `rajada`.
+
+    reservar() nunca bloqueia: consome um token (o saldo pode ficar negativo) e devolve
+    quantos segundos o chamador deve esperar. Assim a mesma lógica serve para threads
+    (time.sleep) e para asyncio (await asyncio.sleep), e os pedidos são atendidos em ordem.
+    """
+
+    def __init__(self, taxa: float, rajada: Optional[int] = None):
+        self.taxa = float(taxa)
+        self.rajada = float(rajada or max(taxa, 1))
+        self.tokens = self.rajada
+        self.atualizado = time.monotonic()
+        self.espera_total = 0.0
+        self.requisicoes = 0
+        self._lock = threading.Lock()
+
+    def reservar(self) -> float:
+        with self._lock:
+            agora = time.monotonic()
+            self.tokens = min(self.rajada, self.tokens + (agora - self.atualizado) * self.taxa)
+            self.atualizado = agora
+            self.tokens -= 1
+            espera = -self.tokens / self.taxa if self.tokens < 0 else 0.0
+            self.espera_total += espera
+            self.requisicoes += 1
+            return espera
+
+    def adquirir(self) -> float:
+        """Bloqueia até haver token disponível; retorna o tempo esperado"""
+        espera = self.reservar()
+        if espera > 0:
+            time.sleep(espera)
+        return espera
+
+
+class LimitadorTaxa:
+    """Registro de baldes por prefixo de URL (um orçamento por endpoint)"""
+
+    def __init__(self):
+        self._baldes: Dict[str, BaldeTokens] = {}
+        self._nomes: Dict[str, str] = {}
+        # Prefixos do mais longo ao mais curto: URL e URL_DIVIDA podem compartilhar host e caminho
+        self._ordem: Tuple[Tuple[str, BaldeTokens], ...] = ()
+        self._lock = threading.Lock()
+
+    def configurar(self, url: str, taxa: float, rajada: Optional[int] = None, nome: Optional[str] = None):
+        """Define o orçamento do endpoint; taxa <= 0 remove o limite"""
+        with self._lock:
+            if not url:
+                return
+            if taxa and taxa > 0:
+                atual = self._baldes.get(url)
+                if atual and atual.taxa == float(taxa) and atual.rajada == float(rajada or max(taxa, 1)):
+                    return  # Mesmo orçamento: mantém o saldo e as estatísticas
+                self._baldes[url] = BaldeTokens(taxa, rajada)
+                self._nomes[url] = nome or url
+            else:
+                self._baldes.pop(url, None)
+                self._nomes.pop(url, None)
+            self._ordem = tuple(sorted(self._baldes.items(), key=lambda item: len(item[0]), reverse=True))
+
+    def balde(self, url: str) -> Optional[BaldeTokens]:
+        """Balde do prefixo registrado mais longo que casa com a URL"""
+        ordem = self._ordem
+        if not ordem:
+            return None
+        url = str(url)
+        for prefixo, balde in ordem:
+            if url.startswith(prefixo):
+                return balde
+        return None
+
+    def reservar(self, url: str) -> float:
+        """Segundos que a requisição para `url` deve esperar (0 se o endpoint não tem limite)"""
+        balde = self.balde(url)
+        return balde.reservar() if balde else 0.0
+
+    def adquirir(self, url: str) -> float:
+        balde = self.balde(url)
+        return balde.adquirir() if balde else 0.0
+
+    def estatisticas(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            itens = list(self._baldes.items())
+        return {
+            self._nomes.get(url, url): {
+                'taxa': balde.taxa,
+                'rajada': balde.rajada,
+                'requisicoes': balde.requisicoes,
+                'espera_total': balde.espera_total
+            }
+            for url, balde in itens
+        }
+
+
+# Instância única do processo: todos os módulos que falam com o EasyCollector passam por aqui
+limitador = LimitadorTaxa()
+
+def registrar_endpoint(nome: str, url: str, config=None):
+    """
+    Aplica a performance.rate_limits.<nome> do config.json ao endpoint.
+
+    nome é o nome da variável de ambiente do endpoint ("URL", "URL_DIVIDA"), de modo que
+    módulos diferentes que usam a mesma URL compartilham o mesmo orçamento.
+    """
+    if not url:
+        return
+    config = config or carregar_config_projeto()
+    if not config.get('performance.rate_limit_enabled', True):
+        limitador.configurar(url, 0)
+        return
+    limites = config.get(f'performance.rate_limits.{nome}', {}) or {}
+    limitador.configurar(url, limites.get('requests_per_second', 0), limites.get('burst'), nome)
@@ -0,0 +1,221 @@
+"""
+Cache Persistente de Respostas
+SQLite em disco, chave por CPF normalizado, com TTL e limite de tamanho LRU
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from core.config_manager import carregar_config_projeto
+
+# Modos de operação
+MODO_NORMAL = "normal"        # lê e grava
+MODO_REFRESH = "refresh"      # ignora o que está salvo, mas grava as respostas novas
+MODO_BYPASS = "bypass"        # não lê nem grava
+MODOS = (MODO_NORMAL, MODO_REFRESH, MODO_BYPASS)
+
+# Cache das respostas de ObterDividaAtivaPorCPF, compartilhado por obter_divida_cpf e consulta_boleto_mensal
+CACHE_DIVIDA = "divida_cpf"
+
+PASTA_CACHE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+
+
+def normalizar_cpf(cpf) -> str:
+    """Mesma normalização de limpar_cpf: só dígitos, completado com zeros à esquerda"""
+    digitos = re.sub(r"\D", "", str(cpf or ""))
+    return digitos.zfill(11) if digitos else ""
+
+
+class CacheRespostas:
+    """
+    Cache chave → texto da resposta, compartilhado entre threads e entre execuções.
+
+    - TTL: entradas mais antigas que `ttl_segundos` são ignoradas (e removidas) na leitura
+    - LRU: ao passar de `max_entradas`, as menos acessadas recentemente são descartadas
+    - Contadores: acertos, falhas, expirados e gravações da instância (desde a criação)
+    """
+
+    def __init__(self, caminho: str, ttl_segundos: float = 4 * 3600, max_entradas: int = 50000,
+                 modo: str = MODO_NORMAL):
+        self.caminho = caminho
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self.modo = modo if modo in MODOS else MODO_NORMAL
+
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.gravacoes = 0
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(caminho)), exist_ok=True)
+        self._conexao = sqlite3.connect(caminho, check_same_thread=False, isolation_level=None)
+        self._conexao.execute("PRAGMA journal_mode=WAL")
+        self._conexao.execute("PRAGMA synchronous=NORMAL")
+        self._conexao.execute(
+            "CREATE TABLE IF NOT EXISTS respostas ("
+            " chave TEXT PRIMARY KEY, valor TEXT NOT NULL,"
+            " criado REAL NOT NULL, acessado REAL NOT NULL)"
+        )
+        self._conexao.execute("CREATE INDEX IF NOT EXISTS idx_respostas_acessado ON respostas(acessado)")
+        self._gravacoes_desde_poda = 0
+
+    def obter(self, chave: str) -> Optional[str]:
+        """Valor salvo e ainda válido, ou None (falha, expirado ou modo refresh/bypass)"""
+        if self.modo != MODO_NORMAL or not chave:
+            return None
+
+        agora = time.time()
+        with self._lock:
+            linha = self._conexao.execute(
+                "SELECT valor, criado FROM respostas WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                self.falhas += 1
+                return None
+            valor, criado = linha
+            if agora - criado > self.ttl_segundos:
+                self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+                self.expirados += 1
+                self.falhas += 1
+                return None
+            self._conexao.execute("UPDATE respostas SET acessado = ? WHERE chave = ?", (agora, chave))
+            self.acertos += 1
+            return valor
+
+    def guardar(self, chave: str, valor: str):
+        if self.modo == MODO_BYPASS or not chave or valor is None:
+            return
+
+        agora = time.time()
+        with self._lock:
+            self._conexao.execute(
+                "INSERT OR REPLACE INTO respostas (chave, valor, criado, acessado) VALUES (?, ?, ?, ?)",
+                (chave, valor, agora, agora)
+            )
+            self.gravacoes += 1
+            self._gravacoes_desde_poda += 1
+            # A poda LRU custa uma contagem: feita a cada 100 gravações, não em todas
+            if self._gravacoes_desde_poda >= 100:
+                self._podar()
+
+    def _podar(self):
+        self._gravacoes_desde_poda = 0
+        total = self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+        excesso = total - self.max_entradas
+        if excesso > 0:
+            self._conexao.execute(
+                "DELETE FROM respostas WHERE chave IN "
+                "(SELECT chave FROM respostas ORDER BY acessado ASC LIMIT ?)", (excesso,)
+            )
+
+    def invalidar(self, chave: str):
+        with self._lock:
+            self._conexao.execute("DELETE FROM respostas WHERE chave = ?", (chave,))
+
+    def limpar(self):
+        """Remove todas as entradas"""
+        with self._lock:
+            self._conexao.execute("DELETE FROM respostas")
+            self._conexao.execute("VACUUM")
+
+    def tamanho(self) -> int:
+        with self._lock:
+            return self._conexao.execute("SELECT COUNT(*) FROM respostas").fetchone()[0]
+
+    def zerar_contadores(self):
+        self.acertos = self.falhas = self.expirados = self.gravacoes = 0
+
+    def estatisticas(self) -> Dict[str, float]:
+        consultas = self.acertos + self.falhas
+        return {
+            'modo': self.modo,
+            'acertos': self.acertos,
+            'falhas': self.falhas,
+            'expirados': self.expirados,
+            'gravacoes': self.gravacoes,
+            'taxa_acerto': (self.acertos / consultas * 100) if consultas else 0.0,
+            'entradas': self.tamanho()
+        }
+
+    def fechar(self):
+        with self._lock:
+            self._conexao.close()
+
+
+class CacheDesativado:
+    """Substituto sem efeito quando performance.enable_caching está desligado"""
+
+    modo = MODO_BYPASS
+    acertos = falhas = expirados = gravacoes = 0
+
+    def obter(self, chave):
+        return None
+
+    def guardar(self, chave, valor):
+        pass
+
+    def invalidar(self, chave):
+        pass
+
+    def limpar(self):
+        pass
+
+    def tamanho(self):
+        return 0
+
+    def zerar_contadores(self):
+        pass
+
+    def estatisticas(self):
+        return {'modo': 'desativado', 'acertos': 0, 'falhas': 0, 'expirados': 0,
+                'gravacoes': 0, 'taxa_acerto': 0.0, 'entradas': 0}
+
+    def fechar(self):
+        pass
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def obter_cache(nome: str, config=None):
+    """
+    Cache compartilhado pelo processo, configurado pela seção performance:
+    enable_caching, cache_mode, cache_ttl_minutes e cache_max_entries.
+
+    Sem `config` devolve a instância já existente como está; com `config` (ex.: o da
+    interface, após o usuário editar as configurações) reaplica modo/TTL/limite.
+    """
+    with _caches_lock:
+        cache = _caches.get(nome)
+        if cache is not None and config is None:
+            return cache
+        config = config or carregar_config_projeto()
+        if not config.get('performance.enable_caching', True):
+            if not isinstance(cache, CacheDesativado):
+                if cache is not None:
+                    cache.fechar()
+                cache = _caches[nome] = CacheDesativado()
+            return cache
+
+        if not isinstance(cache, CacheRespostas):
+            cache = _caches[nome] = CacheRespostas(os.path.join(PASTA_CACHE, f"{nome}.sqlite"))
+        cache.ttl_segundos = float(config.get('performance.cache_ttl_minutes', 240)) * 60
+        cache.max_entradas = int(config.get('performance.cache_max_entries', 50000))
+        modo = config.get('performance.cache_mode', MODO_NORMAL)
+        cache.modo = modo if modo in MODOS else MODO_NORMAL
+        return cache
+
+
+def formatar_estatisticas_cache(stats: Dict[str, float]) -> str:
+    """Resumo de uma linha para logs e barra de status"""
+    if stats.get('modo') == 'desativado':
+        return "💾 Cache: desativado"
+    return (f"💾 Cache ({stats.get('modo')}): {stats.get('acertos', 0)} acertos, "
+            f"{stats.get('falhas', 0)} falhas ({stats.get('taxa_acerto', 0.0):.1f}% acerto), "
+            f"{stats.get('entradas', 0)} entradas")
@@ -0,0 +1,157 @@
+"""
+Escalonador em Janela Deslizante
+Mantém N requisições em voo continuamente e entrega cada resultado assim que termina
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+class EscalonadorJanela:
+    """
+    Substitui o padrão "fatiar em lotes + as_completed" por uma janela deslizante:
+    assim que uma tarefa termina, o próximo item entra, sem esperar o lote inteiro.
+
+    Controle pelos mesmos threading.Event usados na interface:
+    - parar_evento: não envia novos itens, entrega os que já estão em voo e encerra
+    - cancelar_evento: encerra imediatamente, descartando o que estiver em voo
+
+    on_progresso(concluidos, total, vazao_req_s, eta_segundos) é chamado no máximo a cada
+    `intervalo_progresso` segundos e uma última vez ao final (total/eta podem ser None
+    quando o iterável não tem tamanho conhecido).
+
+    max_em_voo pode ser um int fixo ou um core.concurrency.ControladorAIMD: nesse caso o
+    tamanho da janela segue controlador.limite a cada reabastecimento.
+    """
+
+    def __init__(self, max_em_voo=25,
+                 parar_evento: Optional[threading.Event] = None,
+                 cancelar_evento: Optional[threading.Event] = None,
+                 on_progresso: Optional[Callable[[int, Optional[int], float, Optional[float]], None]] = None,
+                 intervalo_progresso: float = 0.5):
+        if hasattr(max_em_voo, 'limite'):
+            self.controlador = max_em_voo
+            self.max_em_voo = self.controlador.maximo
+        else:
+            self.controlador = None
+            self.max_em_voo = max(int(max_em_voo), 1)
+        self.parar_evento = parar_evento
+        self.cancelar_evento = cancelar_evento
+        self.on_progresso = on_progresso
+        self.intervalo_progresso = intervalo_progresso
+
+        self.total = None
+        self.concluidos = 0
+        self.interrompido = False
+        self.inicio = None
+        self._ultimo_progresso = 0.0
+
+    def executar(self, itens: Iterable, funcao: Callable[[Any], Any], total: Optional[int] = None,
+                 on_erro: Optional[Callable[[Any, Exception], Any]] = None) -> Iterator[Tuple[Any, Any]]:
+        """
+        Gera (item, resultado) na ordem de conclusão.
+
+        itens pode ser um gerador: é consumido sob demanda, só quando há vaga na janela.
+        Exceções de `funcao` são convertidas por on_erro(item, exc); sem on_erro, propagam.
+        """
+        if total is None:
+            try:
+                total = len(itens)
+            except TypeError:
+                total = None
+
+        self.total = total
+        self.concluidos = 0
+        self.interrompido = False
+        self.inicio = time.time()
+        self._ultimo_progresso = 0.0
+
+        iterador = iter(itens)
+        esgotado = False
+        em_voo = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_em_voo)
+        if self.controlador is not None:
+            self.controlador.__enter__()
+
+        try:
+            while True:
+                # Completar a janela
+                while not esgotado and len(em_voo) < self.janela() and not self._parada_solicitada():
+                    try:
+                        item = next(iterador)
+                    except StopIteration:
+                        esgotado = True
+                        break
+                    em_voo[executor.submit(funcao, item)] = item
+
+                if self._cancelado():
+                    self.interrompido = True
+                    break
+
+                if not em_voo:
+                    # Janela vazia: ou acabaram os itens ou a parada foi solicitada
+                    self.interrompido = not esgotado
+                    break
+
+                # Timeout curto para reagir a cancelamento e atualizar progresso mesmo sem conclusões
+                prontos, _ = wait(em_voo, timeout=self.intervalo_progresso, return_when=FIRST_COMPLETED)
+                for futuro in prontos:
+                    if self._cancelado():
+                        break
+                    item = em_voo.pop(futuro)
+                    try:
+                        resultado = futuro.result()
+                    except Exception as e:
+                        if on_erro is None:
+                            raise
+                        resultado = on_erro(item, e)
+                    self.concluidos += 1
+                    yield item, resultado
+
+                self._notificar_progresso()
+        finally:
+            # Sem espera: em cancelamento as tarefas em voo são abandonadas
+            executor.shutdown(wait=False)
+            if self.controlador is not None:
+                self.controlador.__exit__(None, None, None)
+            self._notificar_progresso(forcar=True)
+
+    def janela(self) -> int:
+        """Quantidade de tarefas que podem estar em voo agora"""
+        if self.controlador is not None:
+            return self.controlador.limite
+        return self.max_em_voo
+
+    def vazao(self) -> float:
+        """Itens concluídos por segundo desde o início"""
+        if not self.inicio:
+            return 0.0
+        decorrido = time.time() - self.inicio
+        return self.concluidos / decorrido if decorrido > 0 else 0.0
+
+    def eta(self) -> Optional[float]:
+        """Segundos estimados até o fim (None se o total é desconhecido)"""
+        vazao = self.vazao()
+        if self.total is None or vazao <= 0:
+            return None
+        return max(self.total - self.concluidos, 0) / vazao
+
+    def _parada_solicitada(self) -> bool:
+        return self._cancelado() or (self.parar_evento is not None and self.parar_evento.is_set())
+
+    def _cancelado(self) -> bool:
+        return self.cancelar_evento is not None and self.cancelar_evento.is_set()
+
+    def _notificar_progresso(self, forcar: bool = False):
+        if not self.on_progresso:
+            return
+        agora = time.time()
+        if not forcar and agora - self._ultimo_progresso < self.intervalo_progresso:
+            return
+        self._ultimo_progresso = agora
+        try:
+            self.on_progresso(self.concluidos, self.total, self.vazao(), self.eta())
+        except Exception:
+            pass  # Callback de interface nunca deve derrubar o processamento
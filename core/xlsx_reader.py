@@ -0,0 +1,146 @@
+"""
+Leitura Rápida de XLSX
+Leitor compartilhado: python-calamine quando instalado, senão openpyxl em modo read_only, só com as colunas pedidas e em blocos
+"""
+
+import math
+from datetime import date, datetime, time as hora
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from openpyxl import load_workbook
+from pandas.io.parsers import TextParser
+
+try:
+    from python_calamine import CalamineWorkbook  # Opcional: leitor em Rust, bem mais rápido
+except ImportError:
+    CalamineWorkbook = None
+
+# Linhas por bloco entregue por ler_blocos
+TAMANHO_BLOCO = 5000
+
+
+def normalizar_coluna(nome) -> str:
+    return str(nome).strip().lower()
+
+
+def motor_disponivel() -> str:
+    return "calamine" if CalamineWorkbook is not None else "openpyxl"
+
+
+def _linhas_calamine(caminho: str) -> Iterator[Tuple[Any, ...]]:
+    planilha = CalamineWorkbook.from_path(caminho).get_sheet_by_index(0)
+    for linha in planilha.to_python(skip_empty_area=False):
+        yield tuple(linha)
+
+
+def _linhas_openpyxl(caminho: str) -> Iterator[Tuple[Any, ...]]:
+    livro = load_workbook(caminho, read_only=True, data_only=True)
+    try:
+        planilha = livro.worksheets[0]
+        # Planilhas geradas por outros programas às vezes trazem a dimensão errada
+        planilha.reset_dimensions()
+        yield from planilha.iter_rows(values_only=True)
+    finally:
+        livro.close()
+
+
+def _linhas(caminho: str) -> Iterator[Tuple[Any, ...]]:
+    return _linhas_calamine(caminho) if CalamineWorkbook is not None else _linhas_openpyxl(caminho)
+
+
+def _vazio(valor) -> bool:
+    return valor is None or valor == "" or (isinstance(valor, float) and math.isnan(valor))
+
+
+def _cabecalho(valores: Tuple[Any, ...]) -> List[str]:
+    """Nomes como o pandas: vazios viram 'Unnamed: n' e repetidos recebem '.1', '.2'..."""
+    nomes, vistos = [], {}
+    for posicao, valor in enumerate(valores):
+        nome = f"Unnamed: {posicao}" if _vazio(valor) else str(valor)
+        if isinstance(valor, float) and not _vazio(valor) and valor.is_integer():
+            nome = str(int(valor))
+        base = nome
+        while nome in vistos:
+            vistos[base] += 1
+            nome = f"{base}.{vistos[base]}"
+        vistos.setdefault(nome, 0)
+        nomes.append(nome)
+    return nomes
+
+
+def _celula(valor):
+    """Mesmas conversões do pandas: vazio → None, float inteiro → int, data → Timestamp"""
+    if _vazio(valor):
+        return None
+    if isinstance(valor, float) and valor.is_integer():
+        return int(valor)
+    if isinstance(valor, (datetime, date)) and not isinstance(valor, hora):
+        return pd.Timestamp(valor)
+    return valor
+
+
+def ler_cabecalho(caminho: str) -> List[str]:
+    """Nomes das colunas da primeira aba (sem ler o resto do arquivo)"""
+    for valores in _linhas(caminho):
+        return _cabecalho(valores)
+    return []
+
+
+def ler_blocos(caminho: str, colunas: Optional[Iterable[str]] = None, como_texto: bool = False,
+               tamanho_bloco: int = TAMANHO_BLOCO) -> Iterator[pd.DataFrame]:
+    """
+    Lê a primeira aba em DataFrames de até `tamanho_bloco` linhas, à medida que o arquivo é lido.
+
+    colunas: nomes a manter, comparados sem espaços nas pontas e sem diferenciar maiúsculas
+             (as ausentes são ignoradas; quem chama valida). None = todas.
+    como_texto: equivale a dtype=str (células vazias continuam NaN).
+    O índice continua de um bloco para o outro (0..n-1 no arquivo inteiro), como no read_excel.
+    """
+    linhas = _linhas(caminho)
+    try:
+        cabecalho = _cabecalho(next(linhas))
+    except StopIteration:
+        return
+
+    if colunas is None:
+        posicoes = list(range(len(cabecalho)))
+    else:
+        desejadas = {normalizar_coluna(c) for c in colunas}
+        posicoes = [p for p, nome in enumerate(cabecalho) if normalizar_coluna(nome) in desejadas]
+    nomes = [cabecalho[p] for p in posicoes]
+
+    bloco, vazias, inicio = [], [], 0
+    for valores in linhas:
+        linha = [_celula(valores[p]) if p < len(valores) else None for p in posicoes]
+        if all(v is None for v in linha) and all(_vazio(v) for v in valores):
+            # Linhas vazias só entram se houver dados depois delas (o pandas descarta as finais)
+            vazias.append(linha)
+            continue
+        if vazias:
+            bloco.extend(vazias)
+            vazias = []
+        bloco.append(linha)
+        if len(bloco) >= tamanho_bloco:
+            yield _dataframe(bloco, nomes, inicio, como_texto)
+            inicio += len(bloco)
+            bloco = []
+    if bloco or inicio == 0:
+        yield _dataframe(bloco, nomes, inicio, como_texto)
+
+
+def _dataframe(linhas: List[list], nomes: List[str], inicio: int, como_texto: bool) -> pd.DataFrame:
+    """Mesmo conversor de tipos do pd.read_excel (TextParser), para não mudar o que as funcionalidades recebem"""
+    if not linhas:
+        return pd.DataFrame(columns=nomes, index=pd.RangeIndex(inicio, inicio), dtype=str if como_texto else object)
+    df = TextParser(linhas, names=nomes, header=None, dtype=str if como_texto else None).read()
+    df.index = pd.RangeIndex(inicio, inicio + len(linhas))
+    return df
+
+
+def ler_xlsx(caminho: str, colunas: Optional[Iterable[str]] = None, como_texto: bool = False) -> pd.DataFrame:
+    """Planilha inteira (substituto de pd.read_excel para a primeira aba)"""
+    blocos = list(ler_blocos(caminho, colunas, como_texto))
+    if len(blocos) == 1:
+        return blocos[0]
+    return pd.concat(blocos)
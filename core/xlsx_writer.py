@@ -0,0 +1,150 @@
+"""
+Gravação de XLSX em Streaming
+Workbook openpyxl em modo write_only: linhas vão direto para o arquivo, com estilo nomeado por linha e larguras por amostra
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+# Linhas do DataFrame convertidas por vez (a conversão para valores Python não duplica a planilha inteira)
+LINHAS_POR_BLOCO = 10000
+
+# Linhas usadas para estimar a largura das colunas, e o limite da largura
+AMOSTRA_LARGURA = 1000
+LARGURA_MAXIMA = 50
+
+# Estilos nomeados: registrados uma vez no workbook, cada célula guarda só a referência
+ESTILO_CABECALHO = "cabecalho"
+ESTILO_CABECALHO_SIMPLES = "cabecalho_simples"
+ESTILO_REGISTRO_CORRETO = "registro_correto"
+
+
+def _estilos_padrao() -> Dict[str, NamedStyle]:
+    fina = Side(style="thin")
+    # Mesmo cabeçalho do DataFrame.to_excel: negrito, borda fina e centralizado
+    cabecalho = NamedStyle(name=ESTILO_CABECALHO, font=Font(bold=True),
+                           border=Border(left=fina, right=fina, top=fina, bottom=fina),
+                           alignment=Alignment(horizontal="center", vertical="top"))
+    cabecalho_simples = NamedStyle(name=ESTILO_CABECALHO_SIMPLES, font=Font(bold=True))
+    # Destaque verde dos registros escolhidos em Resolver Duplicatas
+    registro_correto = NamedStyle(name=ESTILO_REGISTRO_CORRETO, font=Font(color="006400", bold=True),
+                                  fill=PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid"))
+    return {estilo.name: estilo for estilo in (cabecalho, cabecalho_simples, registro_correto)}
+
+
+def calcular_larguras(colunas: Sequence[Any], amostra: Iterable[Sequence[Any]]) -> List[float]:
+    """Largura de cada coluna pelo maior texto entre o cabeçalho e as linhas da amostra"""
+    maiores = [len(str(c)) for c in colunas]
+    for linha in amostra:
+        for posicao, valor in enumerate(linha):
+            if valor is not None and posicao < len(maiores):
+                maiores[posicao] = max(maiores[posicao], len(str(valor)))
+    return [min(tamanho + 2, LARGURA_MAXIMA) for tamanho in maiores]
+
+
+def linhas_dataframe(df: pd.DataFrame, colunas: Optional[Sequence[Any]] = None) -> Iterable[list]:
+    """Valores de cada linha prontos para o openpyxl (NaN/NaT/NA → célula vazia), bloco a bloco"""
+    if colunas is not None:
+        df = df[list(colunas)]
+    for inicio in range(0, len(df), LINHAS_POR_BLOCO):
+        bloco = df.iloc[inicio:inicio + LINHAS_POR_BLOCO].astype(object)
+        bloco = bloco.where(bloco.notna(), None)
+        for linha in bloco.itertuples(index=False, name=None):
+            yield list(linha)
+
+
+class EscritorXlsx:
+    """
+    Grava uma aba linha a linha, sem manter as células em memória.
+
+    - estilo_cabecalho / estilo_linha: nomes de estilos registrados (ESTILO_* ou os de `estilos`);
+      sem estilo de linha os valores são gravados crus, o caminho mais rápido
+    - larguras: definidas antes da primeira linha (exigência do modo write_only);
+      use calcular_larguras com uma amostra
+    """
+
+    def __init__(self, caminho: str, colunas: Sequence[Any], titulo: str = "Sheet1",
+                 estilo_cabecalho: Optional[str] = ESTILO_CABECALHO, estilo_linha: Optional[str] = None,
+                 larguras: Optional[Sequence[float]] = None, estilos: Iterable[NamedStyle] = ()):
+        self.caminho = caminho
+        self.colunas = list(colunas)
+        self.estilo_linha = estilo_linha
+        self.linhas = 0
+
+        self._livro = Workbook(write_only=True)
+        registrados = _estilos_padrao()
+        registrados.update({estilo.name: estilo for estilo in estilos})
+        for nome in {estilo_cabecalho, estilo_linha} - {None}:
+            self._livro.add_named_style(registrados[nome])
+
+        self._aba = self._livro.create_sheet(titulo)
+        for posicao, largura in enumerate(larguras or (), 1):
+            self._aba.column_dimensions[get_column_letter(posicao)].width = largura
+        self._aba.append([self._celula(nome, estilo_cabecalho) for nome in self.colunas])
+
+    def _celula(self, valor, estilo: Optional[str]):
+        if estilo is None:
+            return valor
+        celula = WriteOnlyCell(self._aba, value=valor)
+        celula.style = estilo
+        return celula
+
+    def escrever(self, valores: Sequence[Any]):
+        if self.estilo_linha is None:
+            self._aba.append(valores)
+        else:
+            self._aba.append([self._celula(valor, self.estilo_linha) for valor in valores])
+        self.linhas += 1
+
+    def escrever_linhas(self, linhas: Iterable[Sequence[Any]]):
+        for valores in linhas:
+            self.escrever(valores)
+
+    def salvar(self):
+        self._livro.save(self.caminho)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, rastreamento):
+        # Só grava o arquivo se tudo correu bem
+        if tipo is None:
+            self.salvar()
+        return False
+
+
+def gravar_blocos(blocos: Iterable[pd.DataFrame], caminho: str, titulo: str = "Sheet1",
+                  colunas: Optional[Sequence[Any]] = None, estilo_linha: Optional[str] = None,
+                  estilo_cabecalho: Optional[str] = ESTILO_CABECALHO, ajustar_larguras: bool = True) -> int:
+    """
+    Grava uma sequência de DataFrames com as mesmas colunas (ex.: pd.read_csv com chunksize)
+    como uma única aba, sem juntar tudo em memória. Retorna as linhas gravadas.
+
+    colunas: subconjunto/ordem das colunas (padrão: as do primeiro bloco)
+    ajustar_larguras: larguras pelas primeiras AMOSTRA_LARGURA linhas do primeiro bloco
+    """
+    blocos = iter(blocos)
+    primeiro = next(blocos, None)
+    if primeiro is None:
+        primeiro = pd.DataFrame(columns=list(colunas or []))
+    colunas = list(primeiro.columns if colunas is None else colunas)
+    larguras = None
+    if ajustar_larguras:
+        larguras = calcular_larguras(colunas, linhas_dataframe(primeiro.head(AMOSTRA_LARGURA), colunas))
+    with EscritorXlsx(caminho, colunas, titulo, estilo_cabecalho, estilo_linha, larguras) as escritor:
+        escritor.escrever_linhas(linhas_dataframe(primeiro, colunas))
+        for bloco in blocos:
+            escritor.escrever_linhas(linhas_dataframe(bloco, colunas))
+    return escritor.linhas
+
+
+def gravar_dataframe(df: pd.DataFrame, caminho: str, titulo: str = "Sheet1",
+                     colunas: Optional[Sequence[Any]] = None, estilo_linha: Optional[str] = None,
+                     estilo_cabecalho: Optional[str] = ESTILO_CABECALHO, ajustar_larguras: bool = True) -> int:
+    """Substituto de df.to_excel(caminho, index=False) em streaming. Retorna as linhas gravadas."""
+    return gravar_blocos([df], caminho, titulo, colunas, estilo_linha, estilo_cabecalho, ajustar_larguras)
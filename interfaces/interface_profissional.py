@@ -15,7 +15,6 @@ import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 import pandas as pd
 import os
-import json
 from datetime import datetime, timedelta
 import threading
 import time
@@ -34,9 +33,13 @@ sys.path.insert(0, str(project_root))
 
 # Importar sistemas profissionais
 from core.config_manager import ConfigManager
-from core.professional_logger import LoggerProfissional
+from core.professional_logger import LoggerProfissional, carregar_sessoes, ultimas_linhas
+from core.metricas import metricas
 from core.data_validator import ValidadorDados
 from core.theme_manager import GerenciadorTema
+from core.xlsx_reader import ler_xlsx
+from core.xlsx_writer import gravar_dataframe
+from core.cpu_executor import encerrar_estagio_cpu
 
 # Carrega as variáveis de ambiente
 load_dotenv()
@@ -372,7 +375,17 @@ class Python4WorkPro:
         
         # Status detalhado
         self.label_status = self.theme_manager.create_status_label(progress_content, "Pronto", "info")
-        self.label_status.pack(pady=(0, 20))
+        self.label_status.pack(pady=(0, 5))
+        
+        # Concorrência adaptativa: limite atual e evolução recente
+        self.label_concorrencia = tk.Label(progress_content, text="", font=("Arial", 9))
+        self.theme_manager.apply_theme_to_widget(self.label_concorrencia, 'description')
+        self.label_concorrencia.pack(pady=(0, 5))
+        
+        # Chamadas ao EasyCollector: percentis de latência de rede/parse, erros e cache (core.metricas)
+        self.label_metricas = tk.Label(progress_content, text="", font=("Arial", 9))
+        self.theme_manager.apply_theme_to_widget(self.label_metricas, 'description')
+        self.label_metricas.pack(pady=(0, 15))
         
         # Botões de controle
         controls_frame = tk.Frame(progress_content, bg=self.theme_manager.get_color('surface'))
@@ -459,6 +472,38 @@ class Python4WorkPro:
         # Executar na thread principal
         self.root.after(0, _update)
     
+    def criar_callback_progresso(self, descricao: str, inicio: float = 0, fim: float = 100, controlador=None, diario=None):
+        """Callback on_progresso do EscalonadorJanela: vazão e ETA na área de progresso.
+
+        A fração concluída é mapeada para o intervalo [inicio, fim] da barra. Com um
+        ControladorAIMD, o limite de concorrência e seu histórico também são exibidos;
+        com um diário de checkpoint, o tempo gasto salvando. Os percentis das chamadas do
+        endpoint (core.metricas) são recalculados no máximo a cada meio segundo.
+        """
+        endpoint = (getattr(controlador, 'endpoints', None) or [None])[0]
+        ultima_metrica = [0.0]
+        
+        def on_progresso(concluidos, total, req_por_seg, eta):
+            fracao = (concluidos / total) if total else 0
+            status = f"⚡ {descricao}: {concluidos}/{total or '?'} | {req_por_seg:.1f} req/s"
+            if eta is not None and concluidos:
+                status += f" | ETA: {eta/60:.1f}min"
+            custo = diario.resumo_custo() if diario is not None else ""
+            if custo:
+                status += f" | {custo}"
+            self.atualizar_progresso(inicio + fracao * (fim - inicio), status)
+            self.root.after(0, lambda: self.label_progresso.config(
+                text=f"{concluidos}/{total or '?'} ({fracao*100:.0f}%)"))
+            if controlador is not None:
+                resumo = controlador.resumo()
+                self.root.after(0, lambda: self.label_concorrencia.config(text=resumo))
+            agora = time.monotonic()
+            if agora - ultima_metrica[0] >= 0.5 or concluidos == total:
+                ultima_metrica[0] = agora
+                linha_metricas = metricas.resumo_linha(endpoint)
+                self.root.after(0, lambda: self.label_metricas.config(text=linha_metricas))
+        return on_progresso
+    
     def ocultar_progresso(self):
         """Oculta área de progresso"""
         self.frame_progresso.pack_forget()
@@ -494,6 +539,8 @@ class Python4WorkPro:
         self.label_progresso.config(text="0/0 (0%)")
         self.label_tempo.config(text="Tempo: --")
         self.label_status.config(text="Pronto")
+        self.label_concorrencia.config(text="")
+        self.label_metricas.config(text="")
         self.btn_parar.config(state="disabled")
         self.btn_cancelar.config(state="disabled")
         self.parar_flag.clear()
@@ -536,7 +583,7 @@ class Python4WorkPro:
         self.logger.log_user_action("Abriu configurações", session_id=self.session_id)
         
         # Criar janela de configurações usando popup centralizado
-        config_window = self._create_nolog_popup("⚙️ Configurações", geometry="500x400")
+        config_window = self._create_nolog_popup("⚙️ Configurações", geometry="500x620")
         try:
             config_window.resizable(False, False)
         except Exception:
@@ -573,6 +620,43 @@ class Python4WorkPro:
             self.theme_manager.apply_theme_to_widget(rb, 'surface')
             rb.pack(anchor='w')
         
+        # Cache persistente das consultas por CPF (ObterDividaAtivaPorCPF)
+        from core.response_cache import CACHE_DIVIDA, obter_cache, formatar_estatisticas_cache
+        
+        cache_frame = tk.LabelFrame(main_frame, text="💾 Cache de Respostas (CPF)", 
+                                   font=("Arial", 10, "bold"), padx=10, pady=10)
+        self.theme_manager.apply_theme_to_widget(cache_frame, 'surface')
+        cache_frame.pack(fill='x', pady=(0, 15))
+        
+        cache_ativo_var = tk.BooleanVar(value=self.config.get('performance.enable_caching', True))
+        cb_cache = tk.Checkbutton(cache_frame, text="Usar cache em disco", variable=cache_ativo_var)
+        self.theme_manager.apply_theme_to_widget(cb_cache, 'surface')
+        cb_cache.pack(anchor='w')
+        
+        cache_modo_var = tk.StringVar(value=self.config.get('performance.cache_mode', 'normal'))
+        cache_modos = [("✅ Normal (usa respostas salvas)", "normal"),
+                       ("🔄 Atualizar (consulta a API e regrava)", "refresh"),
+                       ("⏭️ Ignorar (não lê nem grava)", "bypass")]
+        for text, value in cache_modos:
+            rb = tk.Radiobutton(cache_frame, text=text, variable=cache_modo_var, value=value)
+            self.theme_manager.apply_theme_to_widget(rb, 'surface')
+            rb.pack(anchor='w')
+        
+        cache = obter_cache(CACHE_DIVIDA, self.config)
+        label_cache = tk.Label(cache_frame, text=formatar_estatisticas_cache(cache.estatisticas()), font=("Arial", 9))
+        self.theme_manager.apply_theme_to_widget(label_cache, 'description')
+        label_cache.pack(anchor='w', pady=(5, 0))
+        
+        def limpar_cache():
+            if messagebox.askyesno("Limpar cache", "Remover todas as respostas salvas em cache?"):
+                cache.limpar()
+                label_cache.config(text=formatar_estatisticas_cache(cache.estatisticas()))
+                self.logger.log_user_action("Limpou cache de respostas", session_id=self.session_id)
+        
+        btn_limpar_cache = tk.Button(cache_frame, text="🗑️ Limpar cache", command=limpar_cache)
+        self.theme_manager.apply_theme_to_widget(btn_limpar_cache, 'secondary_button')
+        btn_limpar_cache.pack(anchor='e')
+        
         # Botões
         button_frame = tk.Frame(main_frame, bg=self.theme_manager.get_color('background'))
         button_frame.pack(fill='x', pady=(20, 0))
@@ -580,6 +664,9 @@ class Python4WorkPro:
         def salvar_config():
             # Do not allow changing the theme from the UI; keep corporate theme.
             self.config.set('logging.level', log_level_var.get())
+            self.config.set('performance.enable_caching', cache_ativo_var.get())
+            self.config.set('performance.cache_mode', cache_modo_var.get())
+            obter_cache(CACHE_DIVIDA, self.config)
             messagebox.showinfo("Sucesso", "Configurações salvas!\nReinicie para aplicar todas as mudanças.")
             config_window.destroy()
         
@@ -638,7 +725,7 @@ class Python4WorkPro:
         self.logger.log_user_action("Abriu relatórios", session_id=self.session_id)
         
         # Criar janela de relatórios usando popup centralizado
-        report_window = self._create_nolog_popup("📊 Relatórios e Logs", geometry="700x500")
+        report_window = self._create_nolog_popup("📊 Relatórios e Logs", geometry="860x640")
         try:
             report_window.resizable(True, True)
         except Exception:
@@ -670,10 +757,9 @@ class Python4WorkPro:
         log_text.configure(yscrollcommand=log_scroll.set)
         
         try:
-            with open("logs/python4workpro.log", "r", encoding="utf-8") as f:
-                logs = f.readlines()[-50:]  # Últimas 50 linhas
-                log_text.insert(tk.END, "".join(logs))
-        except:
+            # Lido do fim para o começo: o custo não cresce com o tamanho do log
+            log_text.insert(tk.END, "".join(ultimas_linhas("logs/python4workpro.log", 50)))
+        except OSError:
             log_text.insert(tk.END, "Nenhum log encontrado.")
         
         log_text.pack(side='left', fill='both', expand=True, padx=(10, 0), pady=10)
@@ -713,6 +799,9 @@ class Python4WorkPro:
         stats_text.config(state='disabled')
         stats_text.pack(fill='both', expand=True, padx=10, pady=10)
         
+        # Aba 3: Desempenho por execução (logs/sessions)
+        self._criar_aba_desempenho(notebook)
+        
         # Botões na janela
         button_frame = tk.Frame(main_frame, bg=self.theme_manager.get_color('background'))
         button_frame.pack(fill='x', pady=(10, 0))
@@ -731,6 +820,120 @@ class Python4WorkPro:
         self.theme_manager.apply_theme_to_widget(btn_fechar, 'secondary_button')
         btn_fechar.pack(side='right')
     
+    def _criar_aba_desempenho(self, notebook):
+        """Aba com vazão, percentis de latência, taxa de erro e de cache das últimas sessões, por endpoint"""
+        surface = self.theme_manager.get_color('surface')
+        frame = tk.Frame(notebook, bg=surface)
+        notebook.add(frame, text="🚀 Desempenho")
+        
+        topo = tk.Frame(frame, bg=surface)
+        topo.pack(fill='x', padx=10, pady=(10, 0))
+        label_endpoint = tk.Label(topo, text="Endpoint:")
+        self.theme_manager.apply_theme_to_widget(label_endpoint, 'description')
+        label_endpoint.pack(side='left')
+        endpoint_var = tk.StringVar()
+        combo = ttk.Combobox(topo, textvariable=endpoint_var, state='readonly', width=32)
+        combo.pack(side='left', padx=(5, 10))
+        btn_atualizar = tk.Button(topo, text="🔄 Atualizar", font=("Arial", 9))
+        self.theme_manager.apply_theme_to_widget(btn_atualizar, 'secondary_button')
+        btn_atualizar.pack(side='left')
+        
+        canvas = tk.Canvas(frame, height=260, bg=self.theme_manager.get_color('background'), highlightthickness=0)
+        canvas.pack(fill='x', padx=10, pady=10)
+        
+        colunas = ("sessao", "data", "chamadas", "vazao", "p50", "p95", "p99", "erros", "cache")
+        titulos = ("Sessão", "Data", "Chamadas", "Cham/s", "p50 ms", "p95 ms", "p99 ms", "Erros %", "Cache %")
+        tabela = ttk.Treeview(frame, columns=colunas, show='headings', height=6)
+        for coluna, titulo in zip(colunas, titulos):
+            tabela.heading(coluna, text=titulo)
+            tabela.column(coluna, width=150 if coluna in ("sessao", "data") else 70, anchor='center')
+        tabela.pack(fill='both', expand=True, padx=10, pady=(0, 10))
+        
+        estado = {'sessoes': []}
+        
+        def execucoes():
+            """(rótulo, resumo do endpoint) das sessões que chamaram o endpoint escolhido"""
+            endpoint = endpoint_var.get()
+            return [(sessao['data'].strftime('%d/%m %H:%M'), sessao, sessao['metrics'][endpoint])
+                    for sessao in estado['sessoes'] if endpoint in sessao['metrics']]
+        
+        def redesenhar(_evento=None):
+            canvas.delete('all')
+            dados = execucoes()
+            if not dados:
+                canvas.create_text(10, 20, anchor='w', fill=self.theme_manager.get_color('text_secondary'),
+                                   text="Nenhuma sessão com métricas em logs/sessions/ (são gravadas ao fechar a aplicação).")
+                return
+            largura = max(canvas.winfo_width(), 400) // 2
+            altura = 130
+            graficos = [
+                ("Vazão (chamadas/s)", {"cham/s": [m['chamadas_por_seg'] for _, _, m in dados]}, ""),
+                ("Latência de rede (ms)", {f"p{p}": [m['rede_ms'][f'p{p}'] for _, _, m in dados] for p in (50, 95, 99)}, ""),
+                ("Erros (%)", {"erros": [m['erros'] / m['chamadas'] * 100 if m['chamadas'] else 0 for _, _, m in dados]}, "%"),
+                ("Cache (%)", {"cache": [m['taxa_cache'] for _, _, m in dados]}, "%"),
+            ]
+            for posicao, (titulo, series, sufixo) in enumerate(graficos):
+                self._desenhar_grafico(canvas, (posicao % 2) * largura, (posicao // 2) * altura,
+                                       largura, altura, titulo, series, sufixo)
+        
+        def preencher_tabela():
+            tabela.delete(*tabela.get_children())
+            for rotulo, sessao, m in reversed(execucoes()):
+                erros = m['erros'] / m['chamadas'] * 100 if m['chamadas'] else 0
+                tabela.insert('', 'end', values=(
+                    sessao['session_id'], rotulo, m['chamadas'], f"{m['chamadas_por_seg']:.1f}",
+                    f"{m['rede_ms']['p50']:.0f}", f"{m['rede_ms']['p95']:.0f}", f"{m['rede_ms']['p99']:.0f}",
+                    f"{erros:.1f}", f"{m['taxa_cache']:.1f}"))
+        
+        def atualizar():
+            estado['sessoes'] = carregar_sessoes("logs/sessions", limite=30)
+            contagem = {}
+            for sessao in estado['sessoes']:
+                for endpoint, m in sessao['metrics'].items():
+                    contagem[endpoint] = contagem.get(endpoint, 0) + m.get('chamadas', 0)
+            endpoints = sorted(contagem, key=contagem.get, reverse=True)
+            combo['values'] = endpoints
+            if endpoints and endpoint_var.get() not in endpoints:
+                endpoint_var.set(endpoints[0])
+            redesenhar()
+            preencher_tabela()
+        
+        def trocar_endpoint(_evento=None):
+            redesenhar()
+            preencher_tabela()
+        
+        combo.bind('<<ComboboxSelected>>', trocar_endpoint)
+        canvas.bind('<Configure>', redesenhar)
+        btn_atualizar.config(command=atualizar)
+        atualizar()
+    
+    def _desenhar_grafico(self, canvas, x, y, largura, altura, titulo, series, sufixo=""):
+        """Gráfico de linhas simples no Canvas: uma linha por série, uma execução por ponto (mais antiga à esquerda)"""
+        cores = [self.theme_manager.get_color(nome) for nome in ('primary', 'warning', 'danger', 'success')]
+        texto = self.theme_manager.get_color('text')
+        borda = self.theme_manager.get_color('border')
+        margem_esq, margem_dir, margem_topo, margem_base = 45, 10, 22, 12
+        x0, x1 = x + margem_esq, x + largura - margem_dir
+        y0, y1 = y + margem_topo, y + altura - margem_base
+        
+        canvas.create_text(x + margem_esq, y + 4, anchor='nw', text=titulo, fill=texto, font=("Arial", 9, "bold"))
+        canvas.create_rectangle(x0, y0, x1, y1, outline=borda)
+        maximo = max((v for valores in series.values() for v in valores), default=0) or 1
+        canvas.create_text(x0 - 4, y0, anchor='ne', text=f"{maximo:.0f}{sufixo}", fill=texto, font=("Arial", 7))
+        canvas.create_text(x0 - 4, y1, anchor='se', text=f"0{sufixo}", fill=texto, font=("Arial", 7))
+        
+        for indice, (nome, valores) in enumerate(series.items()):
+            cor = cores[indice % len(cores)]
+            passo = (x1 - x0) / max(len(valores) - 1, 1)
+            pontos = [(x0 + i * passo if len(valores) > 1 else (x0 + x1) / 2, y1 - v / maximo * (y1 - y0))
+                      for i, v in enumerate(valores)]
+            if len(pontos) > 1:
+                canvas.create_line(*[c for ponto in pontos for c in ponto], fill=cor, width=2)
+            for px, py in pontos:
+                canvas.create_oval(px - 2, py - 2, px + 2, py + 2, fill=cor, outline=cor)
+            if len(series) > 1:
+                canvas.create_text(x1 - 4 - indice * 34, y + 4, anchor='ne', text=nome, fill=cor, font=("Arial", 8))
+    
     def on_closing(self):
         """Trata fechamento da aplicação"""
         if self.config.get('ui.confirm_exit', True):
@@ -758,6 +961,12 @@ class Python4WorkPro:
         # Salvar configurações se necessário
         self.config.save_config()
         
+        # Encerrar os processos do estágio de CPU, se algum foi criado
+        encerrar_estagio_cpu()
+        
+        # Gravar o que ainda está na fila de logging antes de sair
+        self.logger.encerrar()
+        
         # Fechar aplicação
         self.root.destroy()
     
@@ -930,12 +1139,19 @@ class Python4WorkPro:
         """Executa consulta de acordo com validação robusta e processamento otimizado"""
         try:
             # Importar funções melhoradas do script
-            from src.consultar_acordo import consultar_status_acordo_batch, validar_dados_entrada
+            from src.consultar_acordo import consultar_linhas, validar_dados_entrada, estatisticas_conexoes, CONCORRENCIA_INICIAL, URL, STATUS_REPETIR
+            from core.concurrency import ControladorAIMD
+            from core.checkpoint import abrir_diario
+            from core.rate_limiter import registrar_endpoint
+            
+            # Reaplica o orçamento de requisições com a configuração atual (pode ter sido editada)
+            registrar_endpoint("URL", URL, self.config)
+            from core.http_session import formatar_estatisticas_conexoes
             
             self.atualizar_progresso(5, f"📂 Carregando arquivo...")
             
             # Ler arquivo
-            df = pd.read_excel(arquivo_entrada)
+            df = ler_xlsx(arquivo_entrada)
             total_linhas = len(df)
             
             self.logger.info(f"Consultar Acordo: Arquivo carregado - {total_linhas} registros")
@@ -958,67 +1174,85 @@ class Python4WorkPro:
             if 'status_acordo' not in df.columns:
                 df['status_acordo'] = ''
             
+            # Diário de checkpoint (app.auto_backup): reabrir a mesma entrada pula as linhas já concluídas
+            diario = abrir_diario("consultar_acordo", arquivo_entrada, self.config)
+            pendentes = diario.pendentes(total_linhas, STATUS_REPETIR, "status_acordo")
+            if diario.retomado:
+                self.logger.info(f"Consultar Acordo: ♻️ Retomando {diario.caminho} - {total_linhas - len(pendentes)} linhas já concluídas")
+            
             self.atualizar_progresso(15, f"🚀 Iniciando consultas otimizadas...")
             
-            # Configurações otimizadas
+            # Configurações otimizadas (batch_size: intervalo de progresso da engine assíncrona)
             batch_size = 50
-            max_workers = 25
+            # Concorrência adaptativa (AIMD) no lugar de um número fixo de workers
+            controlador = ControladorAIMD.de_config(self.config, CONCORRENCIA_INICIAL, endpoints=[URL])
             linhas_processadas = 0
             
             import time
             start_time = time.time()
             
-            # Processar em lotes para melhor performance
-            for batch_start in range(0, total_linhas, batch_size):
-                # Verificar flags de controle
-                if self.cancelar_flag.is_set():
-                    self.atualizar_progresso((batch_start/total_linhas)*100, "❌ Processo cancelado...")
-                    break
+            usar_async = self.config.get('performance.async_engine', False)
+            a_processar = len(pendentes)
+            linhas = ((i, df.iloc[i]) for i in pendentes)
+            
+            try:
+                if usar_async:
+                    # Engine assíncrona: todas as linhas em um único pipeline, sem barreira por lote
+                    from src.consultar_acordo import processar_acordos_async
                     
-                if self.parar_flag.is_set():
-                    self.atualizar_progresso((batch_start/total_linhas)*100, "⏸️ Processo pausado...")
-                    self.parar_flag.wait()
-                
-                batch_end = min(batch_start + batch_size, total_linhas)
-                batch_rows = [(i, df.iloc[i]) for i in range(batch_start, batch_end)]
-                
-                # Atualizar progresso
-                progresso = int((batch_start / total_linhas) * 100)
-                elapsed = time.time() - start_time
-                if batch_start > 0:
-                    eta = (elapsed / batch_start) * (total_linhas - batch_start)
-                    self.atualizar_progresso(progresso, 
-                        f"⚡ Processando lote {batch_start//batch_size + 1}: {batch_start+1}-{batch_end} de {total_linhas} | ETA: {eta/60:.1f}min")
+                    def on_resultado(index, status):
+                        nonlocal linhas_processadas
+                        df.at[index, "status_acordo"] = status
+                        diario.registrar(index, status_acordo=status)
+                        linhas_processadas += 1
+                        if linhas_processadas % batch_size == 0:
+                            elapsed = time.time() - start_time
+                            eta = (elapsed / linhas_processadas) * (a_processar - linhas_processadas)
+                            self.atualizar_progresso((linhas_processadas / a_processar) * 100,
+                                f"⚡ Pipeline assíncrono: {linhas_processadas}/{a_processar} | ETA: {eta/60:.1f}min | {diario.resumo_custo()}")
+                    
+                    processar_acordos_async(linhas, controlador.limite, on_resultado, self.parar_flag)
                 else:
-                    self.atualizar_progresso(progresso, f"🔄 Processando lote 1: {batch_start+1}-{batch_end} de {total_linhas}")
-                
-                # Processar lote em paralelo
-                batch_results = consultar_status_acordo_batch(batch_rows, max_workers)
-                
-                # Atualizar DataFrame com resultados
-                for index, status in batch_results:
-                    df.at[index, "status_acordo"] = status
-                    linhas_processadas += 1
-                
-                # Salvar progresso periodicamente
-                if linhas_processadas % 100 == 0:
-                    df.to_excel(arquivo_saida, index=False)
-            
-            # Salvar arquivo final
-            df.to_excel(arquivo_saida, index=False)
+                    # Janela deslizante: sempre max_workers consultas em voo, sem barreira entre lotes
+                    on_progresso = self.criar_callback_progresso("Consultando acordos", 15, 99, controlador, diario)
+                    for index, status in consultar_linhas(linhas, controlador, self.parar_flag,
+                                                          self.cancelar_flag, on_progresso, a_processar):
+                        df.at[index, "status_acordo"] = status
+                        diario.registrar(index, status_acordo=status)
+                        linhas_processadas += 1
+            finally:
+                diario.fechar()
+            
+            # Salvar arquivo final, uma vez, com as linhas do diário de execuções anteriores
+            diario.aplicar(df)
+            with diario.salvando_xlsx():
+                gravar_dataframe(df, arquivo_saida)
+            if not self.parar_flag.is_set() and not self.cancelar_flag.is_set():
+                diario.descartar()
+            custo_gravacao = diario.resumo_custo()
+            self.logger.info(f"Consultar Acordo: {custo_gravacao}")
             
             # Calcular estatísticas finais
             total_time = time.time() - start_time
             req_per_sec = linhas_processadas / total_time if total_time > 0 else 0
             
+            resumo_conexoes = formatar_estatisticas_conexoes(estatisticas_conexoes())
+            self.logger.info(f"Consultar Acordo: {resumo_conexoes}")
+            self.logger.info(f"Consultar Acordo: {controlador.resumo(ultimos=len(controlador.historico))}")
+            
+            # Pausa/cancelamento: o escalonador já entregou as linhas em voo, o arquivo salvo está completo até aqui
+            interrompido = self.parar_flag.is_set()
+            situacao = "⏸️ Interrompido" if interrompido else "✅ Concluído"
+            
             self.atualizar_progresso(100, 
-                f"✅ Concluído! {linhas_processadas} registros em {total_time/60:.1f}min ({req_per_sec:.1f} req/s)")
+                f"{situacao}! {linhas_processadas} registros em {total_time/60:.1f}min ({req_per_sec:.1f} req/s) | {custo_gravacao} | {resumo_conexoes}")
             
-            messagebox.showinfo("Sucesso", 
-                f"Processamento concluído!\n\n"
+            messagebox.showinfo("Interrompido" if interrompido else "Sucesso", 
+                f"Processamento {'interrompido' if interrompido else 'concluído'}!\n\n"
                 f"📊 Registros processados: {linhas_processadas}\n"
                 f"⏱️ Tempo total: {total_time/60:.1f} minutos\n"
                 f"⚡ Velocidade: {req_per_sec:.1f} req/s\n"
+                f"{resumo_conexoes}\n"
                 f"📁 Arquivo salvo: {arquivo_saida}")
             
         except Exception as e:
@@ -1130,12 +1364,20 @@ class Python4WorkPro:
         """Executa obtenção de dívida por CPF usando a função otimizada"""
         try:
             # Importar função otimizada
-            from src.obter_divida_cpf import processar_batch_cpf
+            from src.obter_divida_cpf import processar_linhas_cpf, CONCORRENCIA_INICIAL, URL_DIVIDA, STATUS_REPETIR
+            from core.concurrency import ControladorAIMD
+            from core.checkpoint import abrir_diario
+            from core.rate_limiter import registrar_endpoint
+            from core.response_cache import CACHE_DIVIDA, obter_cache, formatar_estatisticas_cache
+            
+            # Reaplica o orçamento de requisições e o cache com a configuração atual (pode ter sido editada)
+            registrar_endpoint("URL_DIVIDA", URL_DIVIDA, self.config)
+            cache = obter_cache(CACHE_DIVIDA, self.config)
+            cache.zerar_contadores()
             import pandas as pd
-            import time
             
             # Ler arquivo
-            df = pd.read_excel(arquivo_entrada, engine='openpyxl', dtype=str)
+            df = ler_xlsx(arquivo_entrada, como_texto=True)
             # Limpar nomes das colunas
             df.columns = df.columns.str.strip().str.lower()
             
@@ -1152,57 +1394,51 @@ class Python4WorkPro:
                     df[col] = ""  # Usar string vazia em vez de "0"
             
             total = len(df)
-            batch_size = 25
+            controlador = ControladorAIMD.de_config(self.config, CONCORRENCIA_INICIAL, endpoints=[URL_DIVIDA])
             linhas_processadas = 0
-            tempo_inicio = time.time()
             
-            self.atualizar_progresso(0, f"Iniciando processamento de {total} CPFs...")
+            # Diário de checkpoint (app.auto_backup): reabrir a mesma entrada pula as linhas já concluídas
+            diario = abrir_diario("obter_divida", arquivo_entrada, self.config)
+            pendentes = diario.pendentes(total, STATUS_REPETIR, "status")
+            if diario.retomado:
+                self.logger.info(f"Obter Dívida: ♻️ Retomando {diario.caminho} - {total - len(pendentes)} linhas já concluídas")
             
-            # Processar em lotes
-            for batch_start in range(0, total, batch_size):
-                if self.cancelar_flag.is_set():
-                    break
-                
-                if self.parar_flag.is_set():
-                    self.atualizar_progresso((linhas_processadas/total)*100, "Processo pausado...")
-                    self.parar_flag.wait()
-                
-                batch_end = min(batch_start + batch_size, total)
-                batch_rows = [(i, df.iloc[i]) for i in range(batch_start, batch_end)]
-                
-                # Processar lote em paralelo
-                batch_results = processar_batch_cpf(batch_rows)
-                
-                # Atualizar DataFrame com resultados
-                for i, status, observacao, cod_cliente, cod_acordo in batch_results:
+            self.atualizar_progresso(0, f"Iniciando processamento de {len(pendentes)}/{total} CPFs...")
+            
+            # Janela deslizante: sempre max_workers CPFs em voo, resultados conforme terminam
+            linhas = ((i, df.iloc[i]) for i in pendentes)
+            on_progresso = self.criar_callback_progresso("Consultando CPFs", 0, 99, controlador, diario)
+            try:
+                for i, status, observacao, cod_cliente, cod_acordo in processar_linhas_cpf(
+                        linhas, controlador, self.parar_flag, self.cancelar_flag, on_progresso):
                     df.at[i, "status"] = status
                     df.at[i, "observacao"] = observacao
                     df.at[i, "cod_cliente"] = cod_cliente
                     df.at[i, "cod_acordo"] = cod_acordo
+                    diario.registrar(i, status=status, observacao=observacao, cod_cliente=cod_cliente, cod_acordo=cod_acordo)
                     linhas_processadas += 1
-                
-                # Atualizar progresso
-                progresso = (linhas_processadas / total) * 100
-                
-                # Calcular tempo estimado
-                tempo_passado = time.time() - tempo_inicio
-                if linhas_processadas > 0:
-                    tempo_estimado_restante = (tempo_passado / linhas_processadas) * (total - linhas_processadas)
-                    minutos = int(tempo_estimado_restante // 60)
-                    self.atualizar_progresso(progresso, f"Processando: {linhas_processadas}/{total} - {minutos}m restantes")
-                else:
-                    self.atualizar_progresso(progresso, f"Processando: {linhas_processadas}/{total}")
-                
-                # Salvar progresso a cada 100 linhas
-                if linhas_processadas % 100 == 0:
-                    df.to_excel(arquivo_saida, index=False, engine='openpyxl')
-            
-            # Salvar arquivo final
-            df.to_excel(arquivo_saida, index=False, engine='openpyxl')
+            finally:
+                diario.fechar()
+            
+            # Salvar arquivo final, uma vez, com as linhas do diário de execuções anteriores
+            diario.aplicar(df)
+            with diario.salvando_xlsx():
+                gravar_dataframe(df, arquivo_saida)
+            if not self.parar_flag.is_set() and not self.cancelar_flag.is_set():
+                diario.descartar()
+            custo_gravacao = diario.resumo_custo()
+            self.logger.info(f"Obter Dívida: {custo_gravacao}")
+            self.logger.info(f"Obter Dívida: {controlador.resumo(ultimos=len(controlador.historico))}")
+            resumo_cache = formatar_estatisticas_cache(cache.estatisticas())
+            self.logger.info(f"Obter Dívida: {resumo_cache}")
             
             if not self.cancelar_flag.is_set():
-                self.atualizar_progresso(100, "Processamento concluído!")
-                messagebox.showinfo("Sucesso", f"Arquivo salvo: {arquivo_saida}")
+                if self.parar_flag.is_set():
+                    self.atualizar_progresso(100, f"⏸️ Interrompido: {linhas_processadas}/{total} CPFs processados | {custo_gravacao} | {resumo_cache}")
+                    messagebox.showinfo("Interrompido", f"Progresso salvo ({linhas_processadas}/{total}): {arquivo_saida}\n{resumo_cache}")
+                else:
+                    self.atualizar_progresso(100, f"Processamento concluído! | {custo_gravacao} | {resumo_cache}")
+                    messagebox.showinfo("Sucesso", f"Arquivo salvo: {arquivo_saida}\n{resumo_cache}")
             
         except Exception as e:
             self.logger.critical(f"Erro crítico em obter dívida: {e}")
@@ -1251,7 +1487,7 @@ class Python4WorkPro:
         """Executa extração de dados JSON"""
         try:
             # Ler arquivo
-            df = pd.read_excel(arquivo_entrada)
+            df = ler_xlsx(arquivo_entrada, colunas=['corpo_requisicao'])
             total_linhas = len(df)
             
             self.atualizar_progresso(0, f"Iniciando extração de {total_linhas} registros JSON...")
@@ -1262,10 +1498,15 @@ class Python4WorkPro:
                 self.voltar_menu()
                 return
             
-            # Processar dados JSON
+            # Processar dados JSON: json.loads + achatamento nos processos do estágio de CPU,
+            # em lotes, com os resultados na ordem das linhas
+            from core.cpu_executor import obter_estagio_cpu
+            from src.extrair_json_corpo_requisicao import achatar_corpo_requisicao
+            
             registros = []
+            itens = zip(df.index, df['corpo_requisicao'])
             
-            for idx, row in df.iterrows():
+            for idx, registro in enumerate(obter_estagio_cpu(self.config).mapear(achatar_corpo_requisicao, itens)):
                 if self.cancelar_flag.is_set():
                     break
                 
@@ -1273,65 +1514,18 @@ class Python4WorkPro:
                     self.atualizar_progresso((idx/total_linhas)*100, "Processo pausado...")
                     self.parar_flag.wait()
                 
-                try:
-                    corpo_requisicao = row['corpo_requisicao']
-                    
-                    # Tentar extrair JSON
-                    if pd.notna(corpo_requisicao) and corpo_requisicao.strip():
-                        try:
-                            dados_json = json.loads(corpo_requisicao)
-                            
-                            # Extrair campos principais
-                            registro = {'linha_original': idx + 1}
-                            
-                            # Função recursiva para extrair dados
-                            def extrair_campos(data, prefix=""):
-                                if isinstance(data, dict):
-                                    for key, value in data.items():
-                                        new_key = f"{prefix}{key}" if prefix else key
-                                        if isinstance(value, (dict, list)):
-                                            extrair_campos(value, f"{new_key}_")
-                                        else:
-                                            registro[new_key] = value
-                                elif isinstance(data, list):
-                                    for i, item in enumerate(data):
-                                        extrair_campos(item, f"{prefix}{i}_")
-                            
-                            extrair_campos(dados_json)
-                            registros.append(registro)
-                            
-                        except json.JSONDecodeError:
-                            # JSON inválido
-                            registro = {
-                                'linha_original': idx + 1,
-                                'erro': 'JSON inválido',
-                                'corpo_original': str(corpo_requisicao)[:100]
-                            }
-                            registros.append(registro)
-                    else:
-                        # Vazio
-                        registro = {
-                            'linha_original': idx + 1,
-                            'erro': 'Campo vazio'
-                        }
-                        registros.append(registro)
-                    
-                    # Atualizar progresso
-                    progresso = ((idx + 1) / total_linhas) * 100
-                    self.atualizar_progresso(progresso, f"Processando JSON {idx + 1}/{total_linhas}")
-                    
-                except Exception as e:
-                    self.logger.error(f"Erro na linha {idx + 1}: {e}")
-                    registro = {
-                        'linha_original': idx + 1,
-                        'erro': f"Erro: {str(e)}"
-                    }
-                    registros.append(registro)
+                if str(registro.get('erro', '')).startswith('Erro:'):
+                    self.logger.error(f"Erro na linha {idx + 1}: {registro['erro'][len('Erro: '):]}")
+                registros.append(registro)
+                
+                # Atualizar progresso
+                progresso = ((idx + 1) / total_linhas) * 100
+                self.atualizar_progresso(progresso, f"Processando JSON {idx + 1}/{total_linhas}")
             
             # Criar DataFrame com resultados
             if registros:
                 resultado_df = pd.DataFrame(registros)
-                resultado_df.to_excel(arquivo_saida, index=False)
+                gravar_dataframe(resultado_df, arquivo_saida)
                 
                 if not self.cancelar_flag.is_set():
                     self.atualizar_progresso(100, "Extração concluída!")
@@ -1383,6 +1577,8 @@ class Python4WorkPro:
     def executar_conversor(self, arquivos_csv, pasta_destino):
         """Executa conversão CSV para XLSX"""
         try:
+            from src.conversor_csv_xlsx import converter_csv_xlsx
+            
             total_arquivos = len(arquivos_csv)
             self.atualizar_progresso(0, f"Convertendo {total_arquivos} arquivos...")
             
@@ -1394,30 +1590,9 @@ class Python4WorkPro:
                     break
                 
                 try:
-                    # Detectar delimitador
-                    delimitador = ','
-                    try:
-                        with open(arquivo_csv, 'r', encoding='utf-8') as f:
-                            primeira_linha = f.readline()
-                            if ';' in primeira_linha:
-                                delimitador = ';'
-                            elif '\t' in primeira_linha:
-                                delimitador = '\t'
-                    except:
-                        pass
-                    
-                    # Ler CSV
-                    df = pd.read_csv(arquivo_csv, delimiter=delimitador, encoding='utf-8')
-                    
-                    # Limpar cabeçalhos
-                    df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", '')
-                    
-                    # Nome do arquivo de saída
-                    nome_base = os.path.splitext(os.path.basename(arquivo_csv))[0]
-                    arquivo_xlsx = os.path.join(pasta_destino, f"{nome_base}.xlsx")
-                    
-                    # Salvar como Excel
-                    df.to_excel(arquivo_xlsx, index=False)
+                    # Lido e gravado em blocos (src/conversor_csv_xlsx.py, o mesmo da linha de comando)
+                    arquivo_xlsx = converter_csv_xlsx(arquivo_csv, pasta_destino)
+                    nome_base = os.path.splitext(os.path.basename(arquivo_xlsx))[0]
                     arquivos_convertidos.append(arquivo_xlsx)
                     
                     # Atualizar progresso
@@ -1536,31 +1711,43 @@ class Python4WorkPro:
     def executar_filtrar_duplicatas_thread(self, arquivo_entrada, arquivo_saida):
         """Thread para executar resolução de duplicatas"""
         try:
-            from src.filtrar_duplicatas import filtrar_duplicatas_cpf_data, salvar_arquivo_com_formatacao
+            from src.filtrar_duplicatas import (contar_regras, deve_particionar, filtrar_duplicatas_cpf_data,
+                                               filtrar_duplicatas_particionado, gravar_relatorio_duplicatas,
+                                               salvar_arquivo_com_formatacao, COLUNAS_DUPLICATAS)
             
             self.atualizar_progresso(10, "📂 Carregando arquivo...")
             
-            # Carregar arquivo
-            df = pd.read_excel(arquivo_entrada)
-            total_inicial = len(df)
-            
-            self.logger.info(f"Resolver Duplicatas: Arquivo carregado - {total_inicial} registros")
-            self.atualizar_progresso(30, f"🔍 Analisando {total_inicial} registros...")
-            
-            # Verificar se arquivo tem dados
-            if total_inicial == 0:
-                raise ValueError("❌ Arquivo está vazio")
-            
-            # Verificar colunas necessárias
-            colunas_necessarias = ['cpf', 'data_vencimento', 'numero_prestacao', 'cod_prestacao']
-            colunas_faltantes = [col for col in colunas_necessarias if col not in df.columns]
-            
-            if colunas_faltantes:
-                raise ValueError(f"❌ Colunas não encontradas: {', '.join(colunas_faltantes)}")
-            
-            # Resolver duplicatas aplicando regras inteligentes
-            self.atualizar_progresso(50, "🎯 Aplicando regras inteligentes...")
-            df_resolvidos = filtrar_duplicatas_cpf_data(df)
+            if deve_particionar(arquivo_entrada, self.config):
+                # Planilha maior que performance.memory_limit_mb: particionada por CPF no disco
+                self.logger.info("Resolver Duplicatas: arquivo grande, resolvendo em partições",
+                                 limite_memoria_mb=self.config.get('performance.memory_limit_mb'))
+                df_resolvidos, total_inicial = filtrar_duplicatas_particionado(
+                    arquivo_entrada, self.config, ao_progresso=lambda mensagem: self.atualizar_progresso(50, mensagem))
+                
+                if total_inicial == 0:
+                    raise ValueError("❌ Arquivo está vazio")
+            else:
+                # Carregar arquivo
+                df = ler_xlsx(arquivo_entrada)
+                total_inicial = len(df)
+                
+                self.logger.info(f"Resolver Duplicatas: Arquivo carregado - {total_inicial} registros")
+                self.atualizar_progresso(30, f"🔍 Analisando {total_inicial} registros...")
+                
+                # Verificar se arquivo tem dados
+                if total_inicial == 0:
+                    raise ValueError("❌ Arquivo está vazio")
+                
+                # Verificar colunas necessárias
+                colunas_faltantes = [col for col in COLUNAS_DUPLICATAS if col not in df.columns]
+                
+                if colunas_faltantes:
+                    raise ValueError(f"❌ Colunas não encontradas: {', '.join(colunas_faltantes)}")
+                
+                # Resolver duplicatas aplicando regras inteligentes
+                self.atualizar_progresso(50, "🎯 Aplicando regras inteligentes...")
+                df_resolvidos = filtrar_duplicatas_cpf_data(df)
+                del df
             
             registros_resolvidos = len(df_resolvidos)
             
@@ -1573,25 +1760,8 @@ class Python4WorkPro:
             salvar_arquivo_com_formatacao(df_resolvidos, arquivo_saida)
             
             # Gerar relatório de resolução
-            relatorio_file = arquivo_saida.replace('.xlsx', '_relatorio_duplicatas.txt')
-            grupos_resolvidos = len(df_resolvidos.groupby(['cpf', 'data_vencimento', 'numero_prestacao']))
-            
-            with open(relatorio_file, "w", encoding="utf-8") as f:
-                f.write(f"=== RELATÓRIO DE RESOLUÇÃO DE DUPLICATAS ===\n")
-                f.write(f"Data/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Arquivo original: {os.path.basename(arquivo_entrada)}\n")
-                f.write(f"Arquivo de resultado: {os.path.basename(arquivo_saida)}\n")
-                f.write(f"Total de registros originais: {total_inicial}\n")
-                f.write(f"Grupos de duplicatas resolvidos: {grupos_resolvidos}\n")
-                f.write(f"Registros corretos escolhidos: {registros_resolvidos}\n")
-                f.write(f"Taxa de duplicação: {(grupos_resolvidos/total_inicial*100) if total_inicial > 0 else 0:.1f}%\n")
-                f.write("=" * 60 + "\n\n")
-                f.write("REGRAS APLICADAS:\n")
-                f.write("1. Se tiver data_pagamento: salva linha sem data_pagamento\n")
-                f.write("2. Se ambos têm data_pagamento: prioriza cod_acordo=0\n")
-                f.write("3. Se ambos têm data_pagamento e cod_acordo: menor cod_prestacao\n")
-                f.write("4. Se data_pagamento null: prioriza cod_acordo=0\n")
-                f.write("5. Se data_pagamento null e ambos têm cod_acordo: menor cod_prestacao\n")
+            relatorio_file, grupos_resolvidos = gravar_relatorio_duplicatas(
+                df_resolvidos, arquivo_entrada, arquivo_saida, total_inicial)
             
             self.atualizar_progresso(100, "✅ Resolução concluída!")
             
@@ -1599,9 +1769,11 @@ class Python4WorkPro:
             self.logger.log_user_action(f"Resolver Duplicatas: Concluído com sucesso", 
                                        registros_originais=total_inicial,
                                        grupos_resolvidos=grupos_resolvidos,
-                                       registros_corretos_salvos=registros_resolvidos)
+                                       registros_corretos_salvos=registros_resolvidos,
+                                       regras={regra: quantidade for regra, _, quantidade in contar_regras(df_resolvidos)})
             
             # Mostrar resultado
+            regras_msg = "\n".join(f"• {regra}: {quantidade:,}" for regra, _, quantidade in contar_regras(df_resolvidos))
             resultado_msg = f"""✅ Resolução de duplicatas concluída!
 
 📊 Registros originais: {total_inicial:,}
@@ -1611,9 +1783,7 @@ class Python4WorkPro:
 📝 Relatório salvo: {os.path.basename(relatorio_file)}
 
 🎯 Regras aplicadas:
-• Prioriza registros sem data_pagamento
-• Escolhe cod_acordo=0 quando aplicável  
-• Usa menor cod_prestacao como desempate"""
+{regras_msg}"""
             
             messagebox.showinfo("Resolução Concluída", resultado_msg)
             
@@ -1803,7 +1973,14 @@ class Python4WorkPro:
             mes_or_mode: mode string - 'file' or 'manual'
         """
         try:
-            from src.consulta_boleto_mensal import run_consulta_boleto, run_consulta_boleto_from_rows
+            from src.consulta_boleto_mensal import run_consulta_boleto, run_consulta_boleto_from_rows, CONCORRENCIA_INICIAL, URL_DIVIDA
+            from core.concurrency import ControladorAIMD
+            from core.rate_limiter import registrar_endpoint
+            from core.response_cache import CACHE_DIVIDA, obter_cache, formatar_estatisticas_cache
+
+            registrar_endpoint("URL_DIVIDA", URL_DIVIDA, self.config)
+            cache = obter_cache(CACHE_DIVIDA, self.config)
+            cache.zerar_contadores()
 
             self.mostrar_progresso('Consulta Boleto Mensal')
             self.atualizar_progresso(5, 'Iniciando consulta...')
@@ -1813,16 +1990,29 @@ class Python4WorkPro:
             # In our call we pass periods via the `ano` parameter
             period_lines = ano
 
+            self.btn_parar.config(state="normal")
+            self.btn_cancelar.config(state="normal")
+            controlador = ControladorAIMD.de_config(self.config, CONCORRENCIA_INICIAL, endpoints=[URL_DIVIDA])
+            controles = dict(max_workers=controlador, parar_evento=self.parar_flag, cancelar_evento=self.cancelar_flag,
+                             on_progresso=self.criar_callback_progresso('Consultando CPFs', 5, 99, controlador))
+
             if mode == 'manual':
                 # arquivo_entrada is actually rows list
                 rows = arquivo_entrada
-                run_consulta_boleto_from_rows(rows, arquivo_saida, period_lines)
+                resultado = run_consulta_boleto_from_rows(rows, arquivo_saida, period_lines, **controles)
             else:
-                run_consulta_boleto(arquivo_entrada, arquivo_saida, period_lines)
+                resultado = run_consulta_boleto(arquivo_entrada, arquivo_saida, period_lines, **controles)
 
             elapsed = time.time() - start
-            self.atualizar_progresso(100, f'Concluído em {elapsed:.1f}s')
-            messagebox.showinfo('Sucesso', f'Consulta concluída! Arquivo salvo:\n{arquivo_saida}')
+            self.logger.info(f"Consulta Boleto Mensal: {formatar_estatisticas_cache(cache.estatisticas())}")
+            if resultado is None:
+                self.atualizar_progresso(0, 'Consulta cancelada. Nenhum arquivo gerado.')
+            elif self.parar_flag.is_set():
+                self.atualizar_progresso(100, f'Interrompido em {elapsed:.1f}s')
+                messagebox.showinfo('Interrompido', f'Consulta interrompida. Resultados parciais salvos:\n{arquivo_saida}')
+            else:
+                self.atualizar_progresso(100, f'Concluído em {elapsed:.1f}s')
+                messagebox.showinfo('Sucesso', f'Consulta concluída! Arquivo salvo:\n{arquivo_saida}')
 
         except Exception as e:
             self.logger.error(f'Erro em Consulta Boleto Mensal: {e}')
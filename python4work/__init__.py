@@ -0,0 +1,4 @@
+"""
+Python4Work sem Interface Gráfica
+Ponto de entrada da linha de comando: python -m python4work <funcionalidade> --input ... --output ...
+"""
@@ -0,0 +1,476 @@
+"""
+Linha de Comando do Python4Work
+Cada funcionalidade sem Tkinter, com as mesmas funções de src/ usadas pelas telas; progresso em JSON no stderr
+
+Uso:
+    python -m python4work divida --input cpfs.xlsx --output dividas.xlsx
+    python -m python4work acordo --input dividas.xlsx --output acordos.xlsx --workers 20
+    python -m python4work boleto --input alunos.xlsx --output boletos.xlsx --periodos 2025-08 2025-09
+    python -m python4work extrair-json --input requisicoes.xlsx --output campos.xlsx --workers 4
+    python -m python4work converter --input a.csv b.csv --output pasta_destino
+    python -m python4work duplicatas --input parcelas.xlsx --output corretos.xlsx
+
+--workers: consultas simultâneas (divida, acordo, boleto) ou processos do estágio de CPU
+(extrair-json, converter, duplicatas); "auto" (padrão) usa o config.json.
+
+stdout recebe os logs; stderr, uma linha JSON por evento ("inicio", "etapa", "progresso", "fim").
+Ctrl+C: termina as consultas em voo e salva o parcial (código 130); um segundo Ctrl+C cancela.
+
+Códigos de saída: 0 concluído, 1 erro, 2 uso incorreto, 3 entrada inválida,
+4 credenciais/.env ausentes, 130 interrompido.
+"""
+
+import argparse
+import importlib
+import json
+import signal
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+# Raiz do projeto no path: core/ e src/ como nas telas
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SAIDA_OK = 0
+SAIDA_ERRO = 1
+SAIDA_ENTRADA_INVALIDA = 3
+SAIDA_CONFIGURACAO = 4
+SAIDA_INTERROMPIDO = 130
+
+# No máximo uma linha de progresso por intervalo (segundos); a última sempre sai
+INTERVALO_PROGRESSO = 1.0
+
+
+class EntradaInvalida(ValueError):
+    """Arquivo de entrada sem as colunas ou valores esperados"""
+
+
+class ConfiguracaoAusente(RuntimeError):
+    """Variáveis do .env que o módulo exige na importação não encontradas"""
+
+
+class Relator:
+    """Eventos da execução como linhas JSON no stderr (logs e prints dos módulos ficam no stdout)"""
+
+    def __init__(self, comando: str, fluxo=None, intervalo: float = INTERVALO_PROGRESSO):
+        self.comando = comando
+        self.fluxo = fluxo or sys.stderr
+        self.intervalo = intervalo
+        self._ultimo = 0.0
+        # Reentrante: o tratador de Ctrl+C emite na mesma thread que pode estar escrevendo
+        self._lock = threading.RLock()
+
+    def emitir(self, evento: str, **dados):
+        linha = json.dumps({"evento": evento, "comando": self.comando, "instante": round(time.time(), 3), **dados},
+                           ensure_ascii=False, default=str)
+        with self._lock:
+            self.fluxo.write(linha + "\n")
+            self.fluxo.flush()
+
+    def etapa(self, mensagem: str, **dados):
+        self.emitir("etapa", mensagem=mensagem, **dados)
+
+    def progresso(self, concluidos, total, req_por_seg=None, eta=None):
+        """Callback on_progresso do EscalonadorJanela (concluidos, total, req/s, ETA em segundos)"""
+        agora = time.monotonic()
+        with self._lock:
+            if concluidos != total and agora - self._ultimo < self.intervalo:
+                return
+            self._ultimo = agora
+        dados = {"concluidos": concluidos, "total": total,
+                 "percentual": round(concluidos / total * 100, 1) if total else None}
+        if req_por_seg is not None:
+            dados["req_por_seg"] = round(req_por_seg, 2)
+        if eta is not None:
+            dados["eta_s"] = round(eta, 1)
+        self.emitir("progresso", **dados)
+
+    def contador(self, total: int):
+        """Para laços fora do EscalonadorJanela: cada chamada conta itens concluídos e reporta vazão e ETA"""
+        inicio = time.monotonic()
+        concluidos = 0
+
+        def concluir(quantidade: int = 1):
+            nonlocal concluidos
+            concluidos += quantidade
+            decorrido = time.monotonic() - inicio
+            vazao = concluidos / decorrido if decorrido > 0 else 0.0
+            self.progresso(concluidos, total, vazao, (total - concluidos) / vazao if vazao else None)
+            return concluidos
+        return concluir
+
+    def fim(self, codigo: int, **dados):
+        self.emitir("fim", codigo=codigo, **dados)
+
+
+def tipo_workers(valor: str):
+    if valor == "auto":
+        return valor
+    try:
+        workers = int(valor)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"esperado um inteiro >= 1 ou 'auto', recebido {valor!r}")
+    if workers < 1:
+        raise argparse.ArgumentTypeError(f"esperado um inteiro >= 1 ou 'auto', recebido {valor!r}")
+    return workers
+
+
+def importar_modulo_rede(nome: str):
+    """Módulos de consulta validam o .env ao serem importados; a falha vira ConfiguracaoAusente"""
+    try:
+        return importlib.import_module(nome)
+    except ValueError as e:
+        raise ConfiguracaoAusente(str(e)) from e
+
+
+def controlador_rede(args, config, inicial: int, url: str):
+    """--workers auto: ControladorAIMD do config.json, como nas telas; número: concorrência fixa"""
+    from core.concurrency import ControladorAIMD
+
+    if args.workers == "auto":
+        return ControladorAIMD.de_config(config, inicial, endpoints=[url])
+    return ControladorAIMD(inicial=args.workers, minimo=args.workers, maximo=args.workers, endpoints=[url])
+
+
+def aplicar_workers_cpu(args, config):
+    """--workers dos comandos de CPU: performance.cpu_workers só nesta execução (o config.json não é gravado)"""
+    if args.workers != "auto":
+        config.config.setdefault('performance', {})['cpu_workers'] = args.workers
+
+
+def salvar_com_diario(df, diario, caminho_saida: str, parar: threading.Event) -> str:
+    """Grava o resultado com as linhas do diário de execuções anteriores; concluído, o diário é descartado"""
+    from core.xlsx_writer import gravar_dataframe
+
+    diario.aplicar(df)
+    with diario.salvando_xlsx():
+        gravar_dataframe(df, caminho_saida)
+    if not parar.is_set():
+        diario.descartar()
+    return diario.resumo_custo()
+
+
+def comando_acordo(args, config, logger, relator, parar, cancelar):
+    from core.checkpoint import abrir_diario
+    from core.http_session import formatar_estatisticas_conexoes
+    from core.rate_limiter import registrar_endpoint
+    from core.xlsx_reader import ler_xlsx
+
+    acordo = importar_modulo_rede("src.consultar_acordo")
+    registrar_endpoint("URL", acordo.URL, config)
+
+    relator.etapa("Carregando arquivo", arquivo=args.input)
+    df = ler_xlsx(args.input)
+    total = len(df)
+    try:
+        acordo.validar_dados_entrada(df)
+    except Exception as e:
+        raise EntradaInvalida(str(e)) from e
+    if 'status_acordo' not in df.columns:
+        df['status_acordo'] = ''
+
+    diario = abrir_diario("consultar_acordo", args.input, config)
+    pendentes = diario.pendentes(total, acordo.STATUS_REPETIR, "status_acordo")
+    if diario.retomado:
+        relator.etapa("Retomando checkpoint", diario=str(diario.caminho), concluidas=total - len(pendentes))
+    controlador = controlador_rede(args, config, acordo.CONCORRENCIA_INICIAL, acordo.URL)
+    linhas = ((i, df.iloc[i]) for i in pendentes)
+    processadas = 0
+
+    relator.etapa("Consultando acordos", pendentes=len(pendentes), total=total)
+    try:
+        if args.assincrono or config.get('performance.async_engine', False):
+            concluir = relator.contador(len(pendentes))
+
+            def on_resultado(index, status):
+                nonlocal processadas
+                df.at[index, "status_acordo"] = status
+                diario.registrar(index, status_acordo=status)
+                processadas = concluir()
+
+            acordo.processar_acordos_async(linhas, controlador.limite, on_resultado, parar)
+        else:
+            for index, status in acordo.consultar_linhas(linhas, controlador, parar, cancelar,
+                                                         relator.progresso, len(pendentes)):
+                df.at[index, "status_acordo"] = status
+                diario.registrar(index, status_acordo=status)
+                processadas += 1
+    finally:
+        diario.fechar()
+
+    relator.etapa("Salvando resultado", arquivo=args.output)
+    custo = salvar_com_diario(df, diario, args.output, parar)
+    resumo_conexoes = formatar_estatisticas_conexoes(acordo.estatisticas_conexoes())
+    logger.info(f"Consultar Acordo: {custo} | {resumo_conexoes}")
+    logger.info(f"Consultar Acordo: {controlador.resumo(ultimos=len(controlador.historico))}")
+    return {"arquivo": args.output, "processadas": processadas, "total": total}
+
+
+def comando_divida(args, config, logger, relator, parar, cancelar):
+    from core.checkpoint import abrir_diario
+    from core.rate_limiter import registrar_endpoint
+    from core.response_cache import CACHE_DIVIDA, formatar_estatisticas_cache, obter_cache
+    from core.xlsx_reader import ler_xlsx
+
+    divida = importar_modulo_rede("src.obter_divida_cpf")
+    registrar_endpoint("URL_DIVIDA", divida.URL_DIVIDA, config)
+    cache = obter_cache(CACHE_DIVIDA, config)
+    cache.zerar_contadores()
+
+    relator.etapa("Carregando arquivo", arquivo=args.input)
+    df = ler_xlsx(args.input, como_texto=True)
+    df.columns = df.columns.str.strip().str.lower()
+    if "cpf" not in df.columns:
+        raise EntradaInvalida("Arquivo deve conter coluna 'cpf'")
+    df.fillna("", inplace=True)
+    for col in ['cod_cliente', 'cod_acordo', 'status', 'observacao']:
+        if col not in df.columns:
+            df[col] = ""
+    total = len(df)
+
+    diario = abrir_diario("obter_divida", args.input, config)
+    pendentes = diario.pendentes(total, divida.STATUS_REPETIR, "status")
+    if diario.retomado:
+        relator.etapa("Retomando checkpoint", diario=str(diario.caminho), concluidas=total - len(pendentes))
+    controlador = controlador_rede(args, config, divida.CONCORRENCIA_INICIAL, divida.URL_DIVIDA)
+    linhas = ((i, df.iloc[i]) for i in pendentes)
+    processadas = 0
+
+    relator.etapa("Consultando CPFs", pendentes=len(pendentes), total=total)
+    try:
+        for i, status, observacao, cod_cliente, cod_acordo in divida.processar_linhas_cpf(
+                linhas, controlador, parar, cancelar, relator.progresso):
+            df.at[i, "status"] = status
+            df.at[i, "observacao"] = observacao
+            df.at[i, "cod_cliente"] = cod_cliente
+            df.at[i, "cod_acordo"] = cod_acordo
+            diario.registrar(i, status=status, observacao=observacao, cod_cliente=cod_cliente, cod_acordo=cod_acordo)
+            processadas += 1
+    finally:
+        diario.fechar()
+
+    relator.etapa("Salvando resultado", arquivo=args.output)
+    custo = salvar_com_diario(df, diario, args.output, parar)
+    logger.info(f"Obter Dívida: {custo} | {formatar_estatisticas_cache(cache.estatisticas())}")
+    logger.info(f"Obter Dívida: {controlador.resumo(ultimos=len(controlador.historico))}")
+    return {"arquivo": args.output, "processadas": processadas, "total": total, "cache": cache.estatisticas()}
+
+
+def comando_boleto(args, config, logger, relator, parar, cancelar):
+    from core.rate_limiter import registrar_endpoint
+    from core.response_cache import CACHE_DIVIDA, formatar_estatisticas_cache, obter_cache
+
+    boleto = importar_modulo_rede("src.consulta_boleto_mensal")
+    registrar_endpoint("URL_DIVIDA", boleto.URL_DIVIDA, config)
+    cache = obter_cache(CACHE_DIVIDA, config)
+    cache.zerar_contadores()
+
+    controlador = controlador_rede(args, config, boleto.CONCORRENCIA_INICIAL, boleto.URL_DIVIDA)
+    relator.etapa("Consultando boletos", arquivo=args.input, periodos=args.periodos)
+    try:
+        resultado = boleto.run_consulta_boleto(args.input, args.output, args.periodos, max_workers=controlador,
+                                               parar_evento=parar, cancelar_evento=cancelar,
+                                               on_progresso=relator.progresso)
+    except ValueError as e:
+        # Períodos inválidos ou planilha sem a coluna cpf
+        raise EntradaInvalida(str(e)) from e
+    logger.info(f"Consulta Boleto Mensal: {formatar_estatisticas_cache(cache.estatisticas())}")
+    # None: cancelado antes de gravar
+    return {"arquivo": None if resultado is None else args.output,
+            "linhas": None if resultado is None else len(resultado)}
+
+
+def comando_extrair_json(args, config, logger, relator, parar, cancelar):
+    import pandas as pd
+    from core.cpu_executor import obter_estagio_cpu
+    from core.xlsx_reader import ler_xlsx
+    from core.xlsx_writer import gravar_dataframe
+    from src.extrair_json_corpo_requisicao import achatar_corpo_requisicao
+
+    aplicar_workers_cpu(args, config)
+    relator.etapa("Carregando arquivo", arquivo=args.input)
+    df = ler_xlsx(args.input, colunas=['corpo_requisicao'])
+    if 'corpo_requisicao' not in df.columns:
+        raise EntradaInvalida("Arquivo deve conter coluna 'corpo_requisicao'")
+    total = len(df)
+
+    # json.loads + achatamento nos processos do estágio de CPU, com os resultados na ordem das linhas
+    relator.etapa("Extraindo JSON", total=total)
+    registros = []
+    erros = 0
+    concluir = relator.contador(total)
+    for idx, registro in enumerate(obter_estagio_cpu(config).mapear(
+            achatar_corpo_requisicao, zip(df.index, df['corpo_requisicao']))):
+        if parar.is_set():
+            break
+        if 'erro' in registro:
+            erros += 1
+            if str(registro['erro']).startswith('Erro:'):
+                logger.error(f"Erro na linha {idx + 1}: {registro['erro'][len('Erro: '):]}")
+        registros.append(registro)
+        concluir()
+
+    if not registros:
+        raise EntradaInvalida("Nenhum registro extraído")
+    relator.etapa("Salvando resultado", arquivo=args.output)
+    gravar_dataframe(pd.DataFrame(registros), args.output)
+    return {"arquivo": args.output, "processadas": len(registros), "total": total, "erros": erros}
+
+
+def comando_converter(args, config, logger, relator, parar, cancelar):
+    from src.conversor_csv_xlsx import converter_csv_xlsx
+
+    Path(args.output).mkdir(parents=True, exist_ok=True)
+    convertidos, erros = [], []
+    concluir = relator.contador(len(args.input))
+    for arquivo_csv in args.input:
+        if parar.is_set():
+            break
+        try:
+            convertidos.append(converter_csv_xlsx(arquivo_csv, args.output))
+        except Exception as e:
+            logger.error(f"Erro ao converter {arquivo_csv}: {e}")
+            erros.append({"arquivo": arquivo_csv, "erro": str(e)})
+        concluir()
+
+    if erros and not convertidos:
+        raise EntradaInvalida(f"Nenhum arquivo convertido ({len(erros)} com erro)")
+    return {"arquivos": convertidos, "erros": erros}
+
+
+def comando_duplicatas(args, config, logger, relator, parar, cancelar):
+    from core.xlsx_reader import ler_xlsx
+    from src.filtrar_duplicatas import (COLUNAS_DUPLICATAS, contar_regras, deve_particionar,
+                                        filtrar_duplicatas_cpf_data, filtrar_duplicatas_particionado,
+                                        gravar_relatorio_duplicatas, salvar_arquivo_com_formatacao)
+
+    aplicar_workers_cpu(args, config)
+    if deve_particionar(args.input, config):
+        # Planilha maior que performance.memory_limit_mb: particionada por CPF no disco
+        relator.etapa("Resolvendo em partições", limite_memoria_mb=config.get('performance.memory_limit_mb'))
+        try:
+            df_resolvidos, total_inicial = filtrar_duplicatas_particionado(
+                args.input, config, ao_progresso=lambda mensagem: relator.etapa(mensagem))
+        except ValueError as e:
+            raise EntradaInvalida(str(e)) from e
+    else:
+        relator.etapa("Carregando arquivo", arquivo=args.input)
+        df = ler_xlsx(args.input)
+        total_inicial = len(df)
+        colunas_faltantes = [col for col in COLUNAS_DUPLICATAS if col not in df.columns]
+        if colunas_faltantes:
+            raise EntradaInvalida(f"Colunas não encontradas: {', '.join(colunas_faltantes)}")
+        relator.etapa("Aplicando regras", total=total_inicial)
+        df_resolvidos = filtrar_duplicatas_cpf_data(df)
+        del df
+
+    if total_inicial == 0:
+        raise EntradaInvalida("Arquivo está vazio")
+    if len(df_resolvidos) == 0:
+        raise EntradaInvalida("Nenhum duplicado encontrado no arquivo")
+
+    relator.etapa("Salvando resultado", arquivo=args.output)
+    salvar_arquivo_com_formatacao(df_resolvidos, args.output)
+    relatorio, grupos = gravar_relatorio_duplicatas(df_resolvidos, args.input, args.output, total_inicial)
+    return {"arquivo": args.output, "relatorio": relatorio, "total": total_inicial, "grupos": grupos,
+            "registros_corretos": len(df_resolvidos),
+            "regras": {regra: quantidade for regra, _, quantidade in contar_regras(df_resolvidos)}}
+
+
+COMANDOS = {
+    "acordo": (comando_acordo, "Consultar Acordo: status_acordo de cada cod_cliente/cod_acordo"),
+    "divida": (comando_divida, "Obter Dívida: cod_cliente/cod_acordo por CPF e data_pagamento"),
+    "boleto": (comando_boleto, "Consulta Boleto Mensal: boletos dos CPFs nos períodos informados"),
+    "extrair-json": (comando_extrair_json, "Extrair JSON: campos de corpo_requisicao achatados em colunas"),
+    "converter": (comando_converter, "Converter CSV/XLSX: cada CSV em um .xlsx na pasta de saída"),
+    "duplicatas": (comando_duplicatas, "Resolver Duplicatas: um registro correto por cpf/vencimento/prestação"),
+}
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m python4work", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="comando", required=True, metavar="funcionalidade")
+    for nome, (_, ajuda) in COMANDOS.items():
+        sub = subparsers.add_parser(nome, help=ajuda, description=ajuda)
+        if nome == "converter":
+            sub.add_argument("--input", required=True, nargs="+", help="arquivos .csv")
+            sub.add_argument("--output", required=True, help="pasta de destino dos .xlsx")
+        else:
+            sub.add_argument("--input", required=True, help="planilha .xlsx de entrada")
+            sub.add_argument("--output", required=True, help="planilha .xlsx de resultado")
+        sub.add_argument("--workers", type=tipo_workers, default="auto",
+                         help="consultas simultâneas ou processos de CPU ('auto' = config.json)")
+        if nome == "acordo":
+            sub.add_argument("--async", dest="assincrono", action="store_true",
+                             help="engine assíncrona (como performance.async_engine)")
+        if nome == "boleto":
+            sub.add_argument("--periodos", required=True, nargs="+", help="períodos AAAA-MM (ex.: 2025-08)")
+    return parser
+
+
+def instalar_interrupcao(parar: threading.Event, cancelar: threading.Event, relator: Relator):
+    """Ctrl+C/SIGTERM: o primeiro para (salva o parcial), o segundo cancela, o terceiro encerra na hora"""
+    def ao_sinal(signum, _frame):
+        if not parar.is_set():
+            parar.set()
+            relator.etapa("Interrompendo: terminando o que está em andamento e salvando o parcial")
+        elif not cancelar.is_set():
+            cancelar.set()
+            relator.etapa("Cancelando")
+        else:
+            raise KeyboardInterrupt
+
+    signal.signal(signal.SIGINT, ao_sinal)
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, ao_sinal)
+
+
+def main(argv=None) -> int:
+    args = criar_parser().parse_args(argv)
+
+    from core.config_manager import carregar_config_projeto
+    from core.cpu_executor import encerrar_estagio_cpu
+    from core.professional_logger import LoggerProfissional
+
+    config = carregar_config_projeto()
+    logger = LoggerProfissional("Python4WorkCLI", config)
+    sessao = logger.create_session_log(f"cli-{str(uuid.uuid4())[:8]}")
+    relator = Relator(args.comando)
+    parar, cancelar = threading.Event(), threading.Event()
+    instalar_interrupcao(parar, cancelar, relator)
+
+    funcao, _ = COMANDOS[args.comando]
+    relator.emitir("inicio", entrada=args.input, saida=args.output, workers=args.workers)
+    inicio = time.time()
+    resumo = {}
+    try:
+        resumo = funcao(args, config, logger, relator, parar, cancelar) or {}
+        codigo = SAIDA_INTERROMPIDO if parar.is_set() or cancelar.is_set() else SAIDA_OK
+    except EntradaInvalida as e:
+        logger.error(f"{args.comando}: entrada inválida: {e}")
+        codigo, resumo = SAIDA_ENTRADA_INVALIDA, {"erro": str(e)}
+    except ConfiguracaoAusente as e:
+        logger.error(f"{args.comando}: {e}")
+        codigo, resumo = SAIDA_CONFIGURACAO, {"erro": str(e)}
+    except KeyboardInterrupt:
+        codigo, resumo = SAIDA_INTERROMPIDO, {"erro": "cancelado"}
+    except Exception as e:
+        logger.critical(f"Erro crítico em {args.comando}", exception=e)
+        codigo, resumo = SAIDA_ERRO, {"erro": str(e)}
+    finally:
+        encerrar_estagio_cpu()
+
+    duracao = round(time.time() - inicio, 3)
+    status = "success" if codigo == SAIDA_OK else "interrupted" if codigo == SAIDA_INTERROMPIDO else "error"
+    sessao.log_operation(args.comando, status, codigo=codigo, duracao_s=duracao)
+    sessao.finalize_session({"comando": args.comando, "codigo": codigo, **resumo})
+    relator.fim(codigo, duracao_s=duracao, **resumo)
+    logger.encerrar()
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
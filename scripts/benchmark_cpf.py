@@ -0,0 +1,112 @@
+"""
+Micro-benchmark da limpeza/validação de CPFs
+Compara os métodos por valor do ValidadorDados (re.sub + aritmética em Python) com a API em coluna (NumPy)
+
+Uso:
+    python scripts/benchmark_cpf.py                       # 1.000.000 de CPFs sintéticos
+    python scripts/benchmark_cpf.py --quantidade 200000 --repeticoes 5
+"""
+
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.data_validator import ValidadorDados, limpar_cpf_series
+
+
+def limpar_cpf(cpf_raw):
+    """Mesma limpeza por valor de src/obter_divida_cpf.py (copiada para não exigir as variáveis de ambiente)"""
+    if not isinstance(cpf_raw, str):
+        cpf_raw = str(cpf_raw)
+    cpf_limpo = re.sub(r'\D', '', cpf_raw)
+    return cpf_limpo.zfill(11) if cpf_limpo else ""
+
+
+def gerar_cpf(r: random.Random) -> str:
+    digitos = [r.randint(0, 9) for _ in range(9)]
+    for tamanho in (9, 10):
+        resto = sum(d * p for d, p in zip(digitos, range(tamanho + 1, 1, -1))) % 11
+        digitos.append(0 if resto < 2 else 11 - resto)
+    return ''.join(map(str, digitos))
+
+
+def gerar_coluna(quantidade: int, semente: int = 0) -> pd.Series:
+    """Mistura do que aparece nas planilhas: formatados, só dígitos, sem zeros à esquerda, inválidos e vazios"""
+    r = random.Random(semente)
+    valores = []
+    for _ in range(quantidade):
+        sorteio = r.random()
+        cpf = gerar_cpf(r)
+        if sorteio < 0.4:
+            valores.append(f"{cpf[:3]}.{cpf[3:6]}.{cpf[6:9]}-{cpf[9:]}")
+        elif sorteio < 0.7:
+            valores.append(cpf)
+        elif sorteio < 0.85:
+            valores.append(cpf.lstrip('0') or '0')
+        elif sorteio < 0.95:
+            valores.append(str(r.randint(0, 10 ** r.randint(1, 12))))
+        else:
+            valores.append(r.choice(['', None, 'não informado', '11111111111']))
+    return pd.Series(valores, dtype=object)
+
+
+def medir(funcao, repeticoes: int) -> float:
+    """Melhor tempo (s) de uma chamada"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def comparar(nome, por_valor, em_coluna, repeticoes: int, quantidade: int):
+    if list(por_valor()) != list(em_coluna()):
+        raise SystemExit(f"❌ {nome}: resultados diferentes entre por valor e em coluna")
+    t_valor = medir(por_valor, repeticoes)
+    t_coluna = medir(em_coluna, repeticoes)
+    print(f"{nome:<26} por valor: {t_valor:7.2f} s ({t_valor / quantidade * 1e6:5.2f} µs/CPF) | "
+          f"em coluna: {t_coluna:6.2f} s ({t_coluna / quantidade * 1e6:5.2f} µs/CPF) | {t_valor / t_coluna:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--quantidade", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=3)
+    args = parser.parse_args()
+
+    serie = gerar_coluna(args.quantidade)
+    validador = ValidadorDados()
+    valores = serie.tolist()
+    print(f"📦 {args.quantidade} CPFs sintéticos")
+
+    comparar("limpar_cpf",
+             lambda: [limpar_cpf(v) if v is not None else "" for v in valores],
+             lambda: limpar_cpf_series(serie),
+             args.repeticoes, args.quantidade)
+    comparar("normalize_cpf",
+             lambda: [validador.normalize_cpf(v) for v in valores],
+             lambda: validador.normalize_cpf_series(serie),
+             args.repeticoes, args.quantidade)
+    comparar("validate_cpf(strict=True)",
+             lambda: [validador.validate_cpf(v, strict=True) for v in valores],
+             lambda: validador.validate_cpf_series(serie, strict=True),
+             args.repeticoes, args.quantidade)
+
+    # validate_dataframe antes da API em coluna: iterrows + validate_row (sem a checagem de duplicatas)
+    df = pd.DataFrame({'cpf': serie})
+    comparar("validate_dataframe",
+             lambda: [erro for idx, linha in df.iterrows() for erro in validador.validate_row(linha, ['cpf'], idx)],
+             lambda: [erro for erro in validador.validate_dataframe(df, ['cpf'])[1]
+                      if erro['type'] != 'duplicate_records'],
+             1, args.quantidade)
+
+
+if __name__ == "__main__":
+    main()
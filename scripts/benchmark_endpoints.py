@@ -0,0 +1,231 @@
+"""
+Benchmark dos Módulos de Consulta contra o Servidor de Replay
+Roda o ponto de entrada em lote de cada módulo e mede req/s, latência p50/p95/p99, CPU e pico de RSS
+
+Uso:
+    python scripts/benchmark_endpoints.py                                   # todos os módulos, 2000 linhas
+    python scripts/benchmark_endpoints.py --modulos divida --linhas 5000 --cpfs-distintos 3000
+    python scripts/benchmark_endpoints.py --latencia lognormal:80,0.7 --taxa-429 0.02 --workers 20
+    python scripts/benchmark_endpoints.py --json resultados.json            # para comparar antes/depois
+
+Cada módulo roda em um processo próprio (CPU e pico de RSS isolados), contra uma instância de
+scripts/replay_server.py iniciada aqui. Por padrão o cache de respostas e o limitador de taxa
+ficam desligados, para medir o próprio módulo; --com-cache / --com-limite usam o config.json.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.request import urlopen
+
+try:
+    import resource  # Indisponível no Windows: o pico de RSS não é medido
+except ImportError:
+    resource = None
+
+PASTA_SCRIPTS = Path(__file__).resolve().parent
+RAIZ = PASTA_SCRIPTS.parent
+sys.path.insert(0, str(PASTA_SCRIPTS))
+from replay_server import adicionar_argumentos
+
+MODULOS = ("acordo", "divida", "boleto")
+
+
+def percentil(valores, p: float):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[min(int(round(p / 100 * (len(ordenados) - 1))), len(ordenados) - 1)]
+
+
+def pico_rss_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KB, macOS em bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+# --- Processo filho: executa um módulo ---
+
+def executar_modulo(args) -> dict:
+    sys.path.insert(0, str(RAIZ))
+    from core.config_manager import carregar_config_projeto
+    from core.http_session import adicionar_observador
+    from core.metricas import metricas
+
+    # Ajuste só em memória (nada é gravado no config.json)
+    config = carregar_config_projeto()
+    config.config['performance']['enable_caching'] = args.com_cache
+    config.config['performance']['rate_limit_enabled'] = args.com_limite
+
+    amostras = []
+    adicionar_observador(lambda url, status, latencia, erro=None: amostras.append((status, latencia, erro)))
+
+    workers = None if args.workers == "auto" else int(args.workers)
+    linhas = args.linhas
+    saida = open(os.devnull, "w", encoding="utf-8")
+
+    # Os módulos imprimem por linha: a saída vai para /dev/null, mas o custo de formatar continua medido
+    with contextlib.redirect_stdout(saida):
+        if args.executar == "acordo":
+            from src import consultar_acordo as modulo
+            dados = [(i, {'cod_cliente': str(1000 + i), 'cod_acordo': str(50000 + i)}) for i in range(linhas)]
+            inicio, cpu_inicio = time.perf_counter(), time.process_time()
+            for _ in modulo.consultar_linhas(dados, workers, total=linhas):
+                pass
+        elif args.executar == "divida":
+            from src import obter_divida_cpf as modulo
+            dados = [(i, {'cpf': f"{i % args.cpfs_distintos + 1:011d}", 'data_pagamento': "2025-03-15",
+                          'cod_cliente': "0", 'cod_acordo': "0"}) for i in range(linhas)]
+            inicio, cpu_inicio = time.perf_counter(), time.process_time()
+            for _ in modulo.processar_linhas_cpf(dados, workers):
+                pass
+        else:
+            from src import consulta_boleto_mensal as modulo
+            import tempfile
+            dados = [(str(i), f"{i % args.cpfs_distintos + 1:011d}") for i in range(linhas)]
+            destino = os.path.join(tempfile.mkdtemp(), "boleto.xlsx")
+            inicio, cpu_inicio = time.perf_counter(), time.process_time()
+            modulo.run_consulta_boleto_from_rows(dados, destino, ["2025-03"], max_workers=workers)
+
+    duracao = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu_inicio
+
+    latencias = [latencia * 1000 for _, latencia, _ in amostras if latencia is not None]
+    status = {}
+    for codigo, _, erro in amostras:
+        chave = str(codigo) if codigo is not None else type(erro).__name__
+        status[chave] = status.get(chave, 0) + 1
+
+    return {
+        'modulo': args.executar,
+        'linhas': linhas,
+        'requisicoes': len(amostras),
+        'duracao_s': round(duracao, 3),
+        'req_s': round(len(amostras) / duracao, 1) if duracao else 0.0,
+        'linhas_s': round(linhas / duracao, 1) if duracao else 0.0,
+        'p50_ms': percentil(latencias, 50),
+        'p95_ms': percentil(latencias, 95),
+        'p99_ms': percentil(latencias, 99),
+        'cpu_s': round(cpu, 3),
+        'pico_rss_mb': pico_rss_mb(),
+        'status': status,
+        # Visão de core.metricas: chamadas lógicas (com retries), rede vs parse
+        'metricas': metricas.resumo(),
+    }
+
+
+# --- Processo principal ---
+
+def iniciar_servidor(args):
+    comando = [sys.executable, str(PASTA_SCRIPTS / "replay_server.py"), "--porta", "0",
+               "--latencia", args.latencia, "--taxa-erro", str(args.taxa_erro),
+               "--taxa-429", str(args.taxa_429), "--retry-after", str(args.retry_after),
+               "--semente", str(args.semente)]
+    if args.respostas:
+        comando += ["--respostas", args.respostas]
+    if args.cache_sqlite:
+        comando += ["--cache-sqlite", args.cache_sqlite]
+    processo = subprocess.Popen(comando, stdout=subprocess.PIPE, text=True)
+    primeira = processo.stdout.readline().strip()
+    if not primeira.startswith("PORTA "):
+        processo.kill()
+        raise SystemExit(f"❌ Servidor de replay não iniciou: {primeira!r}")
+    print(processo.stdout.readline().strip())
+    return processo, int(primeira.split()[1])
+
+
+def estatisticas_servidor(porta: int) -> dict:
+    with urlopen(f"http://127.0.0.1:{porta}/estatisticas", timeout=5) as resposta:
+        return json.loads(resposta.read())
+
+
+def rodar_filho(modulo: str, porta: int, args) -> dict:
+    base = f"http://127.0.0.1:{porta}/easycollectorws/easycollectorWs.asmx"
+    ambiente = dict(os.environ, LOGIN="benchmark", SENHA="benchmark",
+                    URL=f"{base}/ConsultarAcordo", URL_DIVIDA=f"{base}/ObterDividaAtivaPorCPF",
+                    PYTHONIOENCODING="utf-8")
+    comando = [sys.executable, str(Path(__file__).resolve()), "--executar", modulo,
+               "--linhas", str(args.linhas), "--cpfs-distintos", str(args.cpfs_distintos),
+               "--workers", str(args.workers)]
+    if args.com_cache:
+        comando.append("--com-cache")
+    if args.com_limite:
+        comando.append("--com-limite")
+    processo = subprocess.run(comando, env=ambiente, cwd=str(RAIZ), capture_output=True, text=True, encoding="utf-8")
+    linhas = [linha for linha in processo.stdout.splitlines() if linha.startswith("{")]
+    if processo.returncode != 0 or not linhas:
+        raise SystemExit(f"❌ {modulo} falhou:\n{processo.stderr[-2000:]}")
+    return json.loads(linhas[-1])
+
+
+def formatar(valor, formato="{:.1f}"):
+    return "—" if valor is None else formato.format(valor)
+
+
+def imprimir_tabela(resultados):
+    cabecalho = (f"{'módulo':<8} {'linhas':>7} {'req':>7} {'req/s':>8} {'linhas/s':>9} "
+                 f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'CPU s':>7} {'RSS MB':>7}  injetados")
+    print("\n" + cabecalho)
+    print("-" * len(cabecalho))
+    for r in resultados:
+        injetados = r.get('servidor', {})
+        print(f"{r['modulo']:<8} {r['linhas']:>7} {r['requisicoes']:>7} {r['req_s']:>8.1f} {r['linhas_s']:>9.1f} "
+              f"{formatar(r['p50_ms']):>7} {formatar(r['p95_ms']):>7} {formatar(r['p99_ms']):>7} "
+              f"{r['cpu_s']:>7.2f} {formatar(r['pico_rss_mb'], '{:.0f}'):>7}  "
+              f"429: {injetados.get('http_429', 0)} | 5xx: {injetados.get('erros_5xx', 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modulos", default=",".join(MODULOS), help=f"lista separada por vírgula: {', '.join(MODULOS)}")
+    parser.add_argument("--linhas", type=int, default=2000)
+    parser.add_argument("--cpfs-distintos", type=int, default=1500, help="CPFs diferentes entre as linhas (divida/boleto)")
+    parser.add_argument("--workers", default="auto", help="requisições em voo fixas, ou 'auto' (controle adaptativo do módulo)")
+    parser.add_argument("--com-cache", action="store_true", help="usa o cache de respostas conforme o config.json")
+    parser.add_argument("--com-limite", action="store_true", help="usa o limitador de taxa conforme o config.json")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--executar", choices=MODULOS, help=argparse.SUPPRESS)
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    if args.executar:
+        resultado = executar_modulo(args)
+        print(json.dumps(resultado), flush=True)
+        return
+
+    modulos = [m.strip() for m in args.modulos.split(",") if m.strip()]
+    desconhecidos = set(modulos) - set(MODULOS)
+    if desconhecidos:
+        raise SystemExit(f"Módulos desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+    servidor, porta = iniciar_servidor(args)
+    resultados = []
+    try:
+        for modulo in modulos:
+            print(f"⏱️ {modulo}: {args.linhas} linhas...", flush=True)
+            antes = estatisticas_servidor(porta)
+            resultado = rodar_filho(modulo, porta, args)
+            depois = estatisticas_servidor(porta)
+            resultado['servidor'] = {chave: depois[chave] - antes.get(chave, 0) for chave in depois}
+            resultados.append(resultado)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=5)
+
+    imprimir_tabela(resultados)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as arquivo:
+            json.dump({'parametros': {k: v for k, v in vars(args).items() if k != 'executar'},
+                       'resultados': resultados}, arquivo, indent=4, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Micro-benchmark do parser de respostas do EasyCollector
+Compara core.easycollector_parser com o caminho anterior (BeautifulSoup + find_all)
+
+Uso:
+    python scripts/benchmark_parser.py                      # respostas sintéticas
+    python scripts/benchmark_parser.py --respostas pasta/   # respostas gravadas (*.xml / *.txt)
+    python scripts/benchmark_parser.py --alocacoes          # memória: envelope lido uma vez × replace
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core import easycollector_parser
+from core.easycollector_parser import analisar_divida, extrair_blocos_divida, extrair_texto_string
+
+
+# --- Caminho anterior (BeautifulSoup), mantido aqui só como referência ---
+
+def _primeiro_inteiro_bs4(elementos):
+    for elem in elementos:
+        if elem is not None and elem.text and elem.text.strip().isdigit():
+            val = int(elem.text.strip())
+            if val != 0:
+                return val
+    return 0
+
+
+def analisar_divida_bs4(response_text):
+    decoded_xml = response_text.replace("&lt;", "<").replace("&gt;", ">")
+    soup = BeautifulSoup(decoded_xml, "xml")
+    divida_ativa_blocks = soup.find_all("DividaAtiva")
+
+    id_cliente_raiz = 0
+    for cliente_block in soup.find_all("ClienteDivida"):
+        id_cliente_elem = cliente_block.find("IdCliente")
+        if id_cliente_elem and id_cliente_elem.text and id_cliente_elem.text.strip().isdigit():
+            id_cliente_raiz = int(id_cliente_elem.text.strip())
+            break
+
+    blocos = []
+    for bloco in divida_ativa_blocks:
+        data_pag_elem = bloco.find("DataPagamento")
+        if data_pag_elem and data_pag_elem.text:
+            blocos.append((
+                data_pag_elem.text.strip(),
+                _primeiro_inteiro_bs4([bloco.find("IdAcordo")]),
+                _primeiro_inteiro_bs4([bloco.find("Identificador")])
+            ))
+
+    return {
+        'id_cliente_raiz': id_cliente_raiz,
+        'blocos': blocos,
+        'global_id_cliente': _primeiro_inteiro_bs4(soup.find_all("IdCliente")),
+        'global_id_acordo': _primeiro_inteiro_bs4(soup.find_all("IdAcordo")),
+        'global_identificador': _primeiro_inteiro_bs4(soup.find_all("Identificador")),
+        'total_blocos': len(divida_ativa_blocks),
+    }
+
+
+def extrair_blocos_bs4(response_text):
+    decoded = response_text.replace("&lt;", "<").replace("&gt;", ">")
+    blocos = []
+    for block in BeautifulSoup(decoded, "xml").find_all("DividaAtiva"):
+        blocos.append({child.name: child.text.strip() if child.text else ""
+                       for child in block.find_all(recursive=False)})
+    return blocos
+
+
+def extrair_texto_string_bs4(content):
+    string_tag = BeautifulSoup(content, "xml").find("string")
+    return string_tag.text if string_tag else None
+
+
+# --- Respostas ---
+
+def gerar_resposta_divida(blocos: int, semente: int, descricao: str = "Mensalidade") -> str:
+    """Resposta no formato de ObterDividaAtivaPorCPF (XML interno escapado dentro de <string>)"""
+    r = random.Random(semente)
+    dividas = []
+    for b in range(blocos):
+        mes = b % 12 + 1
+        dividas.append(
+            "<DividaAtiva>"
+            f"<Identificador>{r.randint(100000, 999999)}</Identificador>"
+            f"<IdAcordo>{r.choice([0, r.randint(1000, 99999)])}</IdAcordo>"
+            f"<DataVencimento>2025-{mes:02d}-10T00:00:00</DataVencimento>"
+            f"<DataPagamento>2025-{mes:02d}-{r.randint(10, 28)}T00:00:00</DataPagamento>"
+            f"<ValorOriginal>{r.uniform(50, 900):.2f}</ValorOriginal>"
+            f"<ValorAtualizado>{r.uniform(50, 1200):.2f}</ValorAtualizado>"
+            f"<Descricao>{escape(descricao)}</Descricao><Situacao>Aberto</Situacao>"
+            "</DividaAtiva>"
+        )
+    interno = (
+        '<ArrayOfClienteDivida xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+        f"<ClienteDivida><IdCliente>{r.randint(1, 99999)}</IdCliente><Nome>ALUNO TESTE</Nome>"
+        f"<Dividas>{''.join(dividas)}</Dividas></ClienteDivida></ArrayOfClienteDivida>"
+    )
+    return f'<?xml version="1.0" encoding="utf-8"?>\n<string xmlns="http://tempuri.org/">{escape(interno)}</string>'
+
+
+def gerar_resposta_acordo(semente: int) -> bytes:
+    """Resposta no formato de ConsultarAcordo"""
+    interno = escape(f"<Acordo><IdAcordo>{semente}</IdAcordo><Status>Ativo</Status></Acordo>")
+    return f'<?xml version="1.0" encoding="utf-8"?>\n<string xmlns="http://tempuri.org/">{interno}</string>'.encode()
+
+
+def carregar_respostas(pasta: str):
+    arquivos = sorted(p for p in Path(pasta).iterdir() if p.suffix.lower() in (".xml", ".txt"))
+    return [p.read_text(encoding="utf-8", errors="replace") for p in arquivos]
+
+
+def medir(funcao, entradas, repeticoes: int) -> float:
+    """Melhor tempo (s) de uma passada por todas as entradas"""
+    melhor = float("inf")
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        for entrada in entradas:
+            funcao(entrada)
+        melhor = min(melhor, time.perf_counter() - inicio)
+    return melhor
+
+
+def analisar_divida_replace(response_text):
+    """Mesmo parser lxml, mas desescapando o documento inteiro com replace (caminho anterior)"""
+    decoded = response_text.replace("&lt;", "<").replace("&gt;", ">")
+    raiz = easycollector_parser._xml(decoded)
+    return easycollector_parser._analisar_divida_eventos(etree.iterwalk(raiz, events=("start", "end")))
+
+
+def pico_memoria(funcao, resposta) -> int:
+    """Pico de memória alocada pelo Python (bytes) durante uma chamada"""
+    tracemalloc.start()
+    try:
+        funcao(resposta)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def comparar_alocacoes(repeticoes):
+    print("\n🧮 Alocações por resposta (tracemalloc, pico acima do documento já em memória)")
+    for blocos in (100, 1000, 5000):
+        resposta = gerar_resposta_divida(blocos, blocos, descricao="Mensalidade & Taxas <2025>")
+        if analisar_divida_replace(resposta) != analisar_divida(resposta):
+            raise SystemExit("❌ alocações: resultados diferentes entre replace e envelope")
+        pico_replace = pico_memoria(analisar_divida_replace, resposta)
+        pico_envelope = pico_memoria(analisar_divida, resposta)
+        t_replace = medir(analisar_divida_replace, [resposta], repeticoes)
+        t_envelope = medir(analisar_divida, [resposta], repeticoes)
+        print(f"{blocos:>5} blocos ({len(resposta) / 1024:7.1f} KB) | replace: {pico_replace / 1024:8.1f} KB, "
+              f"{t_replace * 1000:6.1f} ms | envelope: {pico_envelope / 1024:8.1f} KB, {t_envelope * 1000:6.1f} ms")
+
+    # Entidades no conteúdo: replace deixa &amp; escapado, o envelope entrega o texto correto
+    resposta = gerar_resposta_divida(1, 0, descricao="Mensalidade & Taxas")
+    print(f"Descricao com '&' | replace: {extrair_blocos_bs4(resposta)[0]['Descricao']!r} | "
+          f"envelope: {extrair_blocos_divida(resposta)[0]['Descricao']!r}")
+
+
+def comparar(nome, antigo, novo, entradas, repeticoes):
+    for entrada in entradas:
+        if antigo(entrada) != novo(entrada):
+            raise SystemExit(f"❌ {nome}: resultados diferentes entre BeautifulSoup e lxml")
+    t_antigo = medir(antigo, entradas, repeticoes)
+    t_novo = medir(novo, entradas, repeticoes)
+    n = len(entradas)
+    print(f"{nome:<28} BeautifulSoup: {t_antigo / n * 1e6:9.1f} µs/resp | "
+          f"lxml: {t_novo / n * 1e6:9.1f} µs/resp | {t_antigo / t_novo:5.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--respostas", help="pasta com respostas gravadas de ObterDividaAtivaPorCPF")
+    parser.add_argument("--quantidade", type=int, default=200, help="respostas sintéticas por tamanho")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--alocacoes", action="store_true", help="compara a memória alocada por resposta")
+    args = parser.parse_args()
+
+    if args.alocacoes:
+        comparar_alocacoes(args.repeticoes)
+        return
+
+    if args.respostas:
+        grupos = {"gravadas": carregar_respostas(args.respostas)}
+    else:
+        grupos = {f"{blocos} blocos": [gerar_resposta_divida(blocos, s) for s in range(args.quantidade)]
+                  for blocos in (1, 10, 100)}
+
+    for rotulo, respostas in grupos.items():
+        tamanho = sum(len(r) for r in respostas) / max(len(respostas), 1)
+        print(f"\n📦 {rotulo}: {len(respostas)} respostas, {tamanho / 1024:.1f} KB em média")
+        comparar("obter_divida (analisar)", analisar_divida_bs4, analisar_divida, respostas, args.repeticoes)
+        comparar("boleto (blocos)", extrair_blocos_bs4, extrair_blocos_divida, respostas, args.repeticoes)
+
+    acordos = [gerar_resposta_acordo(s) for s in range(args.quantidade * 5)]
+    print(f"\n📦 ConsultarAcordo: {len(acordos)} respostas")
+    comparar("consultar_acordo (<string>)", extrair_texto_string_bs4, extrair_texto_string, acordos, args.repeticoes)
+
+
+if __name__ == "__main__":
+    main()
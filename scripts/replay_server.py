@@ -0,0 +1,243 @@
+"""
+Servidor de Replay do EasyCollector
+Substituto local de ObterDividaAtivaPorCPF e da consulta de acordo, com respostas gravadas,
+latência configurável e injeção de erros 5xx e 429
+
+Uso:
+    python scripts/replay_server.py --porta 8765 --latencia lognormal:40,0.5 --taxa-erro 0.01 --taxa-429 0.02
+    python scripts/replay_server.py --cache-sqlite cache/divida_cpf.sqlite --respostas gravacoes/
+
+Respostas gravadas:
+    --cache-sqlite  respostas de ObterDividaAtivaPorCPF já guardadas pelo cache persistente (chave = CPF)
+    --respostas     pasta com divida/<cpf>.xml e acordo/<idCliente>_<idAcordo>.xml (ou acordo/*.xml, em rodízio)
+CPFs/acordos sem gravação recebem uma resposta sintética determinística.
+
+Aponte o .env para o servidor (URL e URL_DIVIDA) ou use scripts/benchmark_endpoints.py,
+que sobe o servidor sozinho. GET /estatisticas devolve os contadores em JSON.
+"""
+
+import argparse
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+from benchmark_parser import gerar_resposta_acordo, gerar_resposta_divida
+
+DISTRIBUICOES = ("fixa", "uniforme", "normal", "lognormal")
+
+
+class Latencia:
+    """
+    Distribuição de latência em milissegundos, no formato "tipo:parametros":
+
+    - fixa:50            sempre 50 ms
+    - uniforme:20,80     entre 20 e 80 ms
+    - normal:50,15       média 50 ms, desvio 15 ms (truncada em 0)
+    - lognormal:40,0.5   mediana 40 ms, sigma 0.5 (cauda longa, como a API real)
+    """
+
+    def __init__(self, especificacao: str = "fixa:0"):
+        tipo, _, parametros = especificacao.partition(":")
+        if tipo not in DISTRIBUICOES:
+            raise ValueError(f"Distribuição de latência desconhecida: {tipo} (use {', '.join(DISTRIBUICOES)})")
+        self.tipo = tipo
+        self.parametros = [float(p) for p in parametros.split(",") if p.strip()] or [0.0]
+        self.especificacao = especificacao
+
+    def amostra(self, rng: random.Random) -> float:
+        """Latência sorteada, em segundos"""
+        p = self.parametros
+        if self.tipo == "uniforme":
+            ms = rng.uniform(p[0], p[1] if len(p) > 1 else p[0])
+        elif self.tipo == "normal":
+            ms = rng.gauss(p[0], p[1] if len(p) > 1 else 0.0)
+        elif self.tipo == "lognormal":
+            ms = p[0] * rng.lognormvariate(0.0, p[1] if len(p) > 1 else 0.5)
+        else:
+            ms = p[0]
+        return max(ms, 0.0) / 1000
+
+
+class RespostasGravadas:
+    """Respostas por CPF (ObterDividaAtivaPorCPF) e por acordo, com fallback sintético"""
+
+    def __init__(self, pasta: Optional[str] = None, cache_sqlite: Optional[str] = None, blocos_sinteticos: int = 4):
+        self.divida: Dict[str, str] = {}
+        self.acordo: Dict[str, str] = {}
+        self.acordo_rodizio = []
+        self.blocos_sinteticos = blocos_sinteticos
+
+        if cache_sqlite and Path(cache_sqlite).exists():
+            conexao = sqlite3.connect(cache_sqlite)
+            try:
+                self.divida.update(conexao.execute("SELECT chave, valor FROM respostas").fetchall())
+            finally:
+                conexao.close()
+
+        if pasta:
+            raiz = Path(pasta)
+            for arquivo in sorted((raiz / "divida").glob("*.xml")):
+                self.divida[arquivo.stem.zfill(11)] = arquivo.read_text(encoding="utf-8")
+            for arquivo in sorted((raiz / "acordo").glob("*.xml")):
+                texto = arquivo.read_text(encoding="utf-8")
+                self.acordo[arquivo.stem] = texto
+                self.acordo_rodizio.append(texto)
+
+    def resposta_divida(self, cpf: str) -> str:
+        cpf = "".join(c for c in cpf if c.isdigit()).zfill(11)
+        gravada = self.divida.get(cpf)
+        if gravada is not None:
+            return gravada
+        semente = int(cpf) if cpf.isdigit() else 0
+        return gerar_resposta_divida(1 + semente % self.blocos_sinteticos, semente)
+
+    def resposta_acordo(self, id_cliente: str, id_acordo: str) -> str:
+        gravada = self.acordo.get(f"{id_cliente}_{id_acordo}")
+        if gravada is None and self.acordo_rodizio:
+            gravada = self.acordo_rodizio[zlib.crc32(f"{id_cliente}_{id_acordo}".encode()) % len(self.acordo_rodizio)]
+        if gravada is not None:
+            return gravada
+        return gerar_resposta_acordo(int(id_acordo) if id_acordo.isdigit() else 0).decode("utf-8")
+
+    def resumo(self) -> str:
+        return f"{len(self.divida)} respostas de dívida e {len(self.acordo)} de acordo gravadas"
+
+
+class ServidorReplay(ThreadingHTTPServer):
+    """HTTP/1.1 com keep-alive, como o IIS do EasyCollector; um handler por conexão"""
+
+    daemon_threads = True
+    request_queue_size = 256  # Backlog do listen: a janela abre dezenas de conexões de uma vez
+
+    def __init__(self, endereco, respostas: RespostasGravadas, latencia: Latencia,
+                 taxa_erro: float = 0.0, taxa_429: float = 0.0, retry_after: int = 1, semente: int = 42):
+        super().__init__(endereco, ManipuladorReplay)
+        self.respostas = respostas
+        self.latencia = latencia
+        self.taxa_erro = taxa_erro
+        self.taxa_429 = taxa_429
+        self.retry_after = retry_after
+        self.rng = random.Random(semente)
+        self.lock = threading.Lock()
+        self.contadores = {'requisicoes': 0, 'divida': 0, 'acordo': 0, 'erros_5xx': 0, 'http_429': 0, 'bytes': 0}
+
+    def sortear(self):
+        """(latência em segundos, status) da próxima requisição"""
+        with self.lock:
+            espera = self.latencia.amostra(self.rng)
+            sorteio = self.rng.random()
+        if sorteio < self.taxa_429:
+            return espera, 429
+        if sorteio < self.taxa_429 + self.taxa_erro:
+            return espera, 503
+        return espera, 200
+
+    def contar(self, **incrementos):
+        with self.lock:
+            for chave, valor in incrementos.items():
+                self.contadores[chave] += valor
+
+
+class ManipuladorReplay(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/estatisticas":
+            with self.server.lock:
+                corpo = json.dumps(self.server.contadores).encode()
+            self._responder(200, corpo, "application/json")
+        else:
+            self._responder(404, b"")
+
+    def do_POST(self):
+        tamanho = int(self.headers.get("Content-Length", 0) or 0)
+        formulario = parse_qs(self.rfile.read(tamanho).decode("utf-8", errors="replace"))
+        campo = lambda nome: formulario.get(nome, [""])[0]
+
+        espera, status = self.server.sortear()
+        if espera:
+            time.sleep(espera)
+        self.server.contar(requisicoes=1)
+
+        if status == 429:
+            self.server.contar(http_429=1)
+            self._responder(429, b"Too Many Requests", cabecalhos={"Retry-After": str(self.server.retry_after)})
+            return
+        if status >= 500:
+            self.server.contar(erros_5xx=1)
+            self._responder(status, b"Service Unavailable")
+            return
+
+        if "cpfCnpj" in formulario or self.path.endswith("ObterDividaAtivaPorCPF"):
+            self.server.contar(divida=1)
+            texto = self.server.respostas.resposta_divida(campo("cpfCnpj"))
+        else:
+            self.server.contar(acordo=1)
+            texto = self.server.respostas.resposta_acordo(campo("idCliente"), campo("idAcordo"))
+        corpo = texto.encode("utf-8")
+        self.server.contar(bytes=len(corpo))
+        self._responder(200, corpo)
+
+    def _responder(self, status, corpo: bytes, tipo="text/xml; charset=utf-8", cabecalhos=None):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+def adicionar_argumentos(parser: argparse.ArgumentParser):
+    """Opções do servidor (compartilhadas com scripts/benchmark_endpoints.py)"""
+    parser.add_argument("--latencia", default="lognormal:40,0.5",
+                        help="distribuição em ms: fixa:50 | uniforme:20,80 | normal:50,15 | lognormal:40,0.5")
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 503 (ex.: 0.01)")
+    parser.add_argument("--taxa-429", type=float, default=0.0, help="fração de respostas 429 (ex.: 0.02)")
+    parser.add_argument("--retry-after", type=int, default=1, help="valor do cabeçalho Retry-After dos 429")
+    parser.add_argument("--respostas", help="pasta com divida/*.xml e acordo/*.xml gravados")
+    parser.add_argument("--cache-sqlite", help="cache/divida_cpf.sqlite com respostas reais de ObterDividaAtivaPorCPF")
+    parser.add_argument("--semente", type=int, default=42)
+
+
+def criar_servidor(args, porta: int = 0, host: str = "127.0.0.1") -> ServidorReplay:
+    respostas = RespostasGravadas(args.respostas, args.cache_sqlite)
+    return ServidorReplay((host, porta), respostas, Latencia(args.latencia),
+                          args.taxa_erro, args.taxa_429, args.retry_after, args.semente)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--porta", type=int, default=8765, help="0 = porta livre qualquer")
+    parser.add_argument("--host", default="127.0.0.1")
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    servidor = criar_servidor(args, args.porta, args.host)
+    host, porta = servidor.server_address[:2]
+    # Primeira linha da saída: lida por benchmark_endpoints.py para descobrir a porta
+    print(f"PORTA {porta}", flush=True)
+    print(f"🎬 Replay em http://{host}:{porta}/ | latência {args.latencia} | "
+          f"5xx {args.taxa_erro:.1%} | 429 {args.taxa_429:.1%} | {servidor.respostas.resumo()}", flush=True)
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,39 @@
 import os
 import re
+import sys
 import time
-from typing import List, Tuple
+from itertools import chain
+from pathlib import Path
+from typing import Iterable, List, Tuple
 
 import requests
 import pandas as pd
-from bs4 import BeautifulSoup
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 
+# Permite importar core/ também ao executar este arquivo diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.http_session import criar_sessao
+from core.scheduler import EscalonadorJanela
+from core.concurrency import ControladorAIMD
+from core.rate_limiter import registrar_endpoint
+from core.response_cache import CACHE_DIVIDA, obter_cache, normalizar_cpf
+from core.easycollector_parser import extrair_blocos_divida
+from core.metricas import metricas
+from core.xlsx_reader import ler_blocos
+from core.xlsx_writer import gravar_dataframe
+
 load_dotenv()
 
 URL_DIVIDA = os.getenv("URL_DIVIDA", "http://54.83.29.48/easycollectorws/easycollectorWs.asmx/ObterDividaAtivaPorCPF")
 LOGIN = os.getenv("LOGIN")
 SENHA = os.getenv("SENHA")
 
+# Mesmo orçamento e mesmo cache (CACHE_DIVIDA) de obter_divida_cpf: ambos consultam URL_DIVIDA
+registrar_endpoint("URL_DIVIDA", URL_DIVIDA)
+
+# Concorrência inicial; o ControladorAIMD ajusta a partir daqui conforme latência e erros
+CONCORRENCIA_INICIAL = 12
+
 
 def limpar_cpf(cpf_raw: str) -> str:
     if cpf_raw is None:
@@ -25,39 +44,42 @@ def limpar_cpf(cpf_raw: str) -> str:
     return cpf_limpo.zfill(11) if cpf_limpo else ""
 
 
-def _request_divida_xml(cpf: str, login: str, senha: str, session: requests.Session, timeout: int = 12) -> str:
+def _request_divida_xml(cpf: str, login: str, senha: str, session: requests.Session, timeout: int = 12,
+                        chamada=None) -> str:
+    """chamada: core.metricas.Chamada que recebe status, bytes e tempo de rede"""
     payload = {"logonUsuario": login, "senhaUsuario": senha, "cpfCnpj": cpf}
     try:
-        resp = session.post(URL_DIVIDA, data=payload, timeout=timeout)
-        resp.raise_for_status()
-        text = resp.text
-        decoded = text.replace("&lt;", "<").replace("&gt;", ">")
-        return decoded
-    except Exception:
+        cache = obter_cache(CACHE_DIVIDA)
+        chave_cache = normalizar_cpf(cpf)
+        text = cache.obter(chave_cache)
+        if text is None:
+            if chamada is not None:
+                chamada.iniciar_rede()
+            resp = session.post(URL_DIVIDA, data=payload, timeout=timeout)
+            if chamada is not None:
+                chamada.fim_rede(resp.status_code, len(resp.content))
+            resp.raise_for_status()
+            text = resp.text
+            cache.guardar(chave_cache, text)
+        elif chamada is not None:
+            chamada.do_cache()
+        return text
+    except Exception as e:
+        if chamada is not None and chamada.status is None:
+            chamada.falha(e)
         return ""
 
 
 def _extract_divida_blocks_from_xml(xml_text: str):
+    """Blocos DividaAtiva como dicionários {campo: texto} (core.easycollector_parser)"""
     if not xml_text:
         return []
     try:
-        soup = BeautifulSoup(xml_text, "xml")
-        blocks = soup.find_all("DividaAtiva")
-        return blocks
+        return extrair_blocos_divida(xml_text)
     except Exception:
         return []
 
 
-def _block_to_dict(block) -> dict:
-    d = {}
-    try:
-        for child in block.find_all(recursive=False):
-            d[child.name] = child.text.strip() if child.text else ""
-    except Exception:
-        pass
-    return d
-
-
 def _parse_periods(period_lines: List[str]) -> List[str]:
     """Converte linhas de entrada em prefixos YYYY-MM válidos."""
     prefixes = []
@@ -89,11 +111,16 @@ def _parse_periods(period_lines: List[str]) -> List[str]:
     return out
 
 
-def run_consulta_boleto_from_rows(rows: List[Tuple[str, str]], caminho_saida: str, periods: List[str], login: str = None, senha: str = None, max_workers: int = 12):
+def run_consulta_boleto_from_rows(rows: Iterable[Tuple[str, str]], caminho_saida: str, periods: List[str], login: str = None, senha: str = None, max_workers=None,
+                                  parar_evento=None, cancelar_evento=None, on_progresso=None):
     """Processa uma lista de tuples (cod_aluno, cpf_raw) e grava um Excel com os blocos que batem em qualquer period (YYYY-MM).
 
-    rows: list of (cod_aluno, cpf_raw)
+    rows: list or iterator of (cod_aluno, cpf_raw) - an iterator is consumed on demand (total shown as '?')
     periods: list of prefix strings like '2025-08'
+    max_workers: int fixo ou ControladorAIMD (None = controle adaptativo a partir de CONCORRENCIA_INICIAL)
+    parar_evento: threading.Event - para de enviar CPFs e grava o que já foi consultado
+    cancelar_evento: threading.Event - encerra sem gravar (retorna None)
+    on_progresso: callback(concluidos, total, req_por_seg, eta_segundos)
     """
     if login is None or senha is None:
         login = LOGIN
@@ -103,7 +130,12 @@ def run_consulta_boleto_from_rows(rows: List[Tuple[str, str]], caminho_saida: st
 
     prefixes = set(periods)
 
-    session = requests.Session()
+    if max_workers is None:
+        max_workers = ControladorAIMD(inicial=CONCORRENCIA_INICIAL, endpoints=[URL_DIVIDA])
+
+    escalonador = EscalonadorJanela(max_workers, parar_evento, cancelar_evento, on_progresso)
+    session = criar_sessao(user_agent="Python4Work-Consulta-Boleto/1.0",
+                           pool_maxsize=escalonador.max_em_voo, retries=0)
 
     results = []
 
@@ -112,13 +144,14 @@ def run_consulta_boleto_from_rows(rows: List[Tuple[str, str]], caminho_saida: st
         cpf = limpar_cpf(cpf_raw)
         if not cpf:
             return [{'cod_aluno': cod_aluno, 'cpf': cpf_raw, 'status': 'CPF inválido'}]
-        xml = _request_divida_xml(cpf, login, senha, session)
-        blocks = _extract_divida_blocks_from_xml(xml)
+        with metricas.chamada(URL_DIVIDA) as chamada:
+            xml = _request_divida_xml(cpf, login, senha, session, chamada=chamada)
+            blocks = _extract_divida_blocks_from_xml(xml)
+            chamada.fim_parse()
         if not blocks:
             return [{'cod_aluno': cod_aluno, 'cpf': cpf, 'status': 'Erro ao consultar ou sem resposta'}]
         matched = []
-        for b in blocks:
-            d = _block_to_dict(b)
+        for d in blocks:
             dv = d.get('DataVencimento', '') or d.get('Data_Vencimento', '') or d.get('dataVencimento', '')
             for p in prefixes:
                 if dv.startswith(p):
@@ -133,47 +166,50 @@ def run_consulta_boleto_from_rows(rows: List[Tuple[str, str]], caminho_saida: st
             return [{'cod_aluno': cod_aluno, 'cpf': cpf, 'status': 'Nenhuma dívida encontrada para os períodos selecionados'}]
         return matched
 
-    with ThreadPoolExecutor(max_workers=max_workers) as exe:
-        futures = {exe.submit(worker, r): r for r in rows}
-        for future in as_completed(futures):
-            try:
-                res = future.result()
-                results.extend(res)
-            except Exception as e:
-                results.append({'cod_aluno': '', 'cpf': '', 'status': f'Erro interno: {e}'})
+    def on_erro(item, e):
+        return [{'cod_aluno': '', 'cpf': '', 'status': f'Erro interno: {e}'}]
+
+    for _, res in escalonador.executar(rows, worker, on_erro=on_erro):
+        results.extend(res)
 
     session.close()
 
+    if cancelar_evento is not None and cancelar_evento.is_set():
+        return None
+
     df_out = pd.DataFrame(results)
     # garantir colunas consistentes
     if 'period' not in df_out.columns:
         df_out['period'] = ''
-    df_out.to_excel(caminho_saida, index=False, engine='openpyxl')
+    gravar_dataframe(df_out, caminho_saida)
     return caminho_saida
 
 
-def run_consulta_boleto(caminho_entrada: str, caminho_saida: str, period_lines: List[str], login: str = None, senha: str = None, max_workers: int = 12):
+def run_consulta_boleto(caminho_entrada: str, caminho_saida: str, period_lines: List[str], login: str = None, senha: str = None, max_workers=None,
+                        parar_evento=None, cancelar_evento=None, on_progresso=None):
     """Lê um arquivo Excel com colunas cod_aluno e cpf e processa para os períodos informados (lista de strings)."""
     prefixes = _parse_periods(period_lines)
     if not prefixes:
         raise ValueError("Nenhum período válido informado (ex: 2025-08).")
 
-    df = pd.read_excel(caminho_entrada, engine='openpyxl', dtype=str)
-    df.columns = df.columns.str.strip().str.lower()
-    if 'cpf' not in df.columns:
+    # Só as colunas usadas, em blocos: as consultas começam enquanto o resto do arquivo é lido
+    colunas_cod = ['cod_aluno', 'codaluno', 'matricula']
+    blocos = ler_blocos(caminho_entrada, ['cpf'] + colunas_cod, como_texto=True)
+    primeiro = next(blocos, None)
+    colunas = [] if primeiro is None else list(primeiro.columns.str.strip().str.lower())
+    if 'cpf' not in colunas:
         raise ValueError("Arquivo de entrada deve conter a coluna 'cpf'")
     # encontrar coluna cod_aluno
-    cod_col = None
-    for c in ['cod_aluno', 'codaluno', 'matricula']:
-        if c in df.columns:
-            cod_col = c
-            break
-    if cod_col is None:
-        df['cod_aluno'] = ''
-        cod_col = 'cod_aluno'
-
-    rows = [(r.get(cod_col, ''), r.get('cpf', '')) for r in df.to_dict(orient='records')]
-    return run_consulta_boleto_from_rows(rows, caminho_saida, prefixes, login, senha, max_workers)
+    cod_col = next((c for c in colunas_cod if c in colunas), None)
+
+    def rows():
+        for bloco in chain([primeiro], blocos):
+            bloco.columns = bloco.columns.str.strip().str.lower()
+            for r in bloco.to_dict(orient='records'):
+                yield (r.get(cod_col, '') if cod_col else '', r.get('cpf', ''))
+
+    return run_consulta_boleto_from_rows(rows(), caminho_saida, prefixes, login, senha, max_workers,
+                                         parar_evento, cancelar_evento, on_progresso)
 
 
 if __name__ == '__main__':
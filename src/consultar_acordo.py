@@ -1,20 +1,36 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
-import pandas as pd
+import sys
+from pathlib import Path
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
-from bs4 import BeautifulSoup
 import xml.etree.ElementTree as ET
+from xml.sax.saxutils import unescape
 import threading
 import time
 import os
 import re
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import asyncio
 import queue
 import random
 
+try:
+    import aiohttp  # Necessário apenas para a engine assíncrona
+except ImportError:
+    aiohttp = None
+
+# Permite importar core/ também ao executar este arquivo diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.http_session import AdaptadorObservado, PoolSessoesHTTP, RetryLimitado, formatar_estatisticas_conexoes
+from core.scheduler import EscalonadorJanela
+from core.concurrency import ControladorAIMD
+from core.rate_limiter import limitador, registrar_endpoint
+from core.easycollector_parser import extrair_texto_string
+from core.checkpoint import abrir_diario
+from core.config_manager import carregar_config_projeto
+from core.xlsx_reader import ler_xlsx
+from core.xlsx_writer import gravar_dataframe
+from core.professional_logger import obter_rastreador
+from core.metricas import metricas, retries_urllib3
+
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
 
@@ -26,11 +42,20 @@ URL = os.getenv("URL")
 if not all([LOGIN, SENHA, URL]):
     raise ValueError("❌ Erro: Variáveis de ambiente não encontradas. Verifique o arquivo .env")
 
+# Orçamento de requisições do endpoint (performance.rate_limits.URL no config.json)
+registrar_endpoint("URL", URL)
+
 parar_flag = threading.Event()
 linhas_processadas = 0
 total_erros = 0
 log_erros = []
 
+# Rastro por linha: detalhes só com logging.level = DEBUG (e nas primeiras linhas)
+rastro = obter_rastreador("consultar_acordo")
+
+# Linhas registradas no diário com estes status (erros transitórios) são consultadas de novo ao retomar
+STATUS_REPETIR = ("Erro", "Não encontrado")
+
 # Compilar regex uma única vez para melhor performance
 STATUS_REGEX = re.compile(r"<Status>(.*?)</Status>")
 
@@ -38,15 +63,15 @@ def criar_sessao_otimizada():
     """Cria uma sessão HTTP otimizada com pool de conexões e retry"""
     session = requests.Session()
     
-    # Configurar retry automático
-    retry_strategy = Retry(
+    # Configurar retry automático (cada nova tentativa passa pelo limitador de taxa do endpoint)
+    retry_strategy = RetryLimitado(
         total=3,
         backoff_factor=0.5,
         status_forcelist=[429, 500, 502, 503, 504],
     )
     
-    # Configurar adaptador HTTP com pool de conexões
-    adapter = HTTPAdapter(
+    # Configurar adaptador HTTP com pool de conexões (observado: alimenta o controle de concorrência)
+    adapter = AdaptadorObservado(
         max_retries=retry_strategy,
         pool_connections=50,
         pool_maxsize=50,
@@ -68,11 +93,23 @@ def criar_sessao_otimizada():
 # Sessão HTTP reutilizável para melhor performance
 session = criar_sessao_otimizada()
 
+# Concorrência inicial; o ControladorAIMD ajusta a partir daqui conforme latência e erros
+CONCORRENCIA_INICIAL = 25
+
+# Pool de sessões dos workers: vive entre lotes, então as conexões keep-alive são reaproveitadas
+pool_sessoes = PoolSessoesHTTP(max_sessoes=CONCORRENCIA_INICIAL, fabrica=criar_sessao_otimizada)
+
+# Contadores de conexão da engine assíncrona (preenchidos via aiohttp TraceConfig)
+conexoes_async = {'conexoes_novas': 0, 'requisicoes': 0}
+
+# Status HTTP que a engine assíncrona retenta (mesma lista do Retry da sessão síncrona)
+STATUS_RETRY = (429, 500, 502, 503, 504)
+
 def validar_codigo(valor, nome_campo, index):
     """Valida e converte códigos para inteiro, com tratamento robusto de tipos incluindo numpy"""
     try:
         if valor is None or valor == "":
-            print(f"⚠️ Linha {index + 1}: {nome_campo} está vazio ou None")
+            rastro.warning("⚠️ Linha %s: %s está vazio ou None", index + 1, nome_campo)
             return None
         
         # Importar numpy dinamicamente para verificar tipos
@@ -81,7 +118,7 @@ def validar_codigo(valor, nome_campo, index):
             # Verificar se é tipo numpy e converter para tipo Python nativo
             if hasattr(valor, 'dtype'):  # É um tipo numpy
                 if np.isnan(valor):
-                    print(f"⚠️ Linha {index + 1}: {nome_campo} é NaN")
+                    rastro.warning("⚠️ Linha %s: %s é NaN", index + 1, nome_campo)
                     return None
                 valor = valor.item()  # Converter numpy para tipo Python nativo
         except ImportError:
@@ -92,7 +129,7 @@ def validar_codigo(valor, nome_campo, index):
             # Limpar string (remover espaços, caracteres especiais)
             valor = valor.strip()
             if valor == "" or valor.lower() in ["null", "none", "nan", "#n/a"]:
-                print(f"⚠️ Linha {index + 1}: {nome_campo} contém valor inválido: '{valor}'")
+                rastro.warning("⚠️ Linha %s: %s contém valor inválido: '%s'", index + 1, nome_campo, valor)
                 return None
             
             # Tentar converter string para float primeiro (caso tenha .0) depois para int
@@ -101,19 +138,19 @@ def validar_codigo(valor, nome_campo, index):
                 if valor_float.is_integer():
                     return int(valor_float)
                 else:
-                    print(f"⚠️ Linha {index + 1}: {nome_campo} não é um número inteiro: {valor}")
+                    rastro.warning("⚠️ Linha %s: %s não é um número inteiro: %s", index + 1, nome_campo, valor)
                     return None
             except ValueError:
-                print(f"⚠️ Linha {index + 1}: {nome_campo} não é um número válido: '{valor}'")
+                rastro.warning("⚠️ Linha %s: %s não é um número válido: '%s'", index + 1, nome_campo, valor)
                 return None
                 
         elif isinstance(valor, (int, float)):
             if isinstance(valor, float):
                 if valor != valor:  # Verificar se é NaN
-                    print(f"⚠️ Linha {index + 1}: {nome_campo} é NaN")
+                    rastro.warning("⚠️ Linha %s: %s é NaN", index + 1, nome_campo)
                     return None
                 if not valor.is_integer():
-                    print(f"⚠️ Linha {index + 1}: {nome_campo} não é um número inteiro: {valor}")
+                    rastro.warning("⚠️ Linha %s: %s não é um número inteiro: %s", index + 1, nome_campo, valor)
                     return None
                 return int(valor)
             return int(valor)
@@ -122,20 +159,21 @@ def validar_codigo(valor, nome_campo, index):
             try:
                 return int(valor)
             except (ValueError, TypeError):
-                print(f"⚠️ Linha {index + 1}: {nome_campo} tem tipo não suportado: {type(valor)} = {valor}")
+                rastro.warning("⚠️ Linha %s: %s tem tipo não suportado: %s = %s", index + 1, nome_campo, type(valor), valor)
                 return None
             
     except Exception as e:
-        print(f"❌ Linha {index + 1}: Erro ao validar {nome_campo} = {valor}: {e}")
+        rastro.warning("❌ Linha %s: Erro ao validar %s = %s: %s", index + 1, nome_campo, valor, e)
         return None
 
-def consultar_status_acordo(row, index, session_local=None, tentativas=2):
-    """Consulta o status do acordo com validações robustas e debug detalhado"""
+def validar_linha_acordo(row, index):
+    """Valida cod_cliente/cod_acordo da linha.
+
+    Retorna (cod_cliente, cod_acordo, status_invalido). Quando status_invalido não é None
+    a linha não deve ser consultada e o status já foi contabilizado em total_erros.
+    """
     global total_erros
-    
-    if session_local is None:
-        session_local = session
-    
+
     # Validação robusta dos dados de entrada
     cod_cliente = validar_codigo(row.get("cod_cliente", 0), "cod_cliente", index)
     cod_acordo = validar_codigo(row.get("cod_acordo", 0), "cod_acordo", index)
@@ -144,139 +182,170 @@ def consultar_status_acordo(row, index, session_local=None, tentativas=2):
     if cod_cliente is None or cod_acordo is None:
         log = f"Linha {index + 1}: ❌ Dados inválidos - cod_cliente={row.get('cod_cliente')}, cod_acordo={row.get('cod_acordo')}"
         log_erros.append(log)
-        print(log)
+        rastro.warning("%s", log)
         total_erros += 1
-        return "Dados inválidos"
+        return cod_cliente, cod_acordo, "Dados inválidos"
     
     # Verificar se os códigos são maiores que 0
     if cod_cliente <= 0 or cod_acordo <= 0:
         log = f"Linha {index + 1}: ⚠️ Códigos inválidos - cod_cliente={cod_cliente}, cod_acordo={cod_acordo} (devem ser > 0)"
         log_erros.append(log)
-        print(log)
+        rastro.warning("%s", log)
         total_erros += 1
-        return "Códigos inválidos"
+        return cod_cliente, cod_acordo, "Códigos inválidos"
+
+    return cod_cliente, cod_acordo, None
 
-    payload = {
+def montar_payload(cod_cliente, cod_acordo):
+    """Monta o payload do POST de consulta de acordo"""
+    return {
         "logonUsuario": LOGIN,
         "senhaUsuario": SENHA,
         "idCliente": int(cod_cliente),
         "idAcordo": int(cod_acordo)
     }
+
+def extrair_status_resposta(content, index):
+    """Extrai o <Status> do corpo XML da resposta (compartilhado pelas engines síncrona e assíncrona)"""
+    # O parser já devolve o XML interno sem as entidades (&lt; &gt; &amp; &quot;)
+    decoded = extrair_texto_string(content)
+
+    if decoded:
+        
+        # Debug: Log do XML decodificado (apenas para as primeiras linhas)
+        if rastro.amostrado(index):
+            rastro.debug("🔍 Debug linha %s: XML decodificado (primeiros 200 chars): %s...", index + 1, decoded[:200])
+        
+        # Usar regex pré-compilada
+        status_match = STATUS_REGEX.search(decoded)
+        if status_match:
+            status_resultado = unescape(status_match.group(1).strip())
+            
+            # Debug: Log do status encontrado (apenas para as primeiras linhas)
+            if rastro.amostrado(index):
+                rastro.debug("✅ Debug linha %s: Status encontrado: '%s'", index + 1, status_resultado)
+                
+            return status_resultado
+        else:
+            # Tentar buscar outras tags comuns de erro/status
+            error_patterns = [
+                (r"<erro>(.*?)</erro>", "Erro"),
+                (r"<Error>(.*?)</Error>", "Error"), 
+                (r"<message>(.*?)</message>", "Message"),
+                (r"<Message>(.*?)</Message>", "Message"),
+                (r"<resultado>(.*?)</resultado>", "Resultado")
+            ]
+            
+            for pattern, tag_name in error_patterns:
+                match = re.search(pattern, decoded, re.IGNORECASE)
+                if match:
+                    resultado = match.group(1).strip()
+                    rastro.info("⚠️ Linha %s: Encontrado <%s>: '%s'", index + 1, tag_name, resultado)
+                    return f"{tag_name}: {resultado}"
+            
+            # Se não encontrou nenhum padrão, salvar XML para análise
+            if rastro.amostrado(index):  # Salvar apenas os primeiros para análise
+                rastro.debug("❌ Linha %s: Campo <Status> não encontrado. XML completo: %s", index + 1, decoded)
+            
+            raise ValueError(f"⚠️ Campo <Status> não encontrado. XML tem {len(decoded)} caracteres.")
+    else:
+        raise ValueError("⚠️ Tag <string> não encontrada ou vazia.")
+
+def consultar_status_acordo(row, index, session_local=None, tentativas=2):
+    """Consulta o status do acordo com validações robustas e debug detalhado"""
+    global total_erros
+    
+    if session_local is None:
+        session_local = session
     
-    # Debug: Log do payload (apenas para primeiras 5 linhas para não poluir)
-    if index < 5:
-        print(f"🔍 Debug linha {index + 1}: payload={payload}")
+    cod_cliente, cod_acordo, status_invalido = validar_linha_acordo(row, index)
+    if status_invalido:
+        return status_invalido
 
-    for tentativa in range(1, tentativas + 1):
-        try:
-            # Timeout reduzido para 3s para melhor throughput
-            response = session_local.post(URL, data=payload, timeout=3)
-            response.raise_for_status()
-
-            # Debug: Log da resposta (apenas para primeiras 3 linhas)
-            if index < 3:
-                print(f"🔍 Debug linha {index + 1}: response.status_code={response.status_code}, content_length={len(response.content) if response.content else 0}")
-
-            # Parse XML otimizado com validações robustas
-            if response.content:
-                try:
-                    soup = BeautifulSoup(response.content, "xml")
-                    string_tag = soup.find("string")
-
-                    if string_tag and string_tag.text:
-                        decoded = string_tag.text.replace("&lt;", "<").replace("&gt;", ">")
-                        
-                        # Debug: Log do XML decodificado (apenas para primeiras 2 linhas)
-                        if index < 2:
-                            print(f"🔍 Debug linha {index + 1}: XML decodificado (primeiros 200 chars): {decoded[:200]}...")
-                        
-                        # Usar regex pré-compilada
-                        status_match = STATUS_REGEX.search(decoded)
-                        if status_match:
-                            status_resultado = status_match.group(1).strip()
-                            
-                            # Debug: Log do status encontrado (apenas para primeiras 3 linhas)
-                            if index < 3:
-                                print(f"✅ Debug linha {index + 1}: Status encontrado: '{status_resultado}'")
-                                
-                            return status_resultado
-                        else:
-                            # Tentar buscar outras tags comuns de erro/status
-                            error_patterns = [
-                                (r"<erro>(.*?)</erro>", "Erro"),
-                                (r"<Error>(.*?)</Error>", "Error"), 
-                                (r"<message>(.*?)</message>", "Message"),
-                                (r"<Message>(.*?)</Message>", "Message"),
-                                (r"<resultado>(.*?)</resultado>", "Resultado")
-                            ]
-                            
-                            for pattern, tag_name in error_patterns:
-                                match = re.search(pattern, decoded, re.IGNORECASE)
-                                if match:
-                                    resultado = match.group(1).strip()
-                                    print(f"⚠️ Linha {index + 1}: Encontrado <{tag_name}>: '{resultado}'")
-                                    return f"{tag_name}: {resultado}"
-                            
-                            # Se não encontrou nenhum padrão, salvar XML para análise
-                            if index < 5:  # Salvar apenas os primeiros para análise
-                                print(f"❌ Linha {index + 1}: Campo <Status> não encontrado. XML completo: {decoded}")
-                            
-                            raise ValueError(f"⚠️ Campo <Status> não encontrado. XML tem {len(decoded)} caracteres.")
-                    else:
-                        raise ValueError("⚠️ Tag <string> não encontrada ou vazia.")
-                        
-                except Exception as parse_error:
-                    # Log do erro de parsing com o conteúdo da resposta
-                    print(f"❌ Linha {index + 1}: Erro no parsing XML: {parse_error}")
-                    if index < 3:  # Log do conteúdo apenas para primeiras linhas
-                        print(f"🔍 Conteúdo bruto da resposta: {response.content[:500]}...")
-                    raise ValueError(f"Erro no parsing XML: {parse_error}")
-            else:
-                raise ValueError("⚠️ Resposta vazia do servidor.")
+    payload = montar_payload(cod_cliente, cod_acordo)
+    
+    # Debug: Log do payload (apenas para as primeiras linhas para não poluir)
+    depurar = rastro.amostrado(index)
+    if depurar:
+        rastro.debug("🔍 Debug linha %s: payload=%s", index + 1, payload)
 
-        except requests.exceptions.Timeout:
-            log = f"Linha {index + 1}: ⏰ Timeout na tentativa {tentativa} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
-            print(log)
-            if tentativa < tentativas:
-                time.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
+    with metricas.chamada(URL) as chamada:
+        for tentativa in range(1, tentativas + 1):
+            chamada.iniciar_rede()
+            chamada.retries += tentativa > 1
+            try:
+                # Timeout reduzido para 3s para melhor throughput
+                response = session_local.post(URL, data=payload, timeout=3)
+                chamada.fim_rede(response.status_code, len(response.content), retries_urllib3(response))
+                response.raise_for_status()
+
+                # Debug: Log da resposta (apenas para as primeiras linhas)
+                if depurar:
+                    rastro.debug("🔍 Debug linha %s: response.status_code=%s, content_length=%s",
+                                 index + 1, response.status_code, len(response.content) if response.content else 0)
+
+                # Parse XML otimizado com validações robustas
+                if response.content:
+                    try:
+                        status = extrair_status_resposta(response.content, index)
+                        chamada.fim_parse()
+                        return status
+                    except Exception as parse_error:
+                        # Log do erro de parsing com o conteúdo da resposta
+                        rastro.info("❌ Linha %s: Erro no parsing XML: %s", index + 1, parse_error)
+                        if depurar:  # Log do conteúdo apenas para as primeiras linhas
+                            rastro.debug("🔍 Conteúdo bruto da resposta: %s...", response.content[:500])
+                        raise ValueError(f"Erro no parsing XML: {parse_error}")
+                else:
+                    raise ValueError("⚠️ Resposta vazia do servidor.")
+
+            except requests.exceptions.Timeout as e:
+                chamada.falha(e)
+                log = f"Linha {index + 1}: ⏰ Timeout na tentativa {tentativa} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                rastro.info("%s", log)
+                if tentativa < tentativas:
+                    time.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
                 
-        except requests.exceptions.HTTPError as e:
-            log = f"Linha {index + 1}: 🌐 Erro HTTP {e.response.status_code} na tentativa {tentativa} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
-            print(log)
-            # Se for erro 400-499, não vale a pena tentar novamente
-            if 400 <= e.response.status_code < 500 and tentativa == 1:
-                log_erros.append(log + " (erro de cliente - não retienta)")
-                total_erros += 1
-                return f"Erro HTTP {e.response.status_code}"
-            if tentativa < tentativas:
-                time.sleep(random.uniform(0.1, 0.3))
+            except requests.exceptions.HTTPError as e:
+                log = f"Linha {index + 1}: 🌐 Erro HTTP {e.response.status_code} na tentativa {tentativa} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                # Se for erro 400-499, não vale a pena tentar novamente
+                if 400 <= e.response.status_code < 500 and tentativa == 1:
+                    log_erros.append(log + " (erro de cliente - não retienta)")
+                    rastro.warning("%s (erro de cliente - não retienta)", log)
+                    total_erros += 1
+                    return f"Erro HTTP {e.response.status_code}"
+                rastro.info("%s", log)
+                if tentativa < tentativas:
+                    time.sleep(random.uniform(0.1, 0.3))
                 
-        except requests.exceptions.ConnectionError as e:
-            log = f"Linha {index + 1}: 🔌 Erro de conexão na tentativa {tentativa} - {str(e)[:100]} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
-            print(log)
-            if tentativa < tentativas:
-                time.sleep(random.uniform(0.5, 1.0))  # Backoff maior para conexão
+            except requests.exceptions.ConnectionError as e:
+                chamada.falha(e)
+                log = f"Linha {index + 1}: 🔌 Erro de conexão na tentativa {tentativa} - {str(e)[:100]} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                rastro.info("%s", log)
+                if tentativa < tentativas:
+                    time.sleep(random.uniform(0.5, 1.0))  # Backoff maior para conexão
                 
-        except requests.exceptions.RequestException as e:
-            log = f"Linha {index + 1}: ❌ Erro HTTP {e.__class__.__name__}: {str(e)[:100]} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
-            print(log)
-            if tentativa < tentativas:
-                time.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
+            except requests.exceptions.RequestException as e:
+                chamada.falha(e)
+                log = f"Linha {index + 1}: ❌ Erro HTTP {e.__class__.__name__}: {str(e)[:100]} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                rastro.info("%s", log)
+                if tentativa < tentativas:
+                    time.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
                 
-        except Exception as e:
-            log = f"Linha {index + 1}: ❌ Erro inesperado na tentativa {tentativa}: {e.__class__.__name__}: {str(e)[:100]}"
-            print(log)
-            if tentativa < tentativas:
-                time.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
+            except Exception as e:
+                log = f"Linha {index + 1}: ❌ Erro inesperado na tentativa {tentativa}: {e.__class__.__name__}: {str(e)[:100]}"
+                rastro.info("%s", log)
+                if tentativa < tentativas:
+                    time.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
 
-        if tentativa < tentativas:
-            continue
-        else:
-            log_erros.append(log)
-            print(log)
+            if tentativa < tentativas:
+                continue
+            else:
+                log_erros.append(log)
+                rastro.warning("%s", log)
 
-    total_erros += 1
-    return "Não encontrado"
+        total_erros += 1
+        return "Não encontrado"
 
 def validar_dados_entrada(df):
     """Valida se o DataFrame tem as colunas necessárias e dados válidos"""
@@ -331,46 +400,228 @@ def validar_dados_entrada(df):
     
     return registros_validos
 
+def consultar_com_pool(row, index):
+    """Consulta uma linha usando uma sessão emprestada do pool compartilhado"""
+    with pool_sessoes.sessao() as sessao:
+        return consultar_status_acordo(row, index, sessao)
+
+def estatisticas_conexoes():
+    """Conexões novas x reutilizadas somando o pool síncrono e a engine assíncrona"""
+    stats = pool_sessoes.estatisticas()
+    requisicoes = stats['requisicoes'] + conexoes_async['requisicoes']
+    novas = stats['conexoes_novas'] + conexoes_async['conexoes_novas']
+    reutilizadas = max(requisicoes - novas, 0)
+    stats.update({
+        'requisicoes': requisicoes,
+        'conexoes_novas': novas,
+        'conexoes_reutilizadas': reutilizadas,
+        'taxa_reuso': (reutilizadas / requisicoes * 100) if requisicoes else 0.0
+    })
+    return stats
+
+def consultar_linhas(linhas, max_workers=None, parar_evento=None, cancelar_evento=None, on_progresso=None, total=None):
+    """
+    Consulta as linhas em janela deslizante, gerando (index, status) conforme terminam.
+
+    linhas: iterável de (index, row) — pode ser um gerador, é consumido sob demanda
+    max_workers: int fixo ou ControladorAIMD (None = controlador adaptativo padrão)
+    parar_evento: para de enviar novas linhas e entrega as que já estão em voo
+    cancelar_evento: encerra imediatamente
+    on_progresso: callback(concluidos, total, req_por_seg, eta_segundos)
+    total: quantidade de linhas, para o ETA quando `linhas` é um gerador
+    """
+    if max_workers is None:
+        max_workers = criar_controlador()
+
+    escalonador = EscalonadorJanela(max_workers, parar_evento, cancelar_evento, on_progresso)
+
+    # Uma sessão por worker, reaproveitada entre execuções (mantém as conexões abertas)
+    pool_sessoes.redimensionar(escalonador.max_em_voo)
+
+    def on_erro(item, e):
+        rastro.error("Erro no processamento da linha %s: %s", item[0], e)
+        return "Erro"
+
+    for (index, _), status in escalonador.executar(linhas, lambda item: consultar_com_pool(item[1], item[0]),
+                                                    total=total, on_erro=on_erro):
+        yield index, status
+
+def criar_controlador(inicial=CONCORRENCIA_INICIAL):
+    """Controlador adaptativo restrito ao endpoint de consulta de acordo"""
+    return ControladorAIMD(inicial=inicial, endpoints=[URL])
+
 def consultar_status_acordo_batch(rows_batch, max_workers=25):
     """Processa um lote de consultas em paralelo com otimizações"""
-    results = []
-    
-    # Criar sessões dedicadas para cada worker
-    def criar_worker_session():
-        return criar_sessao_otimizada()
-    
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
-        # Criar uma sessão para cada worker para evitar conflitos
-        future_to_row = {}
-        
-        for index, row in rows_batch:
-            future = executor.submit(consultar_status_acordo, row, index, criar_worker_session())
-            future_to_row[future] = (index, row)
-        
-        # Coletar resultados conforme completam
-        for future in as_completed(future_to_row):
-            index, row = future_to_row[future]
+    return list(consultar_linhas(rows_batch, max_workers))
+
+# === Engine assíncrona (asyncio + aiohttp) ===
+# Em vez de abrir um ThreadPoolExecutor por lote e esperar o lote inteiro terminar,
+# todas as linhas passam por um único pipeline: um semáforo limita as requisições
+# em voo e cada nova linha entra assim que outra termina.
+
+async def consultar_status_acordo_async(http, row, index, tentativas=2):
+    """Versão assíncrona de consultar_status_acordo, com os mesmos status de retorno"""
+    global total_erros
+
+    cod_cliente, cod_acordo, status_invalido = validar_linha_acordo(row, index)
+    if status_invalido:
+        return status_invalido
+
+    payload = montar_payload(cod_cliente, cod_acordo)
+    log = ""
+
+    with metricas.chamada(URL) as chamada:
+        for tentativa in range(1, tentativas + 1):
+            chamada.iniciar_rede()
+            chamada.retries += tentativa > 1
             try:
-                status = future.result(timeout=10)  # Timeout por future
-                results.append((index, status))
+                # Retry de 429/5xx equivalente ao urllib3 Retry da sessão síncrona
+                for retry in range(4):
+                    # Mesmo token bucket da engine síncrona, sem bloquear o event loop
+                    espera = limitador.reservar(URL)
+                    if espera:
+                        await asyncio.sleep(espera)
+                    async with http.post(URL, data=payload) as response:
+                        status_code = response.status
+                        content = await response.read()
+                    if status_code not in STATUS_RETRY or retry == 3:
+                        break
+                    await asyncio.sleep(0.5 * (2 ** retry))
+                chamada.fim_rede(status_code, len(content), retry)
+
+                if status_code >= 400:
+                    log = f"Linha {index + 1}: 🌐 Erro HTTP {status_code} na tentativa {tentativa} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                    # Se for erro 400-499, não vale a pena tentar novamente
+                    if 400 <= status_code < 500 and status_code not in STATUS_RETRY and tentativa == 1:
+                        log_erros.append(log + " (erro de cliente - não retienta)")
+                        rastro.warning("%s (erro de cliente - não retienta)", log)
+                        total_erros += 1
+                        return f"Erro HTTP {status_code}"
+                    rastro.info("%s", log)
+                elif content:
+                    try:
+                        status = extrair_status_resposta(content, index)
+                        chamada.fim_parse()
+                        return status
+                    except Exception as parse_error:
+                        log = f"Linha {index + 1}: ❌ Erro no parsing XML: {parse_error}"
+                        rastro.info("%s", log)
+                else:
+                    log = f"Linha {index + 1}: ⚠️ Resposta vazia do servidor - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                    rastro.info("%s", log)
+
+            except asyncio.TimeoutError as e:
+                chamada.falha(e)
+                log = f"Linha {index + 1}: ⏰ Timeout na tentativa {tentativa} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                rastro.info("%s", log)
+
+            except aiohttp.ClientConnectionError as e:
+                chamada.falha(e)
+                log = f"Linha {index + 1}: 🔌 Erro de conexão na tentativa {tentativa} - {str(e)[:100]} - cod_cliente={cod_cliente}, cod_acordo={cod_acordo}"
+                rastro.info("%s", log)
+                if tentativa < tentativas:
+                    await asyncio.sleep(random.uniform(0.5, 1.0))  # Backoff maior para conexão
+                continue
+
             except Exception as e:
-                print(f"Erro no processamento da linha {index}: {e}")
-                results.append((index, "Erro"))
-    
-    return results
+                log = f"Linha {index + 1}: ❌ Erro inesperado na tentativa {tentativa}: {e.__class__.__name__}: {str(e)[:100]}"
+                rastro.info("%s", log)
+
+            if tentativa < tentativas:
+                await asyncio.sleep(random.uniform(0.1, 0.3))  # Backoff aleatório
+
+        log_erros.append(log)
+        rastro.warning("%s", log)
+        total_erros += 1
+        return "Não encontrado"
+
+async def _pipeline_acordos_async(linhas, max_workers, on_resultado, parar_evento):
+    """Pipeline único: semáforo com max_workers requisições em voo sobre todas as linhas"""
+    semaforo = asyncio.Semaphore(max_workers)
+    resultados = []
+    pendentes = set()
+
+    conector = aiohttp.TCPConnector(limit=max_workers, keepalive_timeout=30)
+    timeout = aiohttp.ClientTimeout(total=3)
+    headers = {'User-Agent': 'Python4Work-Consultar-Acordo/1.0'}
+
+    # Contar conexões novas x requisições para as estatísticas de reuso
+    trace = aiohttp.TraceConfig()
+
+    async def on_conexao_criada(sessao, contexto, params):
+        conexoes_async['conexoes_novas'] += 1
+
+    async def on_requisicao(sessao, contexto, params):
+        conexoes_async['requisicoes'] += 1
+
+    trace.on_connection_create_end.append(on_conexao_criada)
+    trace.on_request_start.append(on_requisicao)
+
+    async with aiohttp.ClientSession(connector=conector, timeout=timeout, headers=headers,
+                                     trace_configs=[trace]) as http:
+
+        async def worker(index, row):
+            try:
+                status = await consultar_status_acordo_async(http, row, index)
+            except Exception as e:
+                rastro.error("Erro no processamento da linha %s: %s", index, e)
+                status = "Erro"
+            finally:
+                semaforo.release()
+            resultados.append((index, status))
+            if on_resultado:
+                on_resultado(index, status)
+
+        for index, row in linhas:
+            if parar_evento is not None and parar_evento.is_set():
+                rastro.info("⏸️ Pipeline assíncrono: parada pedida, aguardando as consultas em voo")
+                break
+            # Só lê a próxima linha quando há vaga no semáforo (streaming)
+            await semaforo.acquire()
+            tarefa = asyncio.create_task(worker(index, row))
+            pendentes.add(tarefa)
+            tarefa.add_done_callback(pendentes.discard)
+
+        if pendentes:
+            await asyncio.gather(*pendentes)
+
+    return resultados
+
+def processar_acordos_async(linhas, max_workers=CONCORRENCIA_INICIAL, on_resultado=None, parar_evento=None):
+    """
+    Consulta todas as linhas com a engine assíncrona.
 
-def salvar_parcial(df, caminho_salvar, force=False):
-    """Salva o arquivo apenas a cada X linhas ou quando forçado"""
+    linhas: iterável de (index, row) — pode ser um gerador, é consumido sob demanda
+    on_resultado: callback(index, status) chamado assim que cada linha termina
+    parar_evento: threading.Event que interrompe a leitura de novas linhas
+    Retorna a lista de (index, status) na ordem de conclusão.
+    """
+    if aiohttp is None:
+        raise RuntimeError("❌ A engine assíncrona requer o pacote 'aiohttp' (pip install aiohttp)")
+    return asyncio.run(_pipeline_acordos_async(linhas, max_workers, on_resultado, parar_evento))
+
+def salvar_parcial(df, caminho_salvar, custo=None):
+    """
+    Grava o XLSX completo: só no fim da execução ou na pausa.
+
+    O progresso intermediário fica no diário de checkpoint (uma linha JSON por resultado),
+    então a planilha inteira não é mais regravada periodicamente. `custo` (o diário)
+    acumula o tempo gasto para a área de progresso.
+    """
+    inicio = time.perf_counter()
     try:
-        if force or linhas_processadas % 100 == 0:  # Salva a cada 100 linhas (menos I/O)
-            df.to_excel(caminho_salvar, index=False)
-            print(f"💾 Progresso salvo: {linhas_processadas} linhas processadas")
+        gravar_dataframe(df, caminho_salvar)
     except Exception as e:
         print(f"❌ Erro ao salvar arquivo: {e}")
+        return
+    duracao = time.perf_counter() - inicio
+    if custo is not None:
+        custo.tempo_xlsx += duracao
+    print(f"💾 Arquivo salvo: {linhas_processadas} linhas processadas nesta execução em {duracao:.1f}s")
 
-def processar_batch_cpf(df, batch_size=50, max_workers=25):
+def processar_batch_cpf(df, batch_size=50, max_workers=None, usar_async=False):
     """
-    Processa o DataFrame em lotes otimizados
+    Processa o DataFrame em lotes otimizados (ou pela engine assíncrona com usar_async=True)
     """
     global linhas_processadas
     total = len(df)
@@ -378,54 +629,56 @@ def processar_batch_cpf(df, batch_size=50, max_workers=25):
     
     print(f"🚀 Iniciando processamento otimizado:")
     print(f"   📊 Total de registros: {total}")
-    print(f"   📦 Tamanho do lote: {batch_size}")
-    print(f"   👥 Workers paralelos: {max_workers}")
+    if usar_async:
+        print(f"   ⚡ Engine: assíncrona (pipeline único)")
+    else:
+        print(f"   🪟 Engine: janela deslizante")
+    if max_workers is None:
+        max_workers = CONCORRENCIA_INICIAL if usar_async else criar_controlador()
+    print(f"   👥 Workers paralelos: {getattr(max_workers, 'limite', max_workers)}{' (adaptativo)' if hasattr(max_workers, 'limite') else ''}")
     print("=" * 50)
     
     start_time = time.time()
     
-    # Processar em lotes
-    for batch_start in range(0, total, batch_size):
-        if parar_flag.is_set():
-            print("⏸️ Processamento interrompido pelo usuário")
-            break
-            
-        batch_end = min(batch_start + batch_size, total)
-        batch_rows = [(i, df.iloc[i]) for i in range(batch_start, batch_end)]
-        
-        batch_start_time = time.time()
-        
-        # Processar lote em paralelo
-        print(f"🔄 Processando lote {batch_start//batch_size + 1}: linhas {batch_start+1} a {batch_end}")
-        batch_results = consultar_status_acordo_batch(batch_rows, max_workers)
-        
-        # Atualizar DataFrame com resultados
-        for index, status in batch_results:
+    if usar_async:
+        def on_resultado(index, status):
+            global linhas_processadas
             df.at[index, "status_acordo"] = status
             linhas_processadas += 1
-        
-        batch_time = time.time() - batch_start_time
-        print(f"   ✅ Lote concluído em {batch_time:.1f}s ({len(batch_rows)/batch_time:.1f} req/s)")
-        
-        # Calcular estatísticas
-        elapsed_time = time.time() - start_time
-        if linhas_processadas > 0:
-            avg_time_per_item = elapsed_time / linhas_processadas
-            remaining_items = total - linhas_processadas
-            estimated_remaining = avg_time_per_item * remaining_items
-            
-            print(f"   📈 Progresso: {linhas_processadas}/{total} ({linhas_processadas/total*100:.1f}%)")
-            print(f"   ⏱️ Tempo estimado restante: {estimated_remaining/60:.1f} min")
-            print(f"   ⚡ Velocidade média: {linhas_processadas/elapsed_time:.1f} req/s")
+            if linhas_processadas % batch_size == 0:
+                elapsed_time = time.time() - start_time
+                print(f"   📈 Progresso: {linhas_processadas}/{total} ({linhas_processadas/total*100:.1f}%) - {linhas_processadas/elapsed_time:.1f} req/s")
+
+        linhas = ((i, df.iloc[i]) for i in range(total))
+        processar_acordos_async(linhas, max_workers, on_resultado, parar_flag)
+    else:
+        # Janela deslizante: sempre max_workers requisições em voo, sem barreira entre lotes
+        def on_progresso(concluidos, total_linhas, req_por_seg, eta):
+            if concluidos and eta is not None:
+                print(f"   📈 Progresso: {concluidos}/{total_linhas} ({concluidos/total_linhas*100:.1f}%) - "
+                      f"{req_por_seg:.1f} req/s - restam ~{eta/60:.1f} min")
+
+        linhas = ((i, df.iloc[i]) for i in range(total))
+        for index, status in consultar_linhas(linhas, max_workers, parar_flag, on_progresso=on_progresso, total=total):
+            df.at[index, "status_acordo"] = status
+            linhas_processadas += 1
+
+        if hasattr(max_workers, 'resumo'):
+            print(f"   {max_workers.resumo()}")
+
+    if parar_flag.is_set():
+        print("⏸️ Processamento interrompido pelo usuário")
     
     total_time = time.time() - start_time
     print(f"\n🎯 Processamento concluído em {total_time/60:.1f} minutos")
     print(f"⚡ Velocidade final: {linhas_processadas/total_time:.1f} req/s")
     print(f"❌ Total de erros: {total_erros}")
+    print(formatar_estatisticas_conexoes(estatisticas_conexoes()))
     
     return df
 
 def escolher_arquivo(progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo):
+    from tkinter import filedialog
     caminho = filedialog.askopenfilename(filetypes=[("Arquivos Excel", "*.xlsx")])
     if caminho:
         salvar_em = filedialog.asksaveasfilename(defaultextension=".xlsx", filetypes=[("Arquivos Excel", "*.xlsx")])
@@ -438,11 +691,11 @@ def escolher_arquivo(progresso_var, progresso_label, status_label, botao_iniciar
             return caminho, salvar_em
     return None, None
 
-def iniciar_processo(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo):
+def iniciar_processo(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo, usar_async=False):
     parar_flag.clear()
-    threading.Thread(target=processar_arquivo, args=(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo)).start()
+    threading.Thread(target=processar_arquivo, args=(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo, usar_async)).start()
 
-def processar_arquivo(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo):
+def processar_arquivo(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo, usar_async=False):
     global linhas_processadas, log_erros, total_erros
     
     try:
@@ -453,7 +706,7 @@ def processar_arquivo(caminho_arquivo, caminho_salvar, progresso_var, progresso_
         
         # Carregar arquivo
         print(f"📂 Carregando arquivo: {caminho_arquivo}")
-        df = pd.read_excel(caminho_arquivo)
+        df = ler_xlsx(caminho_arquivo)
         
         # Validar dados de entrada
         try:
@@ -471,51 +724,69 @@ def processar_arquivo(caminho_arquivo, caminho_salvar, progresso_var, progresso_
         
         total = len(df)
         print(f"📊 Total de registros carregados: {total}")
+
+        # Diário de checkpoint: cada status é gravado na hora; reabrir a mesma entrada retoma
+        diario = abrir_diario("consultar_acordo", caminho_arquivo, carregar_config_projeto())
+        pendentes = diario.pendentes(total, STATUS_REPETIR, "status_acordo")
+        if diario.retomado:
+            print(f"♻️ Retomando {diario.caminho}: {total - len(pendentes)} linhas já concluídas, {len(pendentes)} pendentes")
+        a_processar = len(pendentes)
         
         # Configurações otimizadas
-        batch_size = 50  # Lotes maiores para melhor throughput
-        max_workers = 25  # Mais workers para paralelismo
+        batch_size = 50  # Intervalo de atualização da interface na engine assíncrona
+        # Concorrência adaptativa (AIMD): parte de CONCORRENCIA_INICIAL e ajusta por latência/erros
+        controlador = criar_controlador()
         
         start_time = time.time()
-        
-        # Usar a função otimizada de processamento em lotes
-        for batch_start in range(0, total, batch_size):
-            if parar_flag.is_set():
-                status_label.config(text="⏸️ Processamento interrompido")
-                break
-                
-            batch_end = min(batch_start + batch_size, total)
-            batch_rows = [(i, df.iloc[i]) for i in range(batch_start, batch_end)]
-            
-            # Processar lote em paralelo
-            batch_results = consultar_status_acordo_batch(batch_rows, max_workers)
-            
-            # Atualizar DataFrame com resultados
-            for index, status in batch_results:
-                df.at[index, "status_acordo"] = status
-                linhas_processadas += 1
 
-            # Atualizar interface
-            progresso = int((linhas_processadas / total) * 100)
+        def atualizar_interface():
+            progresso = int((linhas_processadas / max(a_processar, 1)) * 100)
             progresso_var.set(progresso)
-            progresso_label.config(text=f"{linhas_processadas}/{total}")
+            progresso_label.config(text=f"{linhas_processadas}/{a_processar}")
             
             # Calcular tempo estimado
             elapsed_time = time.time() - start_time
             if linhas_processadas > 0:
                 avg_time_per_item = elapsed_time / linhas_processadas
-                remaining_items = total - linhas_processadas
+                remaining_items = a_processar - linhas_processadas
                 estimated_remaining = avg_time_per_item * remaining_items
                 minutes = int(estimated_remaining // 60)
                 seconds = int(estimated_remaining % 60)
                 req_per_sec = linhas_processadas / elapsed_time
-                status_label.config(text=f"Processando: {linhas_processadas}/{total} - Restam ~{minutes}m {seconds}s - {req_per_sec:.1f} req/s")
-            
-            # Salvar progresso periodicamente
-            salvar_parcial(df, caminho_salvar)
+                status_label.config(text=f"Processando: {linhas_processadas}/{a_processar} - Restam ~{minutes}m {seconds}s - {req_per_sec:.1f} req/s - {controlador.limite} em voo - {diario.resumo_custo()}")
+        
+        linhas = ((i, df.iloc[i]) for i in pendentes)
+        try:
+            if usar_async:
+                # Engine assíncrona: todas as linhas em um único pipeline
+                def on_resultado(index, status):
+                    global linhas_processadas
+                    df.at[index, "status_acordo"] = status
+                    diario.registrar(index, status_acordo=status)
+                    linhas_processadas += 1
+                    if linhas_processadas % batch_size == 0:
+                        atualizar_interface()
+
+                processar_acordos_async(linhas, CONCORRENCIA_INICIAL, on_resultado, parar_flag)
+            else:
+                # Janela deslizante: a interface é atualizada pelo callback de progresso do escalonador
+                for index, status in consultar_linhas(linhas, controlador, parar_flag,
+                                                      on_progresso=lambda *_: atualizar_interface(), total=len(pendentes)):
+                    df.at[index, "status_acordo"] = status
+                    diario.registrar(index, status_acordo=status)
+                    linhas_processadas += 1
+        finally:
+            diario.fechar()
+
+        atualizar_interface()
+        if parar_flag.is_set():
+            status_label.config(text="⏸️ Processamento interrompido")
 
-        # Salvar arquivo final
-        salvar_parcial(df, caminho_salvar, force=True)
+        # Salvar arquivo final, com as linhas de execuções anteriores vindas do diário
+        diario.aplicar(df)
+        salvar_parcial(df, caminho_salvar, diario)
+        if not parar_flag.is_set():
+            diario.descartar()
 
         # Salvar log de erros
         if log_erros:
@@ -527,6 +798,7 @@ def processar_arquivo(caminho_arquivo, caminho_salvar, progresso_var, progresso_
                 f.write(f"Registros processados: {linhas_processadas}\n")
                 f.write(f"Total de erros: {total_erros}\n")
                 f.write(f"Taxa de sucesso: {((linhas_processadas-total_erros)/linhas_processadas*100):.1f}%\n")
+                f.write(formatar_estatisticas_conexoes(estatisticas_conexoes()) + "\n")
                 f.write("=" * 50 + "\n\n")
                 for linha in log_erros:
                     f.write(linha + "\n")
@@ -534,9 +806,10 @@ def processar_arquivo(caminho_arquivo, caminho_salvar, progresso_var, progresso_
 
         # Finalizar interface
         elapsed_total = time.time() - start_time
-        final_msg = f"✅ Concluído! {linhas_processadas}/{total} em {elapsed_total/60:.1f}min - {total_erros} erros"
+        final_msg = f"✅ Concluído! {linhas_processadas}/{total} em {elapsed_total/60:.1f}min - {total_erros} erros - {diario.resumo_custo()}"
         status_label.config(text=final_msg)
         print(final_msg)
+        print(formatar_estatisticas_conexoes(estatisticas_conexoes()))
         
     except Exception as e:
         error_msg = f"❌ Erro no processamento: {str(e)}"
@@ -567,6 +840,8 @@ def cancelar_processo(status_label, botao_iniciar, botao_cancelar, botao_parar,
     botao_arquivo.config(state="normal")
 
 def main():
+    import tkinter as tk
+    from tkinter import ttk, messagebox
     root = tk.Tk()
     root.title("Consultar Acordo - Etapa 2 (OTIMIZADO)")
     root.geometry("700x250")
@@ -578,7 +853,7 @@ def main():
     titulo = ttk.Label(frame, text="Consultar Status de Acordos - Versão Otimizada", font=("Arial", 12, "bold"))
     titulo.pack(pady=(0, 10))
     
-    info_otimizacao = ttk.Label(frame, text="🚀 Performance: 25 workers paralelos | ⚡ 3-5x mais rápido", foreground="green")
+    info_otimizacao = ttk.Label(frame, text="🚀 Performance: concorrência adaptativa (AIMD) | ⚡ 3-5x mais rápido", foreground="green")
     info_otimizacao.pack()
 
     progresso_var = tk.IntVar()
@@ -591,6 +866,10 @@ def main():
     status_label = ttk.Label(frame, text="Nenhum arquivo selecionado.")
     status_label.pack(pady=5)
 
+    usar_async_var = tk.BooleanVar(value=False)
+    check_async = ttk.Checkbutton(frame, text="⚡ Engine assíncrona (pipeline único, sem lotes)", variable=usar_async_var)
+    check_async.pack()
+
     # Frame para botões
     button_frame = ttk.Frame(frame)
     button_frame.pack(pady=10)
@@ -624,7 +903,8 @@ def main():
         iniciar_processo(
             caminho_arquivo, caminho_salvar,
             progresso_var, progresso_label, status_label,
-            botao_iniciar, botao_cancelar, botao_parar, botao_arquivo
+            botao_iniciar, botao_cancelar, botao_parar, botao_arquivo,
+            usar_async=usar_async_var.get()
         )
 
     def on_parar():
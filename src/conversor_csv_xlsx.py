@@ -1,21 +1,45 @@
 import pandas as pd
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+import sys
+from pathlib import Path
 import threading
 from datetime import datetime
 
+# Permite importar core/ também ao executar este arquivo diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.xlsx_writer import LINHAS_POR_BLOCO, gravar_blocos
+
 def detectar_delimitador(caminho):
-    with open(caminho, 'r', encoding='utf-8') as f:
-        primeira_linha = f.readline()
-        if ';' in primeira_linha:
-            return ';'
-        elif ',' in primeira_linha:
-            return ','
-        elif '\t' in primeira_linha:
-            return '\t'
-        else:
-            return ','  # padrão
+    # Tabulação antes da vírgula: cabeçalhos de TSV podem conter vírgulas
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            primeira_linha = f.readline()
+    except (OSError, UnicodeDecodeError):
+        return ','
+    if ';' in primeira_linha:
+        return ';'
+    elif '\t' in primeira_linha:
+        return '\t'
+    else:
+        return ','  # padrão
+
+def corrigir_cabecalhos(blocos):
+    for df in blocos:
+        df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", '')
+        yield df
+
+def converter_csv_xlsx(caminho_csv, pasta_destino):
+    """
+    Converte um CSV em <pasta_destino>/<nome>.xlsx e devolve o caminho gravado.
+    Lido e gravado em blocos: a memória não cresce com o tamanho do arquivo.
+    """
+    blocos = pd.read_csv(caminho_csv, delimiter=detectar_delimitador(caminho_csv), encoding='utf-8',
+                         chunksize=LINHAS_POR_BLOCO)
+    nome_arquivo = os.path.splitext(os.path.basename(caminho_csv))[0] + '.xlsx'
+    caminho_xlsx = os.path.join(pasta_destino, nome_arquivo)
+    with blocos:
+        gravar_blocos(corrigir_cabecalhos(blocos), caminho_xlsx)
+    return caminho_xlsx
 
 def salvar_log(erros):
     if not erros:
@@ -27,22 +51,14 @@ def salvar_log(erros):
             f.write(f"{erro}\n")
 
 def converter_em_thread(caminhos_csv, pasta_destino, progresso_var, barra, botao):
+    from tkinter import messagebox
     total = len(caminhos_csv)
     sucesso = 0
     erros = []
 
     for i, caminho_csv in enumerate(caminhos_csv, start=1):
         try:
-            delimitador = detectar_delimitador(caminho_csv)
-            df = pd.read_csv(caminho_csv, delimiter=delimitador)
-
-            # Corrigir cabeçalhos
-            df.columns = df.columns.str.strip().str.replace('"', '').str.replace("'", '')
-
-            nome_arquivo = os.path.splitext(os.path.basename(caminho_csv))[0] + '.xlsx'
-            caminho_xlsx = os.path.join(pasta_destino, nome_arquivo)
-
-            df.to_excel(caminho_xlsx, index=False)
+            converter_csv_xlsx(caminho_csv, pasta_destino)
             sucesso += 1
 
         except Exception as e:
@@ -61,6 +77,7 @@ def converter_em_thread(caminhos_csv, pasta_destino, progresso_var, barra, botao
     botao.config(state="normal")
 
 def iniciar_conversao():
+    from tkinter import filedialog
     caminhos_csv = filedialog.askopenfilenames(
         title="Selecione um ou mais arquivos CSV",
         filetypes=[("Arquivos CSV", "*.csv")]
@@ -81,26 +98,34 @@ def iniciar_conversao():
         daemon=True
     ).start()
 
-# Interface Gráfica
-root = tk.Tk()
-root.title("Conversor CSV para XLSX")
-root.geometry("480x220")
-root.resizable(False, False)
+# Interface gráfica (só ao executar o arquivo: importar o módulo não abre janela)
+def iniciar_interface():
+    import tkinter as tk
+    from tkinter import ttk
+    global progresso_var, barra_progresso, botao_converter
+
+    root = tk.Tk()
+    root.title("Conversor CSV para XLSX")
+    root.geometry("480x220")
+    root.resizable(False, False)
+
+    frame = ttk.Frame(root, padding=20)
+    frame.pack(expand=True, fill='both')
 
-frame = ttk.Frame(root, padding=20)
-frame.pack(expand=True, fill='both')
+    label = ttk.Label(frame, text="Selecione arquivos CSV e escolha onde salvar os arquivos XLSX.")
+    label.pack(pady=(0, 10))
 
-label = ttk.Label(frame, text="Selecione arquivos CSV e escolha onde salvar os arquivos XLSX.")
-label.pack(pady=(0, 10))
+    botao_converter = ttk.Button(frame, text="Selecionar e Converter", command=iniciar_conversao)
+    botao_converter.pack(pady=5)
 
-botao_converter = ttk.Button(frame, text="Selecionar e Converter", command=iniciar_conversao)
-botao_converter.pack(pady=5)
+    progresso_var = tk.DoubleVar()
+    barra_progresso = ttk.Progressbar(frame, variable=progresso_var, maximum=100)
+    barra_progresso.pack(fill='x', pady=(10, 0))
 
-progresso_var = tk.DoubleVar()
-barra_progresso = ttk.Progressbar(frame, variable=progresso_var, maximum=100)
-barra_progresso.pack(fill='x', pady=(10, 0))
+    rodape = ttk.Label(frame, text="Os erros (se houver) serão salvos em 'log_conversao.txt'")
+    rodape.pack(pady=(15, 0))
 
-rodape = ttk.Label(frame, text="Os erros (se houver) serão salvos em 'log_conversao.txt'")
-rodape.pack(pady=(15, 0))
+    root.mainloop()
 
-root.mainloop()
+if __name__ == "__main__":
+    iniciar_interface()
@@ -1,12 +1,58 @@
 import pandas as pd
 import json
 import os
-import tkinter as tk
-from tkinter import filedialog, messagebox, ttk
+import sys
+from pathlib import Path
 from datetime import datetime
 import time
 
+# Permite importar core/ também ao executar este arquivo diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.xlsx_reader import ler_xlsx
+from core.xlsx_writer import gravar_dataframe
+
+def extrair_campos(data, registro, prefix=""):
+    """Achata o JSON em registro: chaves aninhadas viram pai_filho e itens de lista lista_0_campo"""
+    if isinstance(data, dict):
+        for key, value in data.items():
+            new_key = f"{prefix}{key}" if prefix else key
+            if isinstance(value, (dict, list)):
+                extrair_campos(value, registro, f"{new_key}_")
+            else:
+                registro[new_key] = value
+    elif isinstance(data, list):
+        for i, item in enumerate(data):
+            extrair_campos(item, registro, f"{prefix}{i}_")
+    return registro
+
+def achatar_corpo_requisicao(item):
+    """
+    (índice, corpo_requisicao) → registro com todos os campos do JSON achatados, ou com 'erro'.
+    Função de módulo: roda nos processos do core.cpu_executor.
+    """
+    idx, corpo_requisicao = item
+    try:
+        if pd.notna(corpo_requisicao) and corpo_requisicao.strip():
+            try:
+                return extrair_campos(json.loads(corpo_requisicao), {'linha_original': idx + 1})
+            except json.JSONDecodeError:
+                return {
+                    'linha_original': idx + 1,
+                    'erro': 'JSON inválido',
+                    'corpo_original': str(corpo_requisicao)[:100]
+                }
+        return {
+            'linha_original': idx + 1,
+            'erro': 'Campo vazio'
+        }
+    except Exception as e:
+        return {
+            'linha_original': idx + 1,
+            'erro': f"Erro: {str(e)}"
+        }
+
 def extrair_e_salvar():
+    from tkinter import filedialog, messagebox
     caminho_arquivo = filedialog.askopenfilename(
         title="Selecione o arquivo XLSX de entrada",
         filetypes=[("Arquivos Excel", "*.xlsx")]
@@ -16,7 +62,8 @@ def extrair_e_salvar():
         return
 
     try:
-        df = pd.read_excel(caminho_arquivo)
+        # Só a coluna usada: as demais nem chegam a virar DataFrame
+        df = ler_xlsx(caminho_arquivo, colunas=["corpo_requisicao"])
 
         if 'corpo_requisicao' not in df.columns:
             messagebox.showerror("Erro", "A coluna 'corpo_requisicao' não foi encontrada.")
@@ -91,7 +138,7 @@ def extrair_e_salvar():
         if not caminho_saida:
             return
 
-        novo_df.to_excel(caminho_saida, index=False)
+        gravar_dataframe(novo_df, caminho_saida)
 
         # Salvar log de falhas
         if falhas:
@@ -112,6 +159,8 @@ def extrair_e_salvar():
 
 # Interface gráfica
 def iniciar_interface():
+    import tkinter as tk
+    from tkinter import ttk
     global progresso_var, barra_progresso, tempo_label
 
     root = tk.Tk()
@@ -1,13 +1,20 @@
-import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+import numpy as np
 import pandas as pd
 import threading
 import time
 import os
+import sys
+from pathlib import Path
 from datetime import datetime
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
-from openpyxl.styles import PatternFill, Font
+
+# Permite importar core/ também ao executar este arquivo diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.config_manager import carregar_config_projeto
+from core.cpu_executor import EstagioCPU, EstagioEmLinha, obter_estagio_cpu
+from core.particionamento import FRACAO_BUFFER, MB, ArmazemParticoes, ler_particao, limite_memoria, motor_particoes
+from core.xlsx_reader import ler_blocos, ler_cabecalho, ler_xlsx
+from core.xlsx_writer import (ESTILO_CABECALHO_SIMPLES, ESTILO_REGISTRO_CORRETO, EscritorXlsx,
+                               gravar_dataframe)
 
 # Variáveis globais de controle
 parar_flag = threading.Event()
@@ -15,6 +22,33 @@ linhas_processadas = 0
 total_duplicatas = 0
 log_duplicatas = []
 
+# Registros com o mesmo valor nestas colunas são duplicatas
+CHAVE_DUPLICATAS = ['cpf', 'data_vencimento', 'numero_prestacao']
+
+# Colunas obrigatórias da planilha de entrada
+COLUNAS_DUPLICATAS = CHAVE_DUPLICATAS + ['cod_prestacao']
+
+# Valores de data_pagamento tratados como "sem pagamento"
+PAGAMENTO_VAZIO = ['', 0, '0', 'N/A', '0000-00-00', '1900-01-01']
+
+# Estimativa de memória da leitura completa: o DataFrame ocupa ~10x o .xlsx (compactado)
+# e a resolução faz até ~3 cópias (grupos, critérios de ordenação e resultado)
+FATOR_MEMORIA_XLSX = 10
+FATOR_PICO_DUPLICATAS = 3
+
+# Regra que escolheu o registro de cada grupo (coluna regra_aplicada), na ordem de prioridade
+REGRAS_DUPLICATAS = {
+    'REGRA 1': "Se tiver data_pagamento: salva linha sem data_pagamento",
+    'REGRA 2': "Se ambos têm data_pagamento: prioriza cod_acordo=0",
+    'REGRA 3': "Se ambos têm data_pagamento e cod_acordo: menor cod_prestacao",
+    'REGRA 4': "Se data_pagamento null: prioriza cod_acordo=0",
+    'REGRA 5': "Se data_pagamento null e ambos têm cod_acordo: menor cod_prestacao",
+    'SEM COD_ACORDO': "Arquivo sem coluna cod_acordo: menor cod_prestacao",
+}
+
+# Critério que decidiu entre os candidatos da regra
+DESEMPATES_DUPLICATAS = ['candidato único', 'menor cod_prestacao', 'menor cod_acordo', 'primeiro registro']
+
 def filtrar_duplicatas_cpf_data(df):
     """
     Filtra duplicatas baseado em CPF, data_vencimento e numero_prestacao
@@ -25,15 +59,15 @@ def filtrar_duplicatas_cpf_data(df):
     3. Se tiver data_pagamento e cod_acordo em ambos: traz onde cod_prestacao é mais antigo (menor)
     4. Se data_pagamento for null: traz onde cod_acordo está zerado
     5. Se data_pagamento for null e tiver cod_acordo em ambos: traz cod_prestacao mais antiga (menor)
-    """
-    global total_duplicatas, log_duplicatas
     
+    Desempate entre os candidatos da regra: menor cod_prestacao, depois menor cod_acordo,
+    depois o primeiro registro do arquivo.
+    """
     print(f"📊 Analisando duplicatas com nova lógica...")
     print(f"   📈 Total de registros: {len(df)}")
     
     # Verificar se as colunas necessárias existem
-    colunas_necessarias = ['cpf', 'data_vencimento', 'numero_prestacao', 'cod_prestacao']
-    colunas_faltantes = [col for col in colunas_necessarias if col not in df.columns]
+    colunas_faltantes = [col for col in COLUNAS_DUPLICATAS if col not in df.columns]
     
     # Verificar colunas opcionais para regras de negócio
     colunas_opcionais = ['data_pagamento', 'cod_acordo']
@@ -44,11 +78,7 @@ def filtrar_duplicatas_cpf_data(df):
     
     print(f"   📋 Colunas para regras de negócio encontradas: {colunas_disponiveis}")
     
-    # Identificar grupos duplicados
-    grupos = df.groupby(['cpf', 'data_vencimento', 'numero_prestacao'])
-    
-    # Manter apenas grupos que têm mais de 1 registro (duplicados)
-    grupos_duplicados = grupos.filter(lambda x: len(x) > 1)
+    grupos_duplicados = selecionar_grupos_duplicados(df)
     
     if len(grupos_duplicados) == 0:
         print(f"   ✅ Nenhum duplicado encontrado!")
@@ -56,250 +86,310 @@ def filtrar_duplicatas_cpf_data(df):
     
     print(f"   🔍 Duplicados encontrados: {len(grupos_duplicados)}")
     
-    # Processar cada grupo de duplicatas aplicando as regras
-    df_resultado = pd.DataFrame()
-    grupos_processados = grupos_duplicados.groupby(['cpf', 'data_vencimento', 'numero_prestacao'])
-    
-    for (cpf, data_venc, num_prest), grupo in grupos_processados:
-        print(f"   🎯 Processando grupo: CPF={cpf}, Data={data_venc}, Num={num_prest} ({len(grupo)} registros)")
-        
-        # Aplicar as regras de prioridade
-        registro_escolhido = aplicar_regras_duplicatas(grupo, cpf, data_venc, num_prest)
-        
-        if registro_escolhido is not None:
-            df_resultado = pd.concat([df_resultado, registro_escolhido], ignore_index=True)
+    df_resultado = resolver_grupos_duplicados(grupos_duplicados)
+    registrar_resultado_duplicatas(df_resultado)
+    return df_resultado
+
+def selecionar_grupos_duplicados(df):
+    """Apenas os grupos com mais de 1 registro (chaves com valor vazio não formam grupo)"""
+    tamanho_grupo = df.groupby(CHAVE_DUPLICATAS, sort=False)[CHAVE_DUPLICATAS[0]].transform('size')
+    return df[tamanho_grupo > 1]
+
+def resolver_grupos_duplicados(grupos_duplicados):
+    """Registro escolhido de cada grupo, na ordem das chaves, com eh_menor_cod e regra_aplicada"""
+    # Regras aplicadas a todos os grupos de uma vez: um único sort e um registro por grupo
+    posicoes, regras = escolher_registros_duplicatas(grupos_duplicados)
+    df_resultado = grupos_duplicados.iloc[posicoes].reset_index(drop=True)
     
     # Marcar todos os registros como "corretos" (serão salvos)
-    df_resultado = df_resultado.copy()
     df_resultado['eh_menor_cod'] = True  # Todos são considerados corretos pela nova lógica
+    df_resultado['regra_aplicada'] = regras
+    return df_resultado
+
+def registrar_resultado_duplicatas(df_resultado):
+    """Totais no console e uma linha por grupo em log_duplicatas"""
+    global total_duplicatas
     
     total_duplicatas = len(df_resultado)
     
     print(f"   ✅ Total de registros após aplicar regras: {total_duplicatas}")
+    print(f"   📊 Grupos processados: {total_duplicatas}")
+    for regra, _, quantidade in contar_regras(df_resultado):
+        print(f"      • {regra}: {quantidade}")
     
-    # Log dos grupos processados
-    grupos_unicos = df_resultado.groupby(['cpf', 'data_vencimento', 'numero_prestacao']).size()
-    print(f"   📊 Grupos processados: {len(grupos_unicos)}")
-    
-    for (cpf, data_venc, num_prest), count in grupos_unicos.items():
-        log_entry = f"Grupo resolvido: CPF={cpf}, Data Venc={data_venc}, Num Prest={num_prest} - {count} registro(s) selecionado(s)"
-        log_duplicatas.append(log_entry)
-        print(f"   📝 {log_entry}")
-    
-    return df_resultado
+    # Log dos grupos processados (um registro escolhido por grupo)
+    log_duplicatas.extend(linhas_grupos_processados(df_resultado))
+
+def linhas_grupos_processados(df_resultado):
+    """Uma linha por grupo resolvido, com a regra aplicada"""
+    return (
+        f"Grupo resolvido: CPF={cpf}, Data Venc={data_venc}, Num Prest={num_prest} - 1 registro(s) selecionado(s) [{regra}]"
+        for cpf, data_venc, num_prest, regra
+        in df_resultado[CHAVE_DUPLICATAS + ['regra_aplicada']].itertuples(index=False, name=None)
+    )
 
-def aplicar_regras_duplicatas(grupo, cpf, data_venc, num_prest):
+def deve_particionar(caminho_arquivo, config=None):
     """
-    Aplica as regras específicas para escolher qual registro manter do grupo de duplicatas
-    Melhorada para cobrir cenários extremos e empates
+    Se a planilha, lida inteira, passaria de performance.memory_limit_mb ao resolver as duplicatas
+    (estimativa pelo tamanho do .xlsx, que é compactado)
     """
-    # Fazer cópia para evitar warnings
-    grupo = grupo.copy()
-    
-    # Verificar se tem coluna data_pagamento
-    tem_data_pagamento = 'data_pagamento' in grupo.columns
-    tem_cod_acordo = 'cod_acordo' in grupo.columns
-    
-    print(f"      📋 Analisando {len(grupo)} registros do grupo")
-    
-    if tem_data_pagamento:
-        # Verificar quais registros têm data_pagamento preenchida (incluindo valores especiais)
-        tem_pagamento = (
-            grupo['data_pagamento'].notna() & 
-            (grupo['data_pagamento'] != '') & 
-            (grupo['data_pagamento'] != 0) &
-            (grupo['data_pagamento'] != '0') &
-            (grupo['data_pagamento'] != 'N/A') &
-            (grupo['data_pagamento'] != '0000-00-00') &
-            (grupo['data_pagamento'] != '1900-01-01')
-        )
-        registros_com_pagamento = grupo[tem_pagamento]
-        registros_sem_pagamento = grupo[~tem_pagamento]
-        
-        print(f"      💰 Registros COM data_pagamento: {len(registros_com_pagamento)}")
-        print(f"      📅 Registros SEM data_pagamento: {len(registros_sem_pagamento)}")
-        
-        # REGRA 1: Se tiver data_pagamento, salva somente a linha que NÃO tem data_pagamento
-        if len(registros_com_pagamento) > 0 and len(registros_sem_pagamento) > 0:
-            print(f"      ✅ REGRA 1: Escolhendo registro SEM data_pagamento")
-            # Se há múltiplos sem pagamento, aplicar critérios de desempate
-            if len(registros_sem_pagamento) > 1:
-                return aplicar_criterios_desempate(registros_sem_pagamento, "REGRA 1", tem_cod_acordo)
-            return registros_sem_pagamento.iloc[[0]]
-        
-        # REGRA 2: Se tiver data_pagamento em ambos, traz onde cod_acordo está zerado
-        elif len(registros_com_pagamento) > 0 and len(registros_sem_pagamento) == 0:
-            print(f"      💰 Todos têm data_pagamento, aplicando REGRA 2")
-            if tem_cod_acordo:
-                # Normalizar cod_acordo para garantir comparação correta
-                registros_com_pagamento = registros_com_pagamento.copy()
-                registros_com_pagamento['cod_acordo_norm'] = pd.to_numeric(registros_com_pagamento['cod_acordo'], errors='coerce').fillna(-1)
-                registros_cod_zero = registros_com_pagamento[registros_com_pagamento['cod_acordo_norm'] == 0]
-                
-                if len(registros_cod_zero) > 0:
-                    print(f"      ✅ REGRA 2: Escolhendo registro com cod_acordo=0")
-                    # Se há múltiplos com cod_acordo=0, aplicar critérios de desempate
-                    if len(registros_cod_zero) > 1:
-                        return aplicar_criterios_desempate(registros_cod_zero, "REGRA 2", tem_cod_acordo)
-                    return registros_cod_zero.iloc[[0]]
-                else:
-                    # REGRA 3: Se todos têm data_pagamento e cod_acordo, pega menor cod_prestacao
-                    print(f"      ✅ REGRA 3: Escolhendo menor cod_prestacao")
-                    return aplicar_criterios_desempate(registros_com_pagamento, "REGRA 3", tem_cod_acordo)
-            else:
-                # Sem cod_acordo, pega menor cod_prestacao
-                print(f"      ✅ Sem cod_acordo, escolhendo menor cod_prestacao")
-                return aplicar_criterios_desempate(registros_com_pagamento, "SEM COD_ACORDO", tem_cod_acordo)
-        
-        # Se só tem registros sem data_pagamento, continua para regras 4 e 5
-        else:
-            grupo_sem_pagamento = registros_sem_pagamento
-    else:
-        # Não tem coluna data_pagamento, considera todos como sem data_pagamento
-        grupo_sem_pagamento = grupo
-        print(f"      📅 Coluna data_pagamento não encontrada, processando como NULL")
-    
-    # REGRA 4: Se data_pagamento for null, traz onde cod_acordo está zerado
-    if tem_cod_acordo:
-        # Normalizar cod_acordo para garantir comparação correta
-        grupo_sem_pagamento = grupo_sem_pagamento.copy()
-        grupo_sem_pagamento['cod_acordo_norm'] = pd.to_numeric(grupo_sem_pagamento['cod_acordo'], errors='coerce').fillna(-1)
-        registros_cod_zero = grupo_sem_pagamento[grupo_sem_pagamento['cod_acordo_norm'] == 0]
-        
-        if len(registros_cod_zero) > 0:
-            print(f"      ✅ REGRA 4: Escolhendo registro com cod_acordo=0 (data_pagamento NULL)")
-            # Se há múltiplos com cod_acordo=0, aplicar critérios de desempate
-            if len(registros_cod_zero) > 1:
-                return aplicar_criterios_desempate(registros_cod_zero, "REGRA 4", tem_cod_acordo)
-            return registros_cod_zero.iloc[[0]]
-        else:
-            # REGRA 5: Se data_pagamento null e tem cod_acordo em todos, pega menor cod_prestacao
-            print(f"      ✅ REGRA 5: Escolhendo menor cod_prestacao (data_pagamento NULL)")
-            return aplicar_criterios_desempate(grupo_sem_pagamento, "REGRA 5", tem_cod_acordo)
-    else:
-        # Sem cod_acordo, pega menor cod_prestacao
-        print(f"      ✅ Sem cod_acordo, escolhendo menor cod_prestacao (data_pagamento NULL)")
-        return aplicar_criterios_desempate(grupo_sem_pagamento, "SEM COD_ACORDO", tem_cod_acordo)
+    estimativa = os.path.getsize(caminho_arquivo) * FATOR_MEMORIA_XLSX * FATOR_PICO_DUPLICATAS
+    return estimativa > limite_memoria(config)
 
-def aplicar_criterios_desempate(registros, regra_aplicada, tem_cod_acordo):
-    """
-    Aplica critérios de desempate quando múltiplos registros atendem à mesma regra
-    Critérios em ordem:
-    1. Menor cod_prestacao
-    2. Se empate: menor cod_acordo (se existir)
-    3. Se empate: primeiro registro (index menor)
+def filtrar_duplicatas_particionado(caminho_arquivo, config=None, workers=None, ao_progresso=None):
     """
-    if len(registros) == 1:
-        return registros.iloc[[0]]
+    Mesmo resultado de filtrar_duplicatas_cpf_data(ler_xlsx(caminho_arquivo)) para planilhas maiores que a memória.
     
-    print(f"         🎲 Desempate necessário para {regra_aplicada}: {len(registros)} registros")
+    1. A planilha é lida em blocos e as linhas vão para baldes em disco pelo hash do CPF
+       (todas as linhas de um grupo de duplicatas caem no mesmo balde)
+    2. Baldes são juntados em partições que cabem em performance.memory_limit_mb dividido
+       pelos processos do estágio de CPU (performance.cpu_workers, ou `workers`)
+    3. Cada partição é resolvida em um processo do estágio (core.cpu_executor)
+    4. Os vencedores são juntados na ordem das chaves, como na leitura completa
+    
+    ao_progresso(mensagem) recebe o andamento. Retorna (registros escolhidos, total de registros lidos).
+    """
+    config = config or carregar_config_projeto()
+    # Sem `workers`, o estágio de CPU compartilhado (performance.cpu_workers)
+    if workers is None:
+        estagio = obter_estagio_cpu(config)
+    else:
+        estagio = EstagioCPU(workers) if workers > 1 else EstagioEmLinha()
+    limite = limite_memoria(config)
+    ao_progresso = ao_progresso or (lambda mensagem: None)
     
-    # Critério 1: Menor cod_prestacao
-    menor_cod_prestacao = registros['cod_prestacao'].min()
-    candidatos = registros[registros['cod_prestacao'] == menor_cod_prestacao]
+    cabecalho = ler_cabecalho(caminho_arquivo)
+    colunas_faltantes = [col for col in COLUNAS_DUPLICATAS if col not in cabecalho]
+    if colunas_faltantes:
+        raise ValueError(f"❌ Colunas não encontradas no arquivo: {', '.join(colunas_faltantes)}")
     
-    if len(candidatos) == 1:
-        print(f"         ✅ Desempate por menor cod_prestacao: {menor_cod_prestacao}")
-        return candidatos.iloc[[0]]
+    print(f"📊 Resolvendo duplicatas em partições (limite de memória: {limite // MB} MB, {estagio.processos} processo(s))")
+    try:
+        with ArmazemParticoes(CHAVE_DUPLICATAS[0], int(limite * FRACAO_BUFFER)) as armazem:
+            for bloco in ler_blocos(caminho_arquivo):
+                armazem.adicionar(bloco)
+                ao_progresso(f"📂 Particionando por CPF... {armazem.linhas:,} registros")
+            
+            total_inicial = armazem.linhas
+            print(f"   📈 Total de registros: {total_inicial}")
+            if total_inicial == 0:
+                return pd.DataFrame(), 0
+            
+            particoes = armazem.particoes(limite // estagio.processos // FATOR_PICO_DUPLICATAS)
+            print(f"   🧩 {len(particoes)} partição(ões) em disco ({motor_particoes()})")
+            
+            # Uma partição por tarefa: cada processo lê a sua do disco
+            resultados = estagio.mapear(_resolver_particao, [(arquivos, armazem.tipos) for arquivos in particoes],
+                                        tamanho_lote=1)
+            vencedores, duplicados = _juntar_resultados(resultados, len(particoes), ao_progresso)
+    finally:
+        if workers is not None:
+            estagio.fechar()
     
-    print(f"         🎲 Empate em cod_prestacao ({menor_cod_prestacao}), aplicando critério 2")
+    if not vencedores:
+        print(f"   ✅ Nenhum duplicado encontrado!")
+        return pd.DataFrame(columns=list(armazem.tipos.columns)), total_inicial
     
-    # Critério 2: Menor cod_acordo (se existir)
-    if tem_cod_acordo and 'cod_acordo' in candidatos.columns:
-        if 'cod_acordo_norm' not in candidatos.columns:
-            candidatos = candidatos.copy()
-            candidatos['cod_acordo_norm'] = pd.to_numeric(candidatos['cod_acordo'], errors='coerce').fillna(999999)
-        
-        menor_cod_acordo = candidatos['cod_acordo_norm'].min()
-        candidatos_final = candidatos[candidatos['cod_acordo_norm'] == menor_cod_acordo]
-        
-        if len(candidatos_final) == 1:
-            print(f"         ✅ Desempate por menor cod_acordo: {menor_cod_acordo}")
-            return candidatos_final.iloc[[0]]
-        
-        candidatos = candidatos_final
-        print(f"         🎲 Empate em cod_acordo ({menor_cod_acordo}), aplicando critério 3")
+    print(f"   🔍 Duplicados encontrados: {duplicados}")
     
-    # Critério 3: Primeiro registro (menor index)
-    print(f"         ✅ Desempate por primeiro registro (index menor)")
-    registro_escolhido = candidatos.iloc[[0]]
+    # Um registro por grupo: reordenar pelas chaves deixa a saída igual à da leitura completa
+    df_resultado = pd.concat(vencedores, ignore_index=True)
+    ordem = np.argsort(df_resultado.groupby(CHAVE_DUPLICATAS, sort=True).ngroup().to_numpy(), kind='stable')
+    df_resultado = df_resultado.iloc[ordem].reset_index(drop=True)
     
-    return registro_escolhido
+    registrar_resultado_duplicatas(df_resultado)
+    return df_resultado, total_inicial
+
+def _resolver_particao(particao):
+    """Executado nos processos: (registros escolhidos ou None, registros duplicados da partição)"""
+    arquivos, tipos = particao
+    grupos_duplicados = selecionar_grupos_duplicados(ler_particao(arquivos, tipos))
+    if len(grupos_duplicados) == 0:
+        return None, 0
+    return resolver_grupos_duplicados(grupos_duplicados), len(grupos_duplicados)
+
+def _juntar_resultados(resultados, total_particoes, ao_progresso):
+    vencedores, duplicados = [], 0
+    for numero, (df_particao, quantidade) in enumerate(resultados, 1):
+        if df_particao is not None:
+            vencedores.append(df_particao)
+        duplicados += quantidade
+        ao_progresso(f"🎯 Partições resolvidas: {numero}/{total_particoes}")
+    return vencedores, duplicados
+
+def registros_com_pagamento(data_pagamento):
+    """Máscara dos registros com data_pagamento preenchida (ignorando valores especiais)"""
+    tem_pagamento = data_pagamento.notna()
+    for vazio in PAGAMENTO_VAZIO:
+        tem_pagamento &= (data_pagamento != vazio)
+    return tem_pagamento
+
+def escolher_registros_duplicatas(grupos):
+    """
+    Posições (em `grupos`) do registro escolhido em cada grupo de duplicatas, na ordem
+    das chaves (cpf, data_vencimento, numero_prestacao), e a regra que escolheu cada um.
+    
+    As regras viram colunas calculadas uma vez para o DataFrame inteiro:
+    - candidato: o registro pode ser escolhido pela regra que vale para o seu grupo
+      (regra 1 quando o grupo mistura linhas com e sem pagamento; senão regras 2-5:
+      cod_acordo=0 se algum registro do grupo tiver, senão todos)
+    - desempate: cod_prestacao, cod_acordo numérico (vazio conta como 999999 na regra 1
+      e como -1 nas demais) e a ordem original
+    Um sort por grupo + critérios e drop_duplicates pelo grupo dão o vencedor de cada um.
+    
+    A regra vem como Categorical "REGRA n (desempate)" (ver REGRAS_DUPLICATAS e
+    DESEMPATES_DUPLICATAS), também calculada por coluna, sem laço por grupo.
+    """
+    grupo_id = grupos.groupby(CHAVE_DUPLICATAS, sort=True).ngroup().to_numpy()
+    tamanho = np.bincount(grupo_id)
+    
+    if 'data_pagamento' in grupos.columns:
+        pago = registros_com_pagamento(grupos['data_pagamento']).to_numpy(dtype=bool)
+        pagos_no_grupo = np.bincount(grupo_id, weights=pago, minlength=len(tamanho))[grupo_id]
+        # Regra 1: o grupo tem registros com e sem data_pagamento
+        misto = (pagos_no_grupo > 0) & (pagos_no_grupo < tamanho[grupo_id])
+        todos_pagos = pagos_no_grupo == tamanho[grupo_id]
+    else:
+        pago = np.zeros(len(grupos), dtype=bool)
+        misto = np.zeros(len(grupos), dtype=bool)
+        todos_pagos = misto
+    
+    ordem = pd.DataFrame({'grupo': grupo_id, 'cod_prestacao': grupos['cod_prestacao'].to_numpy(),
+                          'posicao': np.arange(len(grupos))})
+    criterios = ['grupo', 'cod_prestacao']
+    
+    if 'cod_acordo' in grupos.columns:
+        cod_acordo = pd.to_numeric(grupos['cod_acordo'], errors='coerce').to_numpy(dtype=float)
+        zerado = cod_acordo == 0
+        # Regras 2 e 4: algum registro do grupo tem cod_acordo=0
+        tem_zerado = np.bincount(grupo_id, weights=zerado, minlength=len(tamanho))[grupo_id] > 0
+        candidato = np.where(misto, ~pago, ~tem_zerado | zerado)
+        ordem['cod_acordo'] = np.where(np.isnan(cod_acordo), np.where(misto, 999999, -1), cod_acordo)
+        criterios.append('cod_acordo')
+        # Índices em REGRAS_DUPLICATAS: 1/2 com todos pagos, 3/4 com nenhum pago
+        regra = np.where(misto, 0, np.where(tem_zerado, 1, 2) + np.where(todos_pagos, 0, 2))
+    else:
+        candidato = np.where(misto, ~pago, True)
+        regra = np.where(misto, 0, 5)
+    
+    criterios.append('posicao')
+    ordenados = ordem[candidato].sort_values(criterios, kind='mergesort', na_position='last')
+    primeiro = ~ordenados['grupo'].duplicated().to_numpy()
+    vencedores = ordenados[primeiro]
+    
+    desempate = classificar_desempates(ordenados, primeiro, criterios[1:-1])
+    codigos = regra[vencedores['posicao'].to_numpy()] * len(DESEMPATES_DUPLICATAS) + desempate
+    rotulos = [f"{r} ({d})" for r in REGRAS_DUPLICATAS for d in DESEMPATES_DUPLICATAS]
+    return vencedores['posicao'].to_numpy(), pd.Categorical.from_codes(codigos, rotulos)
+
+def classificar_desempates(ordenados, primeiro, criterios):
+    """
+    Índice em DESEMPATES_DUPLICATAS do critério que separou o vencedor de cada grupo:
+    quantos candidatos empatam com ele em cada critério, contados por bincount.
+    `ordenados` já está na ordem de escolha e `primeiro` marca o vencedor de cada grupo.
+    """
+    grupo = ordenados['grupo'].to_numpy()
+    vencedor = np.cumsum(primeiro) - 1  # grupo (na ordem dos vencedores) de cada candidato
+    empatados = np.ones(len(ordenados), dtype=bool)
+    desempate = np.full(primeiro.sum(), len(DESEMPATES_DUPLICATAS) - 1)
+    
+    restantes = np.bincount(vencedor)
+    decidido = restantes == 1
+    desempate[decidido] = 0
+    for nivel, criterio in enumerate(criterios, 1):
+        valores = ordenados[criterio]
+        valor_vencedor = valores[primeiro].to_numpy()[vencedor]
+        # Empate com o vencedor (vazios empatam entre si)
+        igual = (valores.to_numpy() == valor_vencedor) | (valores.isna().to_numpy() & pd.isna(valor_vencedor))
+        empatados &= igual
+        restantes = np.bincount(vencedor, weights=empatados, minlength=len(desempate))
+        agora = ~decidido & (restantes == 1)
+        desempate[agora] = nivel
+        decidido |= agora
+    return desempate
+
+def contar_regras(df_resultado):
+    """Quantos grupos cada regra resolveu: [(regra, descrição, quantidade)], só as que ocorreram"""
+    if 'regra_aplicada' not in df_resultado.columns or len(df_resultado) == 0:
+        return []
+    # "REGRA 3 (menor cod_prestacao)" → "REGRA 3"
+    regras = df_resultado['regra_aplicada'].astype(str).str.split(' (', n=1, regex=False).str[0]
+    contagem = regras.value_counts()
+    return [(regra, descricao, int(contagem[regra])) for regra, descricao in REGRAS_DUPLICATAS.items()
+            if regra in contagem.index]
+
+def contar_desempates(df_resultado):
+    """Quantos grupos cada critério de desempate decidiu: [(critério, quantidade)], só os que ocorreram"""
+    if 'regra_aplicada' not in df_resultado.columns or len(df_resultado) == 0:
+        return []
+    desempates = df_resultado['regra_aplicada'].astype(str).str.extract(r'\((.*)\)$', expand=False)
+    contagem = desempates.value_counts()
+    return [(criterio, int(contagem[criterio])) for criterio in DESEMPATES_DUPLICATAS if criterio in contagem.index]
+
+def linhas_relatorio_regras(df_resultado):
+    """Seção "REGRAS APLICADAS" do _relatorio_duplicatas.txt com a frequência real de cada regra"""
+    total = len(df_resultado)
+    linhas = ["REGRAS APLICADAS (grupos resolvidos por regra):"]
+    for regra, descricao, quantidade in contar_regras(df_resultado):
+        linhas.append(f"{regra}: {quantidade} ({quantidade / total * 100:.1f}%) - {descricao}")
+    linhas.append("")
+    linhas.append("CRITÉRIO DE DESEMPATE:")
+    for criterio, quantidade in contar_desempates(df_resultado):
+        linhas.append(f"{criterio}: {quantidade} ({quantidade / total * 100:.1f}%)")
+    return linhas
+
+def gravar_relatorio_duplicatas(df_resultado, arquivo_entrada, arquivo_saida, total_inicial):
+    """Grava o _relatorio_duplicatas.txt ao lado do resultado; devolve (caminho do relatório, grupos resolvidos)"""
+    relatorio_file = arquivo_saida.replace('.xlsx', '_relatorio_duplicatas.txt')
+    grupos_resolvidos = len(df_resultado.groupby(CHAVE_DUPLICATAS))
+    
+    with open(relatorio_file, "w", encoding="utf-8") as f:
+        f.write(f"=== RELATÓRIO DE RESOLUÇÃO DE DUPLICATAS ===\n")
+        f.write(f"Data/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+        f.write(f"Arquivo original: {os.path.basename(arquivo_entrada)}\n")
+        f.write(f"Arquivo de resultado: {os.path.basename(arquivo_saida)}\n")
+        f.write(f"Total de registros originais: {total_inicial}\n")
+        f.write(f"Grupos de duplicatas resolvidos: {grupos_resolvidos}\n")
+        f.write(f"Registros corretos escolhidos: {len(df_resultado)}\n")
+        f.write(f"Taxa de duplicação: {(grupos_resolvidos/total_inicial*100) if total_inicial > 0 else 0:.1f}%\n")
+        f.write("=" * 60 + "\n\n")
+        for linha in linhas_relatorio_regras(df_resultado):
+            f.write(linha + "\n")
+        f.write("=" * 60 + "\n\n")
+        f.write("GRUPOS PROCESSADOS:\n")
+        f.write("-" * 30 + "\n")
+        for linha in linhas_grupos_processados(df_resultado):
+            f.write(linha + "\n")
+    return relatorio_file, grupos_resolvidos
 
 def salvar_arquivo_com_formatacao(df, caminho_arquivo):
     """
     Salva os registros CORRETOS escolhidos pelas regras de duplicatas
     """
     # Com a nova lógica, todos os registros do df são considerados corretos
-    df_registros_corretos = df.copy()
-    
-    print(f"   📝 Salvando registros corretos escolhidos: {len(df_registros_corretos)} registros")
+    print(f"   📝 Salvando registros corretos escolhidos: {len(df)} registros")
     
     # Verificar se há registros para salvar
-    if len(df_registros_corretos) == 0:
+    if len(df) == 0:
         print(f"   ⚠️ Nenhum registro para salvar")
         # Criar arquivo vazio com cabeçalhos apenas
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Registros_Corretos"
-        
-        # Adicionar apenas cabeçalhos
-        headers = ['Nenhum registro encontrado']
-        
-        for col_num, header in enumerate(headers, 1):
-            ws.cell(row=1, column=col_num, value=header)
-            ws.cell(row=1, column=col_num).font = Font(bold=True)
-        
-        wb.save(caminho_arquivo)
+        with EscritorXlsx(caminho_arquivo, ['Nenhum registro encontrado'], "Registros_Corretos",
+                          ESTILO_CABECALHO_SIMPLES):
+            pass
         return
     
-    # Criar workbook
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Registros_Corretos"
-    
-    # Adicionar cabeçalhos (remover coluna auxiliar se existir)
-    headers = list(df_registros_corretos.columns)
-    if 'eh_menor_cod' in headers:
-        headers.remove('eh_menor_cod')  # Remover coluna auxiliar do arquivo final
-    
-    for col_num, header in enumerate(headers, 1):
-        ws.cell(row=1, column=col_num, value=header)
-        # Formatar cabeçalho
-        ws.cell(row=1, column=col_num).font = Font(bold=True)
-    
-    # Definir estilo verde para destacar registros corretos escolhidos
-    green_fill = PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid")
-    green_font = Font(color="006400", bold=True)
-    
-    # Adicionar os dados dos registros corretos
-    for row_num, (index, row) in enumerate(df_registros_corretos.iterrows(), 2):
-        for col_num, header in enumerate(headers, 1):
-            cell_value = row[header]
-            cell = ws.cell(row=row_num, column=col_num, value=cell_value)
-            
-            # Aplicar formatação verde em todos os registros corretos
-            cell.fill = green_fill
-            cell.font = green_font
-    
-    # Ajustar largura das colunas
-    for column in ws.columns:
-        max_length = 0
-        column_letter = column[0].column_letter
-        for cell in column:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = min(max_length + 2, 50)
-        ws.column_dimensions[column_letter].width = adjusted_width
-    
-    # Salvar arquivo
-    wb.save(caminho_arquivo)
+    # Remover coluna auxiliar do arquivo final
+    headers = [coluna for coluna in df.columns if coluna != 'eh_menor_cod']
+    
+    # Gravação em streaming: estilo verde nomeado aplicado por linha e larguras
+    # calculadas por amostra, sem montar todas as células em memória
+    gravar_dataframe(df, caminho_arquivo, "Registros_Corretos", headers,
+                     estilo_linha=ESTILO_REGISTRO_CORRETO, estilo_cabecalho=ESTILO_CABECALHO_SIMPLES)
 
 def processar_filtro_duplicatas(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_parar, botao_cancelar, botao_arquivo):
     """Processa o arquivo removendo duplicatas"""
+    import tkinter as tk
+    from tkinter import messagebox
     global linhas_processadas, log_duplicatas, total_duplicatas
     
     try:
@@ -312,24 +402,35 @@ def processar_filtro_duplicatas(caminho_arquivo, caminho_salvar, progresso_var,
         status_label.config(text="📂 Carregando arquivo...")
         progresso_var.set(10)
         
-        # Carregar arquivo
-        print(f"📂 Carregando arquivo: {caminho_arquivo}")
-        df = pd.read_excel(caminho_arquivo)
-        
-        total_inicial = len(df)
-        print(f"📊 Total de registros carregados: {total_inicial}")
-        
-        # Atualizar interface
-        status_label.config(text="🔍 Analisando duplicatas...")
-        progresso_var.set(30)
-        
-        # Verificar se arquivo tem dados
-        if total_inicial == 0:
-            raise ValueError("❌ Arquivo está vazio")
-        
-        # Filtrar duplicatas
         start_time = time.time()
-        df_duplicados = filtrar_duplicatas_cpf_data(df)
+        if deve_particionar(caminho_arquivo):
+            # Planilha maior que performance.memory_limit_mb: resolvida em partições no disco
+            def ao_progresso(mensagem):
+                status_label.config(text=mensagem)
+            df_duplicados, total_inicial = filtrar_duplicatas_particionado(caminho_arquivo, ao_progresso=ao_progresso)
+            
+            # Verificar se arquivo tem dados
+            if total_inicial == 0:
+                raise ValueError("❌ Arquivo está vazio")
+        else:
+            # Carregar arquivo
+            print(f"📂 Carregando arquivo: {caminho_arquivo}")
+            df = ler_xlsx(caminho_arquivo)
+            
+            total_inicial = len(df)
+            print(f"📊 Total de registros carregados: {total_inicial}")
+            
+            # Atualizar interface
+            status_label.config(text="🔍 Analisando duplicatas...")
+            progresso_var.set(30)
+            
+            # Verificar se arquivo tem dados
+            if total_inicial == 0:
+                raise ValueError("❌ Arquivo está vazio")
+            
+            # Filtrar duplicatas
+            df_duplicados = filtrar_duplicatas_cpf_data(df)
+            del df
         
         linhas_processadas = len(df_duplicados)
         
@@ -347,36 +448,14 @@ def processar_filtro_duplicatas(caminho_arquivo, caminho_salvar, progresso_var,
         
         # Contar registros salvos (todos são corretos com a nova lógica)
         registros_corretos_salvos = linhas_processadas
-        duplicatas_resolvidas = len(df_duplicados.groupby(['cpf', 'data_vencimento', 'numero_prestacao']))
         
         # Atualizar progresso
         progresso_var.set(90)
         
-        # Salvar relatório de duplicatas
-        if log_duplicatas:
-            relatorio_file = caminho_salvar.replace('.xlsx', '_relatorio_duplicatas.txt')
-            with open(relatorio_file, "w", encoding="utf-8") as f:
-                f.write(f"=== RELATÓRIO DE RESOLUÇÃO DE DUPLICATAS ===\n")
-                f.write(f"Data/Hora: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write(f"Arquivo original: {os.path.basename(caminho_arquivo)}\n")
-                f.write(f"Arquivo de resultado: {os.path.basename(caminho_salvar)}\n")
-                f.write(f"Total de registros originais: {total_inicial}\n")
-                f.write(f"Grupos de duplicatas encontrados: {duplicatas_resolvidas}\n")
-                f.write(f"Registros corretos salvos: {registros_corretos_salvos}\n")
-                f.write(f"Taxa de duplicação: {(duplicatas_resolvidas/total_inicial*100) if total_inicial > 0 else 0:.1f}%\n")
-                f.write("=" * 60 + "\n\n")
-                f.write("REGRAS APLICADAS:\n")
-                f.write("1. Se tiver data_pagamento: salva linha sem data_pagamento\n")
-                f.write("2. Se ambos têm data_pagamento: prioriza cod_acordo=0\n")
-                f.write("3. Se ambos têm data_pagamento e cod_acordo: menor cod_prestacao\n")
-                f.write("4. Se data_pagamento null: prioriza cod_acordo=0\n")
-                f.write("5. Se data_pagamento null e ambos têm cod_acordo: menor cod_prestacao\n")
-                f.write("=" * 60 + "\n\n")
-                f.write("GRUPOS PROCESSADOS:\n")
-                f.write("-" * 30 + "\n")
-                for linha in log_duplicatas:
-                    f.write(linha + "\n")
-            print(f"📝 Relatório de duplicatas salvo: {relatorio_file}")
+        # Salvar relatório de duplicatas (o mesmo da interface e da linha de comando)
+        relatorio_file, duplicatas_resolvidas = gravar_relatorio_duplicatas(
+            df_duplicados, caminho_arquivo, caminho_salvar, total_inicial)
+        print(f"📝 Relatório de duplicatas salvo: {relatorio_file}")
         
         # Finalizar
         elapsed_time = time.time() - start_time
@@ -412,6 +491,8 @@ def processar_filtro_duplicatas(caminho_arquivo, caminho_salvar, progresso_var,
 
 def executar_filtro_duplicatas(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_parar, botao_cancelar, botao_arquivo):
     """Executa o processamento em thread separada"""
+    import tkinter as tk
+    from tkinter import messagebox
     try:
         # Resetar flag de parada
         parar_flag.clear()
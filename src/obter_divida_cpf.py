@@ -1,15 +1,30 @@
 import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-import tkinter as tk
-from tkinter import filedialog, ttk, messagebox
 import threading
 import time
 import re
 import unicodedata
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Permite importar core/ também ao executar este arquivo diretamente
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from core.http_session import criar_sessao
+from core.scheduler import EscalonadorJanela
+from core.concurrency import ControladorAIMD
+from core.rate_limiter import registrar_endpoint
+from core.response_cache import CACHE_DIVIDA, obter_cache, normalizar_cpf
+from core.easycollector_parser import extrair_texto_string
+from core.cpu_executor import obter_estagio_cpu
+from core.data_validator import limpar_cpf_series
+from core.indice_datas import indexar_divida_utf8, normalizar_data, normalizar_datas_series
+from core.professional_logger import obter_rastreador
+from core.metricas import metricas
+from core.checkpoint import abrir_diario
+from core.config_manager import carregar_config_projeto
+from core.xlsx_reader import ler_xlsx
+from core.xlsx_writer import gravar_dataframe
 
 # Carrega as variáveis de ambiente do arquivo .env
 load_dotenv()
@@ -22,16 +37,24 @@ URL_DIVIDA = os.getenv("URL_DIVIDA", "http://54.83.29.48/easycollectorws/easycol
 if not all([LOGIN_FIXO, SENHA_FIXO]):
     raise ValueError("❌ Erro: Variáveis de ambiente LOGIN e SENHA não encontradas. Verifique o arquivo .env")
 
-# Contador para debug - analisa apenas os primeiros 5 CPFs em detalhes
-debug_counter = 0
-MAX_DEBUG_LOGS = 5
+# Orçamento de requisições do endpoint (performance.rate_limits.URL_DIVIDA no config.json)
+registrar_endpoint("URL_DIVIDA", URL_DIVIDA)
+
+# Rastro por linha (logging.level / logging.trace_sample_rows): debug detalhado só nas primeiras linhas e CPFs
+rastro = obter_rastreador("obter_divida")
 
 parar_evento = threading.Event()
 cancelar_evento = threading.Event()
 
-# Sessão HTTP reutilizável para melhor performance
-session = requests.Session()
-session.headers.update({'Connection': 'keep-alive'})
+# Concorrência inicial; o ControladorAIMD ajusta a partir daqui conforme latência e erros
+CONCORRENCIA_INICIAL = 15
+
+# Linhas registradas no diário com estes status são consultadas de novo ao retomar
+STATUS_REPETIR = ("Erro",)
+
+# Sessão HTTP reutilizável para melhor performance (sem retry automático, como antes;
+# o adaptador observado alimenta o controle de concorrência)
+session = criar_sessao(user_agent="Python4Work-Obter-Divida/1.0", pool_maxsize=50, retries=0)
 
 def remover_acentos(texto):
     """
@@ -45,191 +68,102 @@ def limpar_cpf(cpf_raw):
     cpf_limpo = re.sub(r'\D', '', cpf_raw)
     return cpf_limpo.zfill(11) if cpf_limpo else ""
 
-def consultar_easycollector(cpf, login, senha, data_pagamento_alvo=None):
-    global debug_counter
-    
+def baixar_resposta_divida(cpf, login, senha, chamada=None):
+    """
+    Texto bruto da resposta de ObterDividaAtivaPorCPF, do cache persistente ou da API.
+    chamada: core.metricas.Chamada que recebe status, bytes e tempo de rede
+    """
+    # Cache persistente compartilhado com consulta_boleto_mensal (performance.enable_caching)
+    cache = obter_cache(CACHE_DIVIDA)
+    chave_cache = normalizar_cpf(cpf)
+    response_text = cache.obter(chave_cache)
+    if response_text is not None:
+        if chamada is not None:
+            chamada.do_cache()
+        return response_text, "cache"
+
     payload = {
         "logonUsuario": login,
         "senhaUsuario": senha,
         "cpfCnpj": cpf
     }
-    try:
-        # Reduzido timeout de 10s para 5s para melhor performance
-        response = session.post(URL_DIVIDA, data=payload, timeout=5)
-        response.raise_for_status()
-        
-        # Debug detalhado para os primeiros CPFs
-        if debug_counter < MAX_DEBUG_LOGS:
-            print(f"\n[DEBUG #{debug_counter+1}] ===== ANÁLISE DETALHADA CPF: {cpf} =====")
-            print(f"[DEBUG #{debug_counter+1}] Response Status: {response.status_code}")
-            print(f"[DEBUG #{debug_counter+1}] Data pagamento alvo: {data_pagamento_alvo}")
-            print(f"[DEBUG #{debug_counter+1}] Response Content (primeiros 1000 chars):\n{response.text[:1000]}...")
-            debug_counter += 1
-        
-        # Parsing usando a estrutura XML REAL da API
-        response_text = response.text
-        
-        # Decodificar entities HTML
-        decoded_xml = response_text.replace("&lt;", "<").replace("&gt;", ">")
-        
-        if debug_counter <= MAX_DEBUG_LOGS:
-            print(f"[DEBUG] CPF {cpf}: XML decodificado (primeiros 1500 chars):\n{decoded_xml[:1500]}...")
-        
-        # Parse do XML decodificado
-        soup_decoded = BeautifulSoup(decoded_xml, "xml")
-        
-        # Buscar blocos DividaAtiva dentro da estrutura real
-        divida_ativa_blocks = soup_decoded.find_all("DividaAtiva")
-        
-        if debug_counter <= MAX_DEBUG_LOGS:
-            print(f"[DEBUG] CPF {cpf}: {len(divida_ativa_blocks)} blocos DividaAtiva encontrados no XML decodificado")
-        
-        # Buscar também IdCliente na raiz (pode estar em ClienteDivida)
-        cliente_divida_blocks = soup_decoded.find_all("ClienteDivida")
-        id_cliente_raiz = 0
-        
-        if cliente_divida_blocks:
-            for cliente_block in cliente_divida_blocks:
-                id_cliente_elem = cliente_block.find("IdCliente")
-                if id_cliente_elem and id_cliente_elem.text and id_cliente_elem.text.strip().isdigit():
-                    id_cliente_raiz = int(id_cliente_elem.text.strip())
-                    if debug_counter <= MAX_DEBUG_LOGS:
-                        print(f"[DEBUG] CPF {cpf}: IdCliente encontrado na raiz ClienteDivida: {id_cliente_raiz}")
-                    break
-        
-        
-        # Coletar dados com correspondência por data de vencimento
-        id_cliente_final = id_cliente_raiz  # Começar com IdCliente da raiz
-        id_acordo_final = 0
-        data_vencs = []
-        
-        # Processar blocos DividaAtiva com correspondência por data
-        for i, bloco in enumerate(divida_ativa_blocks):
-            # Extrair DataPagamento do bloco (não DataVencimento)
-            data_pag_elem = bloco.find("DataPagamento")
-            if data_pag_elem and data_pag_elem.text:
-                data_pag_bloco = data_pag_elem.text.strip()
-                data_vencs.append(data_pag_bloco)
-                
-                # Extrair apenas a data (formato: 2025-08-31)
-                data_bloco_limpa = data_pag_bloco[:10] if len(data_pag_bloco) >= 10 else data_pag_bloco
-                
-                if debug_counter <= MAX_DEBUG_LOGS:
-                    print(f"[DEBUG] CPF {cpf} Bloco DividaAtiva {i+1}: DataPagamento={data_bloco_limpa}")
-                
-                # Verificar correspondência por data
-                bloco_correspondente = False
-                if data_pagamento_alvo:
-                    # Normalizar data alvo (remover tempo se houver)
-                    data_alvo_limpa = str(data_pagamento_alvo)[:10] if len(str(data_pagamento_alvo)) >= 10 else str(data_pagamento_alvo)
-                    
-                    if data_bloco_limpa == data_alvo_limpa:
-                        bloco_correspondente = True
-                        if debug_counter <= MAX_DEBUG_LOGS:
-                            print(f"[DEBUG] CPF {cpf} Bloco {i+1}: ✅ CORRESPONDÊNCIA ENCONTRADA! {data_bloco_limpa} == {data_alvo_limpa}")
-                    else:
-                        if debug_counter <= MAX_DEBUG_LOGS:
-                            print(f"[DEBUG] CPF {cpf} Bloco {i+1}: ❌ Sem correspondência {data_bloco_limpa} != {data_alvo_limpa}")
-                else:
-                    # Se não há data alvo, processar o primeiro bloco válido
-                    bloco_correspondente = True
-                    if debug_counter <= MAX_DEBUG_LOGS:
-                        print(f"[DEBUG] CPF {cpf} Bloco {i+1}: 📅 Sem data alvo, processando bloco")
-                
-                # Se é o bloco correspondente, extrair IdAcordo
-                if bloco_correspondente:
-                    # Procurar IdAcordo no bloco atual
-                    id_acordo_elem = bloco.find("IdAcordo")
-                    if id_acordo_elem and id_acordo_elem.text and id_acordo_elem.text.strip().isdigit():
-                        val = int(id_acordo_elem.text.strip())
-                        if val != 0:
-                            id_acordo_final = val
-                            if debug_counter <= MAX_DEBUG_LOGS:
-                                print(f"[DEBUG] CPF {cpf} Bloco correspondente {i+1}: ✅ IdAcordo={val}")
-                    
-                    # Se não encontrou IdAcordo no bloco, procurar em campos alternativos
-                    if id_acordo_final == 0:
-                        # Verificar se existe algum identificador que possa ser o acordo
-                        identificador_elem = bloco.find("Identificador")
-                        if identificador_elem and identificador_elem.text and identificador_elem.text.strip().isdigit():
-                            val = int(identificador_elem.text.strip())
-                            if val != 0:
-                                id_acordo_final = val
-                                if debug_counter <= MAX_DEBUG_LOGS:
-                                    print(f"[DEBUG] CPF {cpf} Bloco correspondente {i+1}: ✅ IdAcordo (via Identificador)={val}")
-                    
-                    # Se encontrou correspondência por data e tem dados, parar aqui
-                    if data_pagamento_alvo and (id_cliente_final != 0 or id_acordo_final != 0):
-                        if debug_counter <= MAX_DEBUG_LOGS:
-                            print(f"[DEBUG] CPF {cpf}: 🎯 Dados encontrados no bloco correspondente, finalizando busca")
-                        break
-        
-        # Se não encontrou dados com correspondência por data, usar busca global
-        if id_cliente_final == 0 and id_acordo_final == 0:
-            if debug_counter <= MAX_DEBUG_LOGS:
-                print(f"[DEBUG] CPF {cpf}: Fazendo busca global no XML decodificado")
-            
-            # Buscar IdCliente global
-            if id_cliente_final == 0:
-                id_cliente_elements = soup_decoded.find_all("IdCliente")
-                for elem in id_cliente_elements:
-                    if elem.text and elem.text.strip().isdigit():
-                        val = int(elem.text.strip())
-                        if val != 0:
-                            id_cliente_final = val
-                            if debug_counter <= MAX_DEBUG_LOGS:
-                                print(f"[DEBUG] CPF {cpf} Global: ✅ IdCliente={val}")
-                            break
-            
-            # Buscar IdAcordo global
-            id_acordo_elements = soup_decoded.find_all("IdAcordo")
-            for elem in id_acordo_elements:
-                if elem.text and elem.text.strip().isdigit():
-                    val = int(elem.text.strip())
-                    if val != 0:
-                        id_acordo_final = val
-                        if debug_counter <= MAX_DEBUG_LOGS:
-                            print(f"[DEBUG] CPF {cpf} Global: ✅ IdAcordo={val}")
-                        break
-            
-            # Se ainda não encontrou IdAcordo, tentar buscar via Identificador
-            if id_acordo_final == 0:
-                identificador_elements = soup_decoded.find_all("Identificador")
-                for elem in identificador_elements:
-                    if elem.text and elem.text.strip().isdigit():
-                        val = int(elem.text.strip())
-                        if val != 0:
-                            id_acordo_final = val
-                            if debug_counter <= MAX_DEBUG_LOGS:
-                                print(f"[DEBUG] CPF {cpf} Global: ✅ IdAcordo (via Identificador)={val}")
-                            break
-        
-        # Debug detalhado para primeiros CPFs
-        if debug_counter <= MAX_DEBUG_LOGS:
-            print(f"[RESULTADO] CPF {cpf}: IdCliente={id_cliente_final}")
-            print(f"[RESULTADO] CPF {cpf}: IdAcordo={id_acordo_final}")
-            print(f"[RESULTADO] CPF {cpf}: {len(data_vencs)} datas encontradas")
-            if len(data_vencs) > 0:
-                print(f"[RESULTADO] CPF {cpf}: Primeira data: {data_vencs[0]}")
-                if data_pagamento_alvo:
-                    print(f"[RESULTADO] CPF {cpf}: Data alvo: {data_pagamento_alvo}")
-        
-        return id_cliente_final, id_acordo_final, data_vencs
+    # Reduzido timeout de 10s para 5s para melhor performance
+    if chamada is not None:
+        chamada.iniciar_rede()
+    response = session.post(URL_DIVIDA, data=payload, timeout=5)
+    if chamada is not None:
+        chamada.fim_rede(response.status_code, len(response.content))
+    response.raise_for_status()
+    response_text = response.text
+    cache.guardar(chave_cache, response_text)
+    return response_text, f"HTTP {response.status_code}"
+
+def analisar_resposta_divida(response_text, cpf="", depurar=False):
+    """
+    Faz o parse da resposta UMA vez (core.easycollector_parser, passada única com lxml)
+    e a compila em um core.indice_datas.IndiceDatasDivida: (IdCliente, IdAcordo) de cada
+    DataPagamento já resolvidos, com a busca global de fallback pré-calculada.
+    depurar: grava no rastro o XML interno e o resumo do índice (CPFs amostrados)
+    """
+    if depurar:
+        # Lê o envelope à parte só para mostrar o XML interno
+        rastro.debug("[DEBUG] CPF %s: XML decodificado (primeiros 1500 chars):\n%s...",
+                     cpf, (extrair_texto_string(response_text) or '')[:1500])
+
+    # Parse e índice em um processo do estágio de CPU (performance.cpu_workers): a thread só espera o resultado
+    indice = obter_estagio_cpu().analisar(indexar_divida_utf8, response_text.encode("utf-8")).result()
+
+    if depurar:
+        rastro.debug("[DEBUG] CPF %s: %d blocos DividaAtiva, IdCliente na raiz: %s, %d datas de pagamento",
+                     cpf, indice.total_blocos, indice.id_cliente_raiz, len(indice.por_data))
+
+    return indice
 
+def corresponder_data_pagamento(indice, data_pagamento_alvo=None, cpf=""):
+    """
+    Aplica a correspondência por data de pagamento sobre uma resposta já indexada.
+    Retorna (id_cliente, id_acordo, datas) — as regras estão em IndiceDatasDivida.
+
+    data_pagamento_alvo: data já normalizada ('AAAA-MM-DD', normalizar_datas_series) ou None
+    """
+    return indice.corresponder(data_pagamento_alvo)
+
+def consultar_divida_cpf(cpf, login, senha):
+    """Baixa, analisa e indexa a dívida de um CPF (uma requisição, um parse), medindo rede e parse"""
+    with metricas.chamada(URL_DIVIDA) as chamada:
+        response_text, origem = baixar_resposta_divida(cpf, login, senha, chamada)
+
+        # Debug detalhado só para os primeiros CPFs consultados (e nada é montado com o debug desligado)
+        depurar = rastro.amostrar()
+        if depurar:
+            rastro.debug("[DEBUG] ===== ANÁLISE DETALHADA CPF: %s ===== Response Status: %s\n"
+                         "Response Content (primeiros 1000 chars):\n%s...", cpf, origem, response_text[:1000])
+
+        indice = analisar_resposta_divida(response_text, cpf, depurar)
+        chamada.fim_parse()
+    return indice
+
+def consultar_easycollector(cpf, login, senha, data_pagamento_alvo=None):
+    try:
+        indice = consultar_divida_cpf(cpf, login, senha)
+        return corresponder_data_pagamento(indice, normalizar_data(data_pagamento_alvo), cpf)
     except Exception as e:
-        print(f"❌ [ERRO] CPF {cpf}: {e}")
+        rastro.warning("❌ [ERRO] CPF %s: %s", cpf, e)
         return 0, 0, []
 
-def processar_linha_cpf(row_data):
-    """Processa uma única linha de CPF com logging melhorado e correspondência por data"""
-    i, row = row_data
-    
+def preparar_linha_cpf(i, row, cpf=None):
+    """
+    Lê CPF, códigos e data de pagamento da linha.
+    Retorna (cpf, data_pagamento, resultado) — resultado já pronto quando a linha
+    não precisa de consulta (já possui ambos os códigos ou CPF inválido), senão None.
+    cpf: CPF já limpo (limpar_cpf_series sobre a coluna inteira); None = limpar aqui.
+    """
     cod_acordo = row.get("cod_acordo", "0")
     cod_cliente = row.get("cod_cliente", "0")
 
-    # Debug: Log linha sendo processada
     cpf_raw = row.get("cpf", "")
-    cpf = limpar_cpf(cpf_raw)
+    if cpf is None:
+        cpf = limpar_cpf(cpf_raw)
     
     # Buscar data_pagamento com múltiplas tentativas (compatibilidade)
     data_pagamento = (
@@ -240,32 +174,33 @@ def processar_linha_cpf(row_data):
         ""
     )
     
-    print(f"[Linha {i+1}] ===== PROCESSANDO CPF: {cpf} =====")
-    print(f"[Linha {i+1}] CPF original: {cpf_raw} → CPF limpo: {cpf}")
-    print(f"[Linha {i+1}] Valores atuais - cod_cliente: {cod_cliente} | cod_acordo: {cod_acordo}")
-    print(f"[Linha {i+1}] Data pagamento encontrada: '{data_pagamento}'")
-    
-    # Debug das colunas disponíveis
-    if debug_counter < MAX_DEBUG_LOGS:
-        print(f"[DEBUG {i+1}] Colunas disponíveis: {list(row.keys())}")
-        print(f"[DEBUG {i+1}] Valores da linha: {dict(row)}")
+    # Debug da linha e das colunas disponíveis (só nas linhas amostradas)
+    if rastro.amostrado(i):
+        rastro.debug("[Linha %d] ===== CPF original: %s → CPF limpo: %s | cod_cliente: %s | cod_acordo: %s | "
+                     "data pagamento: '%s'", i + 1, cpf_raw, cpf, cod_cliente, cod_acordo, data_pagamento)
+        rastro.debug("[Linha %d] Colunas disponíveis: %s | Valores da linha: %s", i + 1, list(row.keys()), dict(row))
 
     if cod_acordo != "0" and cod_cliente != "0":
         # Já possui AMBOS os códigos → marcar como Excluir
-        print(f"[Linha {i+1}] ✅ CPF {cpf}: Já possui ambos os códigos, marcando para exclusão")
-        return i, "Excluir", "Em Duplicidade", cod_cliente, cod_acordo
+        rastro.info("[Linha %d] ✅ CPF %s: Já possui ambos os códigos, marcando para exclusão", i + 1, cpf)
+        return cpf, data_pagamento, (i, "Excluir", "Em Duplicidade", cod_cliente, cod_acordo)
 
     # Para registros com cod_acordo e cod_cliente igual a 0, tenta atualizar
     if not cpf or cpf == "00000000000":
-        print(f"[Linha {i+1}] ❌ CPF inválido: {cpf_raw}")
-        return i, "", "", "0", "0"
+        rastro.info("[Linha %d] ❌ CPF inválido: %s", i + 1, cpf_raw)
+        return cpf, data_pagamento, (i, "", "", "0", "0")
 
-    print(f"[Linha {i+1}] 🔍 Consultando API para CPF: {cpf} com data: {data_pagamento}")
-    
-    # Fazer consulta na API com correspondência por data de pagamento
-    id_cliente, id_acordo, datas = consultar_easycollector(cpf, LOGIN_FIXO, SENHA_FIXO, data_pagamento)
+    return cpf, data_pagamento, None
 
-    print(f"[Linha {i+1}] 📡 API retornou - IdCliente: {id_cliente} | IdAcordo: {id_acordo} | Datas: {len(datas)}")
+def finalizar_linha_cpf(i, row, cpf, id_cliente, id_acordo, datas):
+    """Aplica o resultado da API à linha e decide status/observação"""
+    cod_acordo = row.get("cod_acordo", "0")
+    cod_cliente = row.get("cod_cliente", "0")
+
+    depurar = rastro.amostrado(i)
+    if depurar:
+        rastro.debug("[Linha %d] 📡 API retornou - IdCliente: %s | IdAcordo: %s | Datas: %d",
+                     i + 1, id_cliente, id_acordo, len(datas))
 
     alterou = False
     new_cod_cliente = cod_cliente
@@ -275,12 +210,10 @@ def processar_linha_cpf(row_data):
     if id_cliente != 0:
         new_cod_cliente = str(id_cliente)
         alterou = True
-        print(f"[Linha {i+1}] ✅ IdCliente atualizado: {cod_cliente} → {new_cod_cliente}")
 
     if id_acordo != 0:
         new_cod_acordo = str(id_acordo)
         alterou = True
-        print(f"[Linha {i+1}] ✅ IdAcordo atualizado: {cod_acordo} → {new_cod_acordo}")
 
     # Determinar status baseado nos resultados
     if alterou and (new_cod_cliente != "0" or new_cod_acordo != "0"):
@@ -296,52 +229,147 @@ def processar_linha_cpf(row_data):
             observacao = f"Atualizado - {', '.join(campos_atualizados)}"
         else:
             observacao = "Dados confirmados"
-        
-        print(f"[Linha {i+1}] 🎯 STATUS: Update (dados encontrados e atualizados)")
     elif id_cliente == 0 and id_acordo == 0:
         # Só marca como "Não Encontrado" se a API não retornou NENHUM dado
         status = "Investigar"
         observacao = "Não Encontrado na API"
-        print(f"[Linha {i+1}] ⚠️  STATUS: Investigar (nenhum dado encontrado na API)")
     else:
         status = ""
         observacao = ""
-        print(f"[Linha {i+1}] ❓ STATUS: vazio (situação indefinida)")
-
-    print(f"[Linha {i+1}] 📋 RESULTADO FINAL:")
-    print(f"[Linha {i+1}]   • CPF: {cpf}")
-    print(f"[Linha {i+1}]   • cod_cliente: {cod_cliente} → {new_cod_cliente}")
-    print(f"[Linha {i+1}]   • cod_acordo: {cod_acordo} → {new_cod_acordo}")
-    print(f"[Linha {i+1}]   • Status: {status}")
-    print(f"[Linha {i+1}]   • Observação: {observacao}")
-    print(f"[Linha {i+1}] " + "="*50)
+
+    if depurar:
+        rastro.debug("[Linha %d] 📋 RESULTADO FINAL: CPF %s | cod_cliente: %s → %s | cod_acordo: %s → %s",
+                     i + 1, cpf, cod_cliente, new_cod_cliente, cod_acordo, new_cod_acordo)
+    rastro.info("[Linha %d] CPF %s: status '%s' | %s", i + 1, cpf, status, observacao)
     
     return i, status, observacao, new_cod_cliente, new_cod_acordo
 
+def processar_linha_cpf(row_data):
+    """Processa uma única linha de CPF com logging melhorado e correspondência por data"""
+    i, row = row_data
+    cpf, data_pagamento, resultado = preparar_linha_cpf(i, row)
+    if resultado is not None:
+        return resultado
+
+    if rastro.amostrado(i):
+        rastro.debug("[Linha %d] 🔍 Consultando API para CPF: %s com data: %s", i + 1, cpf, data_pagamento)
+    
+    # Fazer consulta na API com correspondência por data de pagamento
+    id_cliente, id_acordo, datas = consultar_easycollector(cpf, LOGIN_FIXO, SENHA_FIXO, data_pagamento)
+    return finalizar_linha_cpf(i, row, cpf, id_cliente, id_acordo, datas)
+
+def processar_grupo_cpf(grupo):
+    """
+    Processa todas as linhas de um mesmo CPF com UMA consulta e UM parse.
+
+    grupo: (cpf, [(i, row, data_pagamento), ...]) com as datas já normalizadas — a
+    correspondência de cada linha é uma consulta ao índice da resposta.
+    """
+    cpf, linhas = grupo
+    rastro.info("[CPF %s] 🔍 Consultando API uma vez para %d linha(s)", cpf, len(linhas))
+    try:
+        indice = consultar_divida_cpf(cpf, LOGIN_FIXO, SENHA_FIXO)
+    except Exception as e:
+        rastro.warning("❌ [ERRO] CPF %s: %s", cpf, e)
+        indice = None
+
+    resultados = []
+    for i, row, data_pagamento in linhas:
+        if indice is None:
+            id_cliente, id_acordo, datas = 0, 0, []
+        else:
+            id_cliente, id_acordo, datas = corresponder_data_pagamento(indice, data_pagamento, cpf)
+        resultados.append(finalizar_linha_cpf(i, row, cpf, id_cliente, id_acordo, datas))
+    return resultados
+
+def agrupar_linhas_por_cpf(linhas):
+    """
+    Separa as linhas que não precisam de consulta e agrupa as demais por CPF limpo.
+    Retorna (resultados_imediatos, grupos) com os grupos na ordem da primeira ocorrência
+    e as datas de pagamento já normalizadas ('AAAA-MM-DD').
+    """
+    linhas = list(linhas)
+    # CPFs limpos de uma vez, em coluna, em vez de um re.sub por linha
+    cpfs = limpar_cpf_series(pd.Series([row.get("cpf", "") for _, row in linhas], dtype=object))
+    imediatos = []
+    consultar = []
+    for (i, row), cpf in zip(linhas, cpfs):
+        cpf, data_pagamento, resultado = preparar_linha_cpf(i, row, cpf)
+        if resultado is not None:
+            imediatos.append(resultado)
+        else:
+            consultar.append((cpf, i, row, data_pagamento))
+
+    # Datas (serial do Excel, dd/mm/aaaa, datetime) normalizadas uma vez para a coluna inteira
+    datas = normalizar_datas_series(pd.Series([data for _, _, _, data in consultar], dtype=object))
+    grupos = {}
+    for (cpf, i, row, _), data_pagamento in zip(consultar, datas):
+        grupos.setdefault(cpf, []).append((i, row, data_pagamento))
+    return imediatos, list(grupos.items())
+
+def processar_linhas_cpf(linhas, max_workers=None, parar=None, cancelar=None, on_progresso=None):
+    """
+    Processa as linhas em janela deslizante, gerando
+    (i, status, observacao, cod_cliente, cod_acordo) conforme cada CPF termina.
+
+    CPFs repetidos no arquivo são consultados e analisados uma única vez: as linhas
+    são agrupadas por CPF limpo e cada grupo é uma tarefa da janela.
+
+    linhas: iterável de (i, row) — é lido por inteiro antes de começar, para agrupar
+    max_workers: int fixo ou ControladorAIMD (None = controlador adaptativo padrão)
+    parar: para de enviar novos CPFs e entrega os que já estão em voo
+    cancelar: encerra imediatamente
+    on_progresso: callback(concluidos, total, linhas_por_seg, eta_segundos), contado em linhas;
+                  o total só é conhecido após o agrupamento
+    """
+    if max_workers is None:
+        max_workers = criar_controlador()
+
+    imediatos, grupos = agrupar_linhas_por_cpf(linhas)
+    total_linhas = len(imediatos) + sum(len(linhas_grupo) for _, linhas_grupo in grupos)
+    rastro.info("%d linhas, %d CPFs distintos a consultar (%d linhas sem consulta)",
+                total_linhas, len(grupos), len(imediatos))
+
+    concluidas = 0
+    inicio = time.time()
+
+    def progresso_em_linhas(_grupos_concluidos, _total_grupos, _vazao, _eta):
+        # O escalonador conta grupos; a interface acompanha linhas
+        if on_progresso is None:
+            return
+        decorrido = time.time() - inicio
+        vazao = concluidas / decorrido if decorrido > 0 else 0.0
+        eta = (total_linhas - concluidas) / vazao if vazao > 0 else None
+        on_progresso(concluidas, total_linhas, vazao, eta)
+
+    for resultado in imediatos:
+        concluidas += 1
+        yield resultado
+
+    escalonador = EscalonadorJanela(max_workers, parar, cancelar, progresso_em_linhas)
+
+    def on_erro(grupo, e):
+        cpf, linhas_grupo = grupo
+        rastro.error("Erro no processamento do CPF %s: %s", cpf, e)
+        return [(i, "Erro", f"Erro: {str(e)}", "0", "0") for i, _, _ in linhas_grupo]
+
+    for _, resultados in escalonador.executar(grupos, processar_grupo_cpf, on_erro=on_erro):
+        for resultado in resultados:
+            concluidas += 1
+            yield resultado
+
+def criar_controlador(inicial=CONCORRENCIA_INICIAL):
+    """Controlador adaptativo restrito ao endpoint ObterDividaAtivaPorCPF"""
+    return ControladorAIMD(inicial=inicial, endpoints=[URL_DIVIDA])
+
 def processar_batch_cpf(batch_rows):
     """Processa um lote de CPFs em paralelo"""
-    results = []
-    with ThreadPoolExecutor(max_workers=15) as executor:
-        future_to_row = {
-            executor.submit(processar_linha_cpf, row_data): row_data 
-            for row_data in batch_rows
-        }
-        
-        for future in as_completed(future_to_row):
-            row_data = future_to_row[future]
-            try:
-                result = future.result()
-                results.append(result)
-            except Exception as e:
-                i, row = row_data
-                print(f"Erro no processamento da linha {i}: {e}")
-                results.append((i, "Erro", f"Erro: {str(e)}", "0", "0"))
-    
-    return results
+    return list(processar_linhas_cpf(batch_rows, CONCORRENCIA_INICIAL))
 
 def processar_xlsx(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label):
+    from tkinter import messagebox
     try:
-        df = pd.read_excel(caminho_arquivo, engine='openpyxl', dtype=str)
+        df = ler_xlsx(caminho_arquivo, como_texto=True)
         # Limpar nomes das colunas: remover espaços, deixar minúsculas e retirar acentos
         df.columns = df.columns.str.strip().str.lower().map(remover_acentos)
         print(f"[INFO] Colunas detectadas no XLSX: {df.columns.tolist()}")
@@ -356,62 +384,71 @@ def processar_xlsx(caminho_arquivo, caminho_salvar, progresso_var, progresso_lab
     df.fillna("0", inplace=True)
 
     total = len(df)
-    tempo_inicio = time.time()
-    batch_size = 25  # Processa 25 linhas por vez
     linhas_processadas = 0
+    controlador = criar_controlador()
 
-    # Processar em lotes para melhor performance
-    for batch_start in range(0, total, batch_size):
-        if cancelar_evento.is_set():
-            status_label.config(text="Processo cancelado. Nenhuma alteração salva.")
-            print("[INFO] Processo cancelado pelo usuário. Nenhuma alteração salva.")
-            return
-        if parar_evento.is_set():
-            status_label.config(text=f"Processo parado. Salvando progresso até linha {batch_start}...")
-            print(f"[INFO] Processo parado pelo usuário. Salvando progresso até linha {batch_start}...")
-            df.iloc[:batch_start].to_excel(caminho_salvar, index=False, engine='openpyxl')
-            progresso_var.set(100)
-            progresso_label.config(text="100%")
-            messagebox.showinfo("Interrompido", f"Progresso salvo até a linha {batch_start} em:\n{caminho_salvar}")
-            return
+    # Diário de checkpoint: cada linha concluída é gravada na hora; reabrir a mesma entrada retoma
+    diario = abrir_diario("obter_divida", caminho_arquivo, carregar_config_projeto())
+    pendentes = diario.pendentes(total, STATUS_REPETIR, "status")
+    if diario.retomado:
+        print(f"[INFO] ♻️ Retomando {diario.caminho}: {total - len(pendentes)} linhas já concluídas, {len(pendentes)} pendentes")
 
-        batch_end = min(batch_start + batch_size, total)
-        batch_rows = [(i, df.iloc[i]) for i in range(batch_start, batch_end)]
-        
-        # Processar lote em paralelo
-        batch_results = processar_batch_cpf(batch_rows)
-        
-        # Atualizar DataFrame com resultados
-        for i, status, observacao, cod_cliente, cod_acordo in batch_results:
+    def on_progresso(concluidos, total_linhas, req_por_seg, eta):
+        progresso = int((concluidos / total_linhas) * 100) if total_linhas else 0
+        progresso_var.set(progresso)
+        progresso_label.config(text=f"{progresso}%")
+        if concluidos > 0 and eta is not None:
+            minutos = int(eta // 60)
+            segundos = int(eta % 60)
+            status_label.config(text=f"Processando: {concluidos}/{total_linhas} - {req_por_seg:.1f} req/s - {controlador.limite} em voo - Tempo estimado restante: {minutos}m {segundos}s - {diario.resumo_custo()}")
+
+    # Janela deslizante: o controlador decide quantos CPFs ficam em voo
+    linhas = ((i, df.iloc[i]) for i in pendentes)
+    processadas = set()
+    try:
+        for i, status, observacao, cod_cliente, cod_acordo in processar_linhas_cpf(
+                linhas, controlador, parar_evento, cancelar_evento, on_progresso):
             df.at[i, "status"] = status
             df.at[i, "observacao"] = observacao
             df.at[i, "cod_cliente"] = cod_cliente
             df.at[i, "cod_acordo"] = cod_acordo
+            diario.registrar(i, status=status, observacao=observacao, cod_cliente=cod_cliente, cod_acordo=cod_acordo)
+            processadas.add(i)
             linhas_processadas += 1
+    finally:
+        diario.fechar()
 
-        # Atualizar progresso
-        progresso = int((linhas_processadas / total) * 100)
-        progresso_var.set(progresso)
-        progresso_label.config(text=f"{progresso}%")
+    if cancelar_evento.is_set():
+        status_label.config(text="Processo cancelado. Nenhuma alteração salva.")
+        mantido = f" (diário mantido em {diario.caminho})" if diario.caminho else ""
+        print(f"[INFO] Processo cancelado pelo usuário. Nenhuma alteração salva{mantido}.")
+        return
 
-        # Calcular tempo estimado
-        tempo_passado = time.time() - tempo_inicio
-        if linhas_processadas > 0:
-            tempo_estimado_restante = (tempo_passado / linhas_processadas) * (total - linhas_processadas)
-            minutos = int(tempo_estimado_restante // 60)
-            segundos = int(tempo_estimado_restante % 60)
-            status_label.config(text=f"Processando: {linhas_processadas}/{total} - Tempo estimado restante: {minutos}m {segundos}s")
-        
-        # Salvar progresso a cada 100 linhas processadas
-        if linhas_processadas % 100 == 0:
-            df.to_excel(caminho_salvar, index=False, engine='openpyxl')
+    # Linhas concluídas em execuções anteriores vêm do diário (vazio com app.auto_backup desligado)
+    diario.aplicar(df)
+
+    if parar_evento.is_set():
+        # Com o agrupamento por CPF as linhas concluídas não formam um prefixo: salvar exatamente as processadas
+        concluidas = sorted(processadas.union(diario.concluidos))
+        status_label.config(text=f"Processo parado. Salvando {len(concluidas)} linhas processadas...")
+        print(f"[INFO] Processo parado pelo usuário. Salvando {len(concluidas)} linhas processadas...")
+        with diario.salvando_xlsx():
+            gravar_dataframe(df.iloc[concluidas], caminho_salvar)
+        progresso_var.set(100)
+        progresso_label.config(text="100%")
+        status_label.config(text=f"Processo parado. {len(concluidas)} linhas salvas - {diario.resumo_custo()}")
+        messagebox.showinfo("Interrompido", f"Progresso salvo ({len(concluidas)} linhas) em:\n{caminho_salvar}\n\n"
+                                            f"Abra o mesmo arquivo de entrada para continuar de onde parou.")
+        return
 
     # Salvar arquivo final
-    df.to_excel(caminho_salvar, index=False, engine='openpyxl')
+    with diario.salvando_xlsx():
+        gravar_dataframe(df, caminho_salvar)
+    diario.descartar()
     progresso_var.set(100)
     progresso_label.config(text="100%")
-    status_label.config(text=f"Arquivo salvo: {caminho_salvar}")
-    print(f"[INFO] Processamento finalizado. Arquivo salvo em {caminho_salvar}")
+    status_label.config(text=f"Arquivo salvo: {caminho_salvar} - {diario.resumo_custo()}")
+    print(f"[INFO] Processamento finalizado. Arquivo salvo em {caminho_salvar} ({diario.resumo_custo()})")
     messagebox.showinfo("Finalizado", f"Processamento concluído.\nArquivo salvo como:\n{caminho_salvar}")
 
 def iniciar_processo(caminho_arquivo, caminho_salvar, progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo):
@@ -449,6 +486,7 @@ def parar_processo(status_label, botao_iniciar, botao_cancelar, botao_parar, bot
     botao_arquivo.config(state="normal")
 
 def escolher_arquivo(progresso_var, progresso_label, status_label, botao_iniciar, botao_cancelar, botao_parar, botao_arquivo):
+    from tkinter import filedialog
     caminho_arquivo = filedialog.askopenfilename(
         title="Selecione o arquivo XLSX",
         filetypes=[("Excel Files", "*.xlsx")]
@@ -478,6 +516,8 @@ def escolher_arquivo(progresso_var, progresso_label, status_label, botao_iniciar
 
 # --- Interface Gráfica ---
 def main():
+    import tkinter as tk
+    from tkinter import ttk, messagebox
     root = tk.Tk()
     root.title("Obter Divida por CPF - Etapa 1")
     root.geometry("600x200")
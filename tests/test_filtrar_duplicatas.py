@@ -0,0 +1,232 @@
+"""
+Regras do Resolver Duplicatas
+Casos fixos de cada regra e desempate, e paridade com a resolução por grupo anterior à vetorização
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.filtrar_duplicatas import CHAVE_DUPLICATAS, filtrar_duplicatas_cpf_data, gravar_relatorio_duplicatas
+
+
+def resolver(linhas, colunas=None):
+    """(ids escolhidos na ordem das chaves, regras aplicadas) para as linhas dadas"""
+    df = pd.DataFrame(linhas)
+    if colunas is not None:
+        df = df[['id'] + CHAVE_DUPLICATAS + ['cod_prestacao'] + colunas]
+    resultado = filtrar_duplicatas_cpf_data(df)
+    return list(resultado['id']), list(resultado['regra_aplicada'].astype(str))
+
+
+def linha(id, cpf='111', cod_prestacao=1, data_pagamento='', cod_acordo=0, **extras):
+    return dict(id=id, cpf=cpf, data_vencimento='2025-01-10', numero_prestacao=1,
+                cod_prestacao=cod_prestacao, data_pagamento=data_pagamento, cod_acordo=cod_acordo, **extras)
+
+
+# --- Casos fixos: (linhas, colunas opcionais presentes, id escolhido, regra aplicada) ---
+
+CASOS_REGRAS = {
+    'regra 1: mantém a linha sem pagamento': (
+        [linha('pago', cod_prestacao=1, data_pagamento='2025-01-05'), linha('aberto', cod_prestacao=2)],
+        ['data_pagamento', 'cod_acordo'], 'aberto', 'REGRA 1 (candidato único)'),
+    'regra 2: todos pagos, prioriza cod_acordo=0': (
+        [linha('acordo', cod_prestacao=1, data_pagamento='2025-01-05', cod_acordo=7),
+         linha('zerado', cod_prestacao=2, data_pagamento='2025-01-06', cod_acordo=0)],
+        ['data_pagamento', 'cod_acordo'], 'zerado', 'REGRA 2 (candidato único)'),
+    'regra 3: todos pagos com acordo, menor cod_prestacao': (
+        [linha('maior', cod_prestacao=20, data_pagamento='2025-01-05', cod_acordo=5),
+         linha('menor', cod_prestacao=10, data_pagamento='2025-01-06', cod_acordo=7)],
+        ['data_pagamento', 'cod_acordo'], 'menor', 'REGRA 3 (menor cod_prestacao)'),
+    'regra 4: nenhum pago, prioriza cod_acordo=0': (
+        [linha('acordo', cod_prestacao=1, cod_acordo=3), linha('zerado', cod_prestacao=2, cod_acordo='0')],
+        ['data_pagamento', 'cod_acordo'], 'zerado', 'REGRA 4 (candidato único)'),
+    'regra 5: nenhum pago com acordo, menor cod_prestacao': (
+        [linha('maior', cod_prestacao=9, cod_acordo=3), linha('menor', cod_prestacao=8, cod_acordo=4)],
+        ['data_pagamento', 'cod_acordo'], 'menor', 'REGRA 5 (menor cod_prestacao)'),
+    'regras 4/5 sem a coluna data_pagamento': (
+        [linha('acordo', cod_prestacao=1, cod_acordo=3), linha('zerado', cod_prestacao=2, cod_acordo=0)],
+        ['cod_acordo'], 'zerado', 'REGRA 4 (candidato único)'),
+    'sem a coluna cod_acordo: menor cod_prestacao': (
+        [linha('maior', cod_prestacao=5), linha('menor', cod_prestacao=4)],
+        ['data_pagamento'], 'menor', 'SEM COD_ACORDO (menor cod_prestacao)'),
+    'sem cod_acordo, regra 1 ainda vale': (
+        [linha('pago', cod_prestacao=1, data_pagamento='2025-01-05'), linha('aberto', cod_prestacao=2)],
+        ['data_pagamento'], 'aberto', 'REGRA 1 (candidato único)'),
+}
+
+CASOS_DESEMPATES = {
+    'menor cod_acordo com cod_prestacao empatado': (
+        [linha('sete', cod_prestacao=4, cod_acordo=7), linha('tres', cod_prestacao=4, cod_acordo=3)],
+        ['data_pagamento', 'cod_acordo'], 'tres', 'REGRA 5 (menor cod_acordo)'),
+    'primeiro registro com tudo empatado': (
+        [linha('primeiro', cod_prestacao=4, cod_acordo=3), linha('segundo', cod_prestacao=4, cod_acordo=3)],
+        ['data_pagamento', 'cod_acordo'], 'primeiro', 'REGRA 5 (primeiro registro)'),
+    'cod_acordo vazio conta como 999999 na regra 1': (
+        [linha('vazio', cod_prestacao=4, cod_acordo=np.nan), linha('cinco', cod_prestacao=4, cod_acordo=5),
+         linha('pago', cod_prestacao=1, data_pagamento='2025-01-05', cod_acordo=0)],
+        ['data_pagamento', 'cod_acordo'], 'cinco', 'REGRA 1 (menor cod_acordo)'),
+    'cod_acordo vazio conta como -1 nas regras 2-5': (
+        [linha('cinco', cod_prestacao=4, cod_acordo=5), linha('vazio', cod_prestacao=4, cod_acordo=np.nan)],
+        ['data_pagamento', 'cod_acordo'], 'vazio', 'REGRA 5 (menor cod_acordo)'),
+    'cod_acordo não numérico conta como vazio': (
+        [linha('cinco', cod_prestacao=4, cod_acordo=5), linha('texto', cod_prestacao=4, cod_acordo='abc')],
+        ['data_pagamento', 'cod_acordo'], 'texto', 'REGRA 5 (menor cod_acordo)'),
+}
+
+
+@pytest.mark.parametrize("linhas, colunas, escolhido, regra", CASOS_REGRAS.values(), ids=CASOS_REGRAS.keys())
+def test_regras(linhas, colunas, escolhido, regra):
+    assert resolver(linhas, colunas) == ([escolhido], [regra])
+
+
+@pytest.mark.parametrize("linhas, colunas, escolhido, regra", CASOS_DESEMPATES.values(), ids=CASOS_DESEMPATES.keys())
+def test_desempates(linhas, colunas, escolhido, regra):
+    assert resolver(linhas, colunas) == ([escolhido], [regra])
+
+
+@pytest.mark.parametrize("vazio", ['', None, np.nan, 0, '0', 'N/A', '0000-00-00', '1900-01-01'])
+def test_valores_sem_pagamento(vazio):
+    # A linha paga tem o menor cod_prestacao: só é descartada se `vazio` contar como "sem pagamento"
+    linhas = [linha('pago', cod_prestacao=1, data_pagamento='2025-01-05'),
+              linha('sem_pagamento', cod_prestacao=2, data_pagamento=vazio)]
+    assert resolver(linhas) == (['sem_pagamento'], ['REGRA 1 (candidato único)'])
+
+
+def test_grupos_na_ordem_das_chaves_e_sem_unicos():
+    linhas = [linha('b2', cpf='222', cod_prestacao=2), linha('unico', cpf='333'),
+              linha('a1', cpf='111', cod_prestacao=1), linha('b1', cpf='222', cod_prestacao=1),
+              linha('a2', cpf='111', cod_prestacao=2)]
+    ids, _ = resolver(linhas)
+    assert ids == ['a1', 'b1']
+
+
+# --- Paridade com a resolução anterior (um grupo por vez), congelada sem os prints ---
+
+def antigo_aplicar_regras_duplicatas(grupo):
+    grupo = grupo.copy()
+    tem_data_pagamento = 'data_pagamento' in grupo.columns
+    tem_cod_acordo = 'cod_acordo' in grupo.columns
+
+    if tem_data_pagamento:
+        tem_pagamento = (
+            grupo['data_pagamento'].notna() &
+            (grupo['data_pagamento'] != '') &
+            (grupo['data_pagamento'] != 0) &
+            (grupo['data_pagamento'] != '0') &
+            (grupo['data_pagamento'] != 'N/A') &
+            (grupo['data_pagamento'] != '0000-00-00') &
+            (grupo['data_pagamento'] != '1900-01-01')
+        )
+        registros_com_pagamento = grupo[tem_pagamento]
+        registros_sem_pagamento = grupo[~tem_pagamento]
+
+        if len(registros_com_pagamento) > 0 and len(registros_sem_pagamento) > 0:
+            if len(registros_sem_pagamento) > 1:
+                return antigo_aplicar_criterios_desempate(registros_sem_pagamento, tem_cod_acordo)
+            return registros_sem_pagamento.iloc[[0]]
+        elif len(registros_com_pagamento) > 0 and len(registros_sem_pagamento) == 0:
+            if tem_cod_acordo:
+                registros_com_pagamento = registros_com_pagamento.copy()
+                registros_com_pagamento['cod_acordo_norm'] = pd.to_numeric(
+                    registros_com_pagamento['cod_acordo'], errors='coerce').fillna(-1)
+                registros_cod_zero = registros_com_pagamento[registros_com_pagamento['cod_acordo_norm'] == 0]
+                if len(registros_cod_zero) > 0:
+                    if len(registros_cod_zero) > 1:
+                        return antigo_aplicar_criterios_desempate(registros_cod_zero, tem_cod_acordo)
+                    return registros_cod_zero.iloc[[0]]
+                return antigo_aplicar_criterios_desempate(registros_com_pagamento, tem_cod_acordo)
+            return antigo_aplicar_criterios_desempate(registros_com_pagamento, tem_cod_acordo)
+        else:
+            grupo_sem_pagamento = registros_sem_pagamento
+    else:
+        grupo_sem_pagamento = grupo
+
+    if tem_cod_acordo:
+        grupo_sem_pagamento = grupo_sem_pagamento.copy()
+        grupo_sem_pagamento['cod_acordo_norm'] = pd.to_numeric(
+            grupo_sem_pagamento['cod_acordo'], errors='coerce').fillna(-1)
+        registros_cod_zero = grupo_sem_pagamento[grupo_sem_pagamento['cod_acordo_norm'] == 0]
+        if len(registros_cod_zero) > 0:
+            if len(registros_cod_zero) > 1:
+                return antigo_aplicar_criterios_desempate(registros_cod_zero, tem_cod_acordo)
+            return registros_cod_zero.iloc[[0]]
+        return antigo_aplicar_criterios_desempate(grupo_sem_pagamento, tem_cod_acordo)
+    return antigo_aplicar_criterios_desempate(grupo_sem_pagamento, tem_cod_acordo)
+
+
+def antigo_aplicar_criterios_desempate(registros, tem_cod_acordo):
+    if len(registros) == 1:
+        return registros.iloc[[0]]
+
+    menor_cod_prestacao = registros['cod_prestacao'].min()
+    candidatos = registros[registros['cod_prestacao'] == menor_cod_prestacao]
+    if len(candidatos) == 1:
+        return candidatos.iloc[[0]]
+
+    if tem_cod_acordo and 'cod_acordo' in candidatos.columns:
+        if 'cod_acordo_norm' not in candidatos.columns:
+            candidatos = candidatos.copy()
+            candidatos['cod_acordo_norm'] = pd.to_numeric(candidatos['cod_acordo'], errors='coerce').fillna(999999)
+        menor_cod_acordo = candidatos['cod_acordo_norm'].min()
+        candidatos_final = candidatos[candidatos['cod_acordo_norm'] == menor_cod_acordo]
+        if len(candidatos_final) == 1:
+            return candidatos_final.iloc[[0]]
+        candidatos = candidatos_final
+
+    return candidatos.iloc[[0]]
+
+
+def antigo_ids_escolhidos(df):
+    """ids escolhidos pela implementação anterior, na ordem das chaves"""
+    grupos_duplicados = df.groupby(CHAVE_DUPLICATAS).filter(lambda x: len(x) > 1)
+    return [antigo_aplicar_regras_duplicatas(grupo)['id'].iloc[0]
+            for _, grupo in grupos_duplicados.groupby(CHAVE_DUPLICATAS)]
+
+
+PAGAMENTOS = ['', None, np.nan, 0, '0', 'N/A', '0000-00-00', '1900-01-01', '2025-01-05', '2025-02-07']
+ACORDOS = [0, 0, '0', 3, 5, 7, np.nan, 'abc', 12]
+
+
+def gerar_planilha(r: np.random.RandomState, id_inicial: int) -> pd.DataFrame:
+    """Planilha sintética com muitos empates: poucas chaves, cod_prestacao e cod_acordo repetidos"""
+    quantidade = r.randint(2, 40)
+    df = pd.DataFrame({
+        'id': np.arange(id_inicial, id_inicial + quantidade),
+        'cpf': r.choice(['111', '222', '333', '444'], quantidade),
+        'data_vencimento': r.choice(['2025-01-10', '2025-02-10'], quantidade),
+        'numero_prestacao': r.randint(1, 3, quantidade),
+        'cod_prestacao': r.randint(1, 5, quantidade),
+        'data_pagamento': [PAGAMENTOS[i] for i in r.randint(0, len(PAGAMENTOS), quantidade)],
+        'cod_acordo': [ACORDOS[i] for i in r.randint(0, len(ACORDOS), quantidade)],
+    })
+    # Também sem uma ou as duas colunas opcionais
+    opcionais = [['data_pagamento', 'cod_acordo'], ['data_pagamento'], ['cod_acordo'], []][r.randint(0, 4)]
+    return df[['id'] + CHAVE_DUPLICATAS + ['cod_prestacao'] + opcionais]
+
+
+def test_paridade_com_resolucao_anterior():
+    r = np.random.RandomState(2025)
+    for rodada in range(300):
+        df = gerar_planilha(r, rodada * 100)
+        esperado = antigo_ids_escolhidos(df)
+        obtido = list(filtrar_duplicatas_cpf_data(df)['id'])
+        assert obtido == esperado, f"rodada {rodada}:\n{df}"
+
+
+def test_relatorio_com_regras_e_grupos(tmp_path):
+    df = pd.DataFrame([linha('pago', cod_prestacao=1, data_pagamento='2025-01-05'), linha('aberto', cod_prestacao=2),
+                       linha('outro', cpf='222'), linha('outro2', cpf='222', cod_prestacao=3)])
+    resultado = filtrar_duplicatas_cpf_data(df)
+    relatorio, grupos = gravar_relatorio_duplicatas(resultado, 'entrada.xlsx', str(tmp_path / 'saida.xlsx'), len(df))
+
+    texto = Path(relatorio).read_text(encoding='utf-8')
+    assert grupos == 2
+    assert 'Grupos de duplicatas resolvidos: 2' in texto
+    assert 'GRUPOS PROCESSADOS:' in texto
+    assert 'Grupo resolvido: CPF=111, Data Venc=2025-01-10, Num Prest=1 - 1 registro(s) selecionado(s) [REGRA 1' in texto
+    assert texto.count('Grupo resolvido:') == 2
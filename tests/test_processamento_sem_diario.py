@@ -0,0 +1,97 @@
+"""
+Processamento avulso com app.auto_backup desligado
+Sem diário de checkpoint os resultados precisam chegar ao XLSX salvo (final e na pausa)
+"""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+for variavel in ("LOGIN", "SENHA", "URL"):
+    os.environ.setdefault(variavel, "teste")
+
+from src import consultar_acordo, obter_divida_cpf
+
+
+class ConfigSemBackup:
+    def get(self, chave, padrao=None):
+        return False if chave == 'app.auto_backup' else padrao
+
+
+class Componente:
+    """Substitui variáveis e rótulos do Tkinter"""
+
+    def set(self, *_):
+        pass
+
+    def config(self, **_):
+        pass
+
+
+@pytest.fixture
+def sem_diario(monkeypatch):
+    monkeypatch.setattr(consultar_acordo, "carregar_config_projeto", ConfigSemBackup)
+    monkeypatch.setattr(obter_divida_cpf, "carregar_config_projeto", ConfigSemBackup)
+    monkeypatch.setattr("tkinter.messagebox.showinfo", lambda *_: None)
+    monkeypatch.setattr("tkinter.messagebox.showerror", lambda *_: None)
+    obter_divida_cpf.parar_evento.clear()
+    obter_divida_cpf.cancelar_evento.clear()
+    consultar_acordo.parar_flag.clear()
+    yield
+    obter_divida_cpf.parar_evento.clear()
+    consultar_acordo.parar_flag.clear()
+
+
+def consulta_divida(parar_apos=None):
+    """Engine falsa de processar_linhas_cpf: status derivado do CPF; pede pausa após `parar_apos` linhas"""
+    def processar(linhas, max_workers=None, parar=None, cancelar=None, on_progresso=None):
+        for n, (i, row) in enumerate(linhas):
+            if parar_apos is not None and n == parar_apos:
+                parar.set()
+                return
+            yield i, f"ok {row['cpf']}", "obs", "10", "20"
+    return processar
+
+
+def test_divida_grava_resultados_sem_diario(sem_diario, monkeypatch, tmp_path):
+    entrada, saida = tmp_path / "entrada.xlsx", tmp_path / "saida.xlsx"
+    pd.DataFrame({'cpf': ['1', '2', '3'], 'status': '', 'observacao': ''}).to_excel(entrada, index=False)
+    monkeypatch.setattr(obter_divida_cpf, "processar_linhas_cpf", consulta_divida())
+
+    obter_divida_cpf.processar_xlsx(str(entrada), str(saida), Componente(), Componente(), Componente())
+
+    resultado = pd.read_excel(saida, dtype=str)
+    assert list(resultado['status']) == ['ok 1', 'ok 2', 'ok 3']
+    assert list(resultado['cod_acordo']) == ['20', '20', '20']
+
+
+def test_divida_pausa_salva_linhas_processadas_sem_diario(sem_diario, monkeypatch, tmp_path):
+    entrada, saida = tmp_path / "entrada.xlsx", tmp_path / "saida.xlsx"
+    pd.DataFrame({'cpf': ['1', '2', '3'], 'status': '', 'observacao': ''}).to_excel(entrada, index=False)
+    monkeypatch.setattr(obter_divida_cpf, "processar_linhas_cpf", consulta_divida(parar_apos=2))
+
+    obter_divida_cpf.processar_xlsx(str(entrada), str(saida), Componente(), Componente(), Componente())
+
+    resultado = pd.read_excel(saida, dtype=str)
+    assert list(resultado['cpf']) == ['1', '2']
+    assert list(resultado['status']) == ['ok 1', 'ok 2']
+
+
+def test_acordo_grava_resultados_sem_diario(sem_diario, monkeypatch, tmp_path):
+    entrada, saida = tmp_path / "entrada.xlsx", tmp_path / "saida.xlsx"
+    pd.DataFrame({'cod_cliente': [1, 2], 'cod_acordo': [7, 8]}).to_excel(entrada, index=False)
+
+    def consultar(linhas, max_workers=None, parar_evento=None, cancelar_evento=None, on_progresso=None, total=None):
+        for i, row in linhas:
+            yield i, f"acordo {row['cod_acordo']}"
+    monkeypatch.setattr(consultar_acordo, "consultar_linhas", consultar)
+
+    consultar_acordo.processar_arquivo(str(entrada), str(saida), Componente(), Componente(), Componente(),
+                                       Componente(), Componente(), Componente(), Componente())
+
+    resultado = pd.read_excel(saida, dtype=str)
+    assert list(resultado['status_acordo']) == ['acordo 7', 'acordo 8']